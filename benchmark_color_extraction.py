@@ -0,0 +1,101 @@
+import argparse
+import json
+import time
+
+from color_cache import ImageColorCache
+from preprocess_products import COLOR_METHODS, OUTPUT_FILE, decode_image_pixels, download_image_bytes, extract_colors
+
+# Renk çıkarım yöntemlerini hız ve products_with_colors.json'daki mevcut çıktıyla uyum açısından karşılaştırır.
+# Kullanım: python benchmark_color_extraction.py --limit 200 [--methods kmeans histogram] [--json sonuc.json]
+
+def load_reference_products(products_file, limit):
+    with open(products_file, 'r', encoding='utf-8') as f:
+        products = json.load(f)
+    products = [p for p in products if p.get('image_url') and 'dominant_colors' in p]
+    return products[:limit] if limit else products
+
+def load_pixels(products, cache):
+    # Görseller bir kez indirilir (veya önbellekten okunur); zamanlama yalnızca çıkarımı ölçer
+    samples = []
+    for p in products:
+        image_url = p['image_url']
+        pixels = None
+        if cache is not None:
+            content_hash = cache.hash_for_url(image_url)
+            pixels = cache.get_pixels(content_hash) if content_hash else None
+        if pixels is None:
+            try:
+                pixels = decode_image_pixels(download_image_bytes(image_url))
+            except Exception as e:
+                print(f"[Hata] Görsel alınamadı: {image_url} - Sebep: {e}")
+                continue
+        if pixels is not None:
+            samples.append((p, pixels))
+    return samples
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def benchmark_method(samples, method):
+    durations = []
+    similarities = []
+    exact = 0
+    extract_colors(samples[0][1], 5, method) # Isınma: arama tablosu gibi tek seferlik hazırlıklar ölçüme girmesin
+    for p, pixels in samples:
+        started = time.perf_counter()
+        _, colors = extract_colors(pixels, 5, method)
+        durations.append(time.perf_counter() - started)
+        similarity = jaccard(colors, p['dominant_colors'])
+        similarities.append(similarity)
+        exact += similarity == 1.0
+    durations.sort()
+    count = len(samples)
+    return {
+        "method": method,
+        "images": count,
+        "mean_ms": 1000 * sum(durations) / count,
+        "p50_ms": 1000 * durations[count // 2],
+        "p99_ms": 1000 * durations[min(count - 1, int(count * 0.99))],
+        "images_per_s": count / sum(durations) if sum(durations) > 0 else float('inf'),
+        "mean_jaccard": sum(similarities) / count,
+        "exact_match": exact / count,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Renk çıkarım yöntemlerini karşılaştırır.")
+    parser.add_argument('--products', default=OUTPUT_FILE,
+                        help="Referans dominant_colors değerlerini içeren ürün dosyası")
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--methods', nargs='+', choices=COLOR_METHODS, default=list(COLOR_METHODS))
+    parser.add_argument('--cache-dir', default='.color_cache')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--json', help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ImageColorCache(args.cache_dir)
+    try:
+        samples = load_pixels(load_reference_products(args.products, args.limit), cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    if not samples:
+        print("Karşılaştırılacak görsel bulunamadı.")
+        return
+    print(f"{len(samples)} görsel üzerinde karşılaştırılıyor.\n")
+
+    results = [benchmark_method(samples, method) for method in args.methods]
+    print(f"{'yöntem':<12} {'ort. ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'görsel/sn':>10} {'jaccard':>8} {'birebir':>8}")
+    for r in results:
+        print(f"{r['method']:<12} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['images_per_s']:>10.1f} {r['mean_jaccard']:>8.3f} {r['exact_match']:>8.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import recommendation_service as service
+from prefork_server import serve_prefork
+from result_cache import ResultCache
+
+# suggest_complementary_items için yük testi. products_with_colors.json'daki kategori ve renk
+# dağılımına benzeyen sentetik kataloglar üretir, servisi Flask test istemcisi ve çok worker'lı
+# gerçek bir WSGI sunucusu üzerinden istek karışımlarıyla çalıştırır; gecikme (p50/p99), verim
+# ve bellek ölçümlerini JSON dosyasına yazar. visual_similarity karışımı suggest_similar_items'ı ölçer ve
+# sentetik ürünlere görsel tanımlayıcı ekler (varsayılan karışımlarda yoktur).
+# Kullanım: python benchmark_recommendation_service.py --sizes 10000 100000 --json sonuc.json
+
+REFERENCE_FILE = 'products_with_colors.json'
+DEFAULT_SIZES = (10000, 100000, 1000000)
+REQUEST_MIXES = ("color_preference", "style_preference", "current_categories", "score", "price_range",
+                 "visual_similarity")
+DEFAULT_ENDPOINT = '/suggest_complementary_items'
+MIX_ENDPOINTS = {"visual_similarity": '/suggest_similar_items'}
+# Bu karışımlar katalogda görsel tanımlayıcı gerektirir; yalnızca --mixes ile istenirse üretilir
+DESCRIPTOR_MIXES = ("visual_similarity",)
+DRIVERS = ("test_client", "wsgi")
+RULE_CATEGORY_SHARE = 0.2 # Referansta olmayan kural kategorilerine (ayakkabı, aksesuar...) ayrılan pay
+
+def load_reference_products(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def make_synthetic_descriptors(products, seed=0):
+    # Her renk adına birkaç LAB kutusunda yoğunlaşan sabit bir histogram; ürünün histogramı renklerinin
+    # rastgele ağırlıklı toplamı ve biraz gürültüdür. Aynı renkleri paylaşan ürünler birbirine benzer.
+    import numpy as np
+    from visual_index import DESCRIPTOR_SIZE, encode_descriptor
+    rng = np.random.default_rng(seed)
+    templates = {}
+    for p in products:
+        histogram = rng.random(DESCRIPTOR_SIZE) * 0.01
+        for color in p['dominant_colors']:
+            template = templates.get(color)
+            if template is None:
+                template = templates[color] = np.zeros(DESCRIPTOR_SIZE)
+                template[rng.choice(DESCRIPTOR_SIZE, 3, replace=False)] = rng.random(3)
+            histogram += template * rng.random()
+        p['visual_descriptor'] = encode_descriptor(np.round(255 * np.sqrt(histogram / histogram.sum())))
+
+def generate_synthetic_products(count, reference_products, seed=0, descriptors=False):
+    # Kategori, renk sayısı, renk ve ad dağılımları referans üründen örneklenir; kural tablolarındaki
+    # ama referansta bulunmayan kategoriler de küçük bir payla eklenir (kombin şablonları için).
+    rng = random.Random(seed)
+    reference_categories = [p['category'] for p in reference_products]
+    rule_categories = sorted({c for subs in service.COMPLEMENTARY_RULES.values() for c in subs} - set(reference_categories))
+    color_counts = [len(p.get('dominant_colors', [])) for p in reference_products]
+    colors = [c for p in reference_products for c in p.get('dominant_colors', [])]
+    names = [p['name'] for p in reference_products if p.get('name')]
+    keywords = sorted({k for table in service.RULE_TAG_TABLES.values() for ks in table.values() for k in ks})
+    prices = [p['price'] for p in reference_products if p.get('price')]
+
+    products = []
+    for i in range(count):
+        if rule_categories and rng.random() < RULE_CATEGORY_SHARE:
+            category = rng.choice(rule_categories)
+        else:
+            category = rng.choice(reference_categories)
+        name = rng.choice(names)
+        if rng.random() < 0.5:
+            name = f"{rng.choice(keywords)} {name}" # Stil/mevsim/silüet etiketlerine uyan adlar
+        product_colors = []
+        for _ in range(rng.choice(color_counts)):
+            color = rng.choice(colors)
+            if color not in product_colors:
+                product_colors.append(color)
+        products.append({
+            "name": name,
+            "price": rng.choice(prices),
+            "image_url": f"https://example.invalid/img/{i}.jpg",
+            "product_url": f"https://example.invalid/p/{i}",
+            "category": category,
+            "source": "Sentetik",
+            "dominant_colors": product_colors,
+        })
+    if descriptors:
+        make_synthetic_descriptors(products, seed)
+    return products
+
+def write_catalog(products, directory, snapshot=False):
+    path = os.path.join(directory, 'products_with_colors.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(products, f, ensure_ascii=False)
+    snapshot_path = os.path.join(directory, 'products_with_colors.snapshot')
+    if snapshot:
+        from catalog_snapshot import write_snapshot
+        write_snapshot(products, snapshot_path)
+    return path, snapshot_path
+
+def make_payloads(products, mix, count, seed=0):
+    rng = random.Random(f"{mix}-{seed}")
+    colors = sorted({c for p in products[:10000] for c in p.get('dominant_colors', [])})
+    categories = sorted({p['category'] for p in products[:10000]})
+    # Kurallarda ana kategorisi olmayan ürünler 400 döndürür; hata sayısı gerçek hataları göstersin
+    mapped = {c for c in categories if service.get_main_category(c)}
+    seeds = [p for p in products if p['category'] in mapped]
+    payloads = []
+    for _ in range(count):
+        p = rng.choice(seeds)
+        payload = {"category": p['category'], "id": p['product_url'], "count": 3}
+        if mix == "color_preference":
+            payload["color_preference"] = rng.choice(colors)
+        elif mix == "style_preference":
+            payload["style_preference"] = rng.choice(sorted(service.STYLE_GROUPS))
+        elif mix == "current_categories":
+            payload["current_categories"] = rng.sample(categories, min(2, len(categories)))
+        elif mix == "score":
+            payload["mode"] = "score"
+            payload["style_preference"] = rng.choice(sorted(service.STYLE_GROUPS))
+        elif mix == "visual_similarity":
+            payload["scope"] = rng.choice(["complementary", "similar"])
+        elif mix == "price_range":
+            # Yarısı seçili ürünün fiyatına yakın, yarısı bütçe aralıklı istekler
+            if rng.random() < 0.5:
+                payload["near_seed_price"] = True
+            else:
+                payload["min_price"] = rng.choice([0, 250, 500])
+                payload["max_price"] = payload["min_price"] + rng.choice([250, 500, 1000])
+        payloads.append(payload)
+    return payloads
+
+def get_rss_mb(pid='self'):
+    # Linux'ta paylaşılan sayfaları worker'lar arasında bölen PSS, yoksa RSS
+    for path, key in ((f'/proc/{pid}/smaps_rollup', 'Pss:'), (f'/proc/{pid}/status', 'VmRSS:')):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(key):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            continue
+    if pid == 'self':
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+def summarize(durations, wall_seconds, errors):
+    durations = sorted(durations)
+    count = len(durations)
+    if not count:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": count,
+        "errors": errors,
+        "mean_ms": 1000 * sum(durations) / count,
+        "p50_ms": 1000 * durations[count // 2],
+        "p99_ms": 1000 * durations[min(count - 1, int(count * 0.99))],
+        "throughput_rps": count / wall_seconds if wall_seconds > 0 else float('inf'),
+    }
+
+# --- Flask test istemcisi ---
+
+def load_service(catalog_path, snapshot_path, columnar, result_cache_size):
+    service.PRODUCTS_FILE = catalog_path
+    service.PRODUCTS_SNAPSHOT_FILE = snapshot_path
+    # Çalışma dizinindeki gerçek delta dosyası sentetik kataloğa uygulanmasın: geçici dizinde olmayan bir yol
+    service.PRODUCTS_DELTA_FILE = os.path.join(os.path.dirname(catalog_path), 'products_with_colors.delta.jsonl')
+    service.USE_COLUMNAR_STORE = columnar
+    if result_cache_size is not None:
+        service.result_cache = ResultCache(result_cache_size, service.RESULT_CACHE_TTL)
+    started = time.perf_counter()
+    service.load_products()
+    return service, time.perf_counter() - started
+
+def run_test_client(service, payloads, warmup, path=DEFAULT_ENDPOINT):
+    client = service.app.test_client()
+    for payload in payloads[:warmup]:
+        client.post(path, json=payload)
+    durations = []
+    errors = 0
+    rss_before = get_rss_mb()
+    started = time.perf_counter()
+    for payload in payloads:
+        t = time.perf_counter()
+        response = client.post(path, json=payload)
+        durations.append(time.perf_counter() - t)
+        errors += response.status_code != 200
+    result = summarize(durations, time.perf_counter() - started, errors)
+    result["rss_mb"] = get_rss_mb()
+    result["rss_delta_mb"] = result["rss_mb"] - rss_before
+    return result
+
+# --- Çok worker'lı WSGI sunucusu ---
+
+def serve_main(args):
+    service, _ = load_service(args.catalog, args.snapshot_file, args.columnar, args.result_cache_size)
+    # Üretimdeki wsgi.py ile aynı sunucu; hazır olunca pid'ler ana sürece bildirilir
+    serve_prefork(service.app, '127.0.0.1', args.port, args.workers,
+                  on_ready=lambda pids: print(json.dumps({"ready": True, "pids": pids}), flush=True))
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_wsgi_server(catalog_path, snapshot_path, args, env=None):
+    port = get_free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--catalog', catalog_path,
+               '--snapshot-file', snapshot_path, '--port', str(port), '--workers', str(args.workers)]
+    if args.columnar:
+        command.append('--columnar')
+    if args.result_cache_size is not None:
+        command += ['--result-cache-size', str(args.result_cache_size)]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError("WSGI sunucusu başlatılamadı")
+    pids = json.loads(line)["pids"]
+    return process, port, pids, time.perf_counter() - started
+
+def run_wsgi(port, pids, payloads, concurrency, warmup, path=DEFAULT_ENDPOINT):
+    url = f'http://127.0.0.1:{port}{path}'
+    def post(payload):
+        data = json.dumps(payload).encode('utf-8')
+        req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            return None
+
+    for payload in payloads[:warmup]:
+        post(payload)
+    durations = []
+    errors = [0]
+    lock = threading.Lock()
+    next_index = [0]
+    def worker():
+        local = []
+        local_errors = 0
+        while True:
+            with lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if i >= len(payloads):
+                break
+            t = time.perf_counter()
+            status = post(payloads[i])
+            local.append(time.perf_counter() - t)
+            local_errors += status != 200
+        with lock:
+            durations.extend(local)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    result = summarize(durations, time.perf_counter() - started, errors[0])
+    memory = [get_rss_mb(pid) for pid in pids]
+    result["rss_mb"] = sum(m for m in memory if m is not None)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Öneri servisi için sentetik katalogla yük testi.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--mixes', nargs='+', choices=REQUEST_MIXES,
+                        default=[mix for mix in REQUEST_MIXES if mix not in DESCRIPTOR_MIXES])
+    parser.add_argument('--drivers', nargs='+', choices=DRIVERS, default=list(DRIVERS))
+    parser.add_argument('--requests', type=int, default=2000, help="Karışım başına istek sayısı")
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="WSGI worker süreç sayısı")
+    parser.add_argument('--concurrency', type=int, default=8, help="WSGI sürücüsünde eşzamanlı istemci sayısı")
+    parser.add_argument('--columnar', action='store_true', help="USE_COLUMNAR_STORE=1 ile çalıştır")
+    parser.add_argument('--snapshot', action='store_true', help="Kataloğu ikili anlık görüntüden yükle")
+    parser.add_argument('--result-cache-size', type=int, help="0 sonuç önbelleğini kapatır")
+    parser.add_argument('--reference', default=REFERENCE_FILE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Sonuçların yazılacağı JSON dosyası")
+    # Dahili: --serve ile yalnızca WSGI sunucusu çalışır (start_wsgi_server kullanır)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--catalog', help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot-file', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_main(args)
+        return
+
+    reference_products = load_reference_products(args.reference)
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix='kombin-bench-') as directory:
+            started = time.perf_counter()
+            descriptors = any(mix in DESCRIPTOR_MIXES for mix in args.mixes)
+            products = generate_synthetic_products(size, reference_products, args.seed, descriptors)
+            catalog_path, snapshot_path = write_catalog(products, directory, args.snapshot)
+            print(f"{size} ürünlük sentetik katalog hazırlandı ({time.perf_counter() - started:.1f} sn).")
+            payloads_by_mix = {mix: make_payloads(products, mix, args.requests, args.seed) for mix in args.mixes}
+            del products
+
+            for driver in args.drivers:
+                common = {"size": size, "driver": driver, "columnar": args.columnar, "snapshot": args.snapshot}
+                if driver == "test_client":
+                    service, load_seconds = load_service(catalog_path, snapshot_path, args.columnar,
+                                                         args.result_cache_size)
+                    common.update(load_s=load_seconds, workers=1, concurrency=1)
+                    for mix, payloads in payloads_by_mix.items():
+                        path = MIX_ENDPOINTS.get(mix, DEFAULT_ENDPOINT)
+                        results.append({**common, "mix": mix, **run_test_client(service, payloads, args.warmup, path)})
+                        print_result(results[-1])
+                else:
+                    process, port, pids, load_seconds = start_wsgi_server(catalog_path, snapshot_path, args)
+                    common.update(load_s=load_seconds, workers=args.workers, concurrency=args.concurrency)
+                    try:
+                        for mix, payloads in payloads_by_mix.items():
+                            path = MIX_ENDPOINTS.get(mix, DEFAULT_ENDPOINT)
+                            results.append({**common, "mix": mix,
+                                            **run_wsgi(port, pids, payloads, args.concurrency, args.warmup, path)})
+                            print_result(results[-1])
+                    finally:
+                        process.terminate()
+                        for pid in pids[1:]:
+                            try:
+                                os.kill(pid, 15)
+                            except ProcessLookupError:
+                                pass
+                        process.wait()
+
+    if args.json:
+        report = {
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+def print_result(r):
+    if not r["requests"]:
+        print(f"{r['size']:>8} {r['driver']:<12} {r['mix']:<20} istek tamamlanamadı ({r['errors']} hata)")
+        return
+    print(f"{r['size']:>8} {r['driver']:<12} {r['mix']:<20} p50 {r['p50_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  "
+          f"{r['throughput_rps']:>8.1f} istek/sn  {r['rss_mb']:>8.1f} MB  {r['errors']} hata")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+from card_parsers import PARSER_BACKENDS, get_card_parser
+from scraper import parse_product_cards
+
+# Kart ayrıştırıcı arka uçlarını kaydedilmiş listeleme sayfaları üzerinde hız ve bs4 çıktısıyla uyum
+# açısından karşılaştırır. Sayfalar tarayıcıdan "farklı kaydet" ile veya driver.page_source ile alınabilir.
+# Kullanım: python benchmark_scraper_parsers.py sayfalar/*.html [--backends lxml bs4] [--repeat 5] [--json sonuc.json]
+
+def load_pages(patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    pages = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((path, f.read()))
+        except OSError as e:
+            print(f"[Hata] Sayfa okunamadı: {path} - Sebep: {e}")
+    return pages
+
+def parse_pages(pages, backend):
+    return [parse_product_cards(html, os.path.basename(path), path, verbose=False, parser=backend)
+            for path, html in pages]
+
+def benchmark_backend(pages, backend, reference, repeat):
+    parse_pages(pages[:1], backend) # Isınma: içe aktarma ve seçici derleme ölçüme girmesin
+    durations = []
+    for _ in range(repeat):
+        for path, html in pages:
+            started = time.perf_counter()
+            parse_product_cards(html, os.path.basename(path), path, verbose=False, parser=backend)
+            durations.append(time.perf_counter() - started)
+    results = parse_pages(pages, backend)
+    cards = sum(len(products) for products in results)
+    # Uyum: bs4 ile birebir aynı ürün listesini üreten sayfaların oranı
+    matching = sum(products == expected for products, expected in zip(results, reference))
+    durations.sort()
+    count = len(durations)
+    total = sum(durations)
+    return {
+        "backend": backend,
+        "pages": len(pages),
+        "products": cards,
+        "mean_ms": 1000 * total / count,
+        "p50_ms": 1000 * durations[count // 2],
+        "p99_ms": 1000 * durations[min(count - 1, int(count * 0.99))],
+        "products_per_s": cards * repeat / total if total > 0 else float('inf'),
+        "matching_pages": matching / len(pages),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Ürün kartı ayrıştırıcılarını karşılaştırır.")
+    parser.add_argument('pages', nargs='+', help="Kaydedilmiş HTML sayfaları (glob desenleri kabul edilir)")
+    parser.add_argument('--backends', nargs='+', choices=PARSER_BACKENDS, default=list(PARSER_BACKENDS))
+    parser.add_argument('--repeat', type=int, default=5, help="Her sayfanın kaç kez ayrıştırılacağı")
+    parser.add_argument('--json', help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    if not pages:
+        print("Karşılaştırılacak sayfa bulunamadı.")
+        return
+    backends = []
+    for backend in args.backends:
+        try:
+            get_card_parser(backend)
+            backends.append(backend)
+        except ImportError:
+            print(f"'{backend}' kurulu değil, atlanıyor.")
+    if not backends:
+        return
+    reference = parse_pages(pages, 'bs4') if 'bs4' in backends else None
+    if reference is None:
+        print("bs4 kurulu değil; uyum ilk arka uca göre ölçülüyor.")
+        reference = parse_pages(pages, backends[0])
+    print(f"{len(pages)} sayfa üzerinde karşılaştırılıyor.\n")
+
+    results = [benchmark_backend(pages, backend, reference, args.repeat) for backend in backends]
+    print(f"{'arka uç':<12} {'ort. ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'ürün/sn':>10} {'ürün':>7} {'uyum':>7}")
+    for r in results:
+        print(f"{r['backend']:<12} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['products_per_s']:>10.1f} {r['products']:>7} {r['matching_pages']:>7.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import benchmark_recommendation_service as bench
+import shard_router
+from catalog_shards import SHARD_STRATEGIES
+from prefork_server import serve_prefork
+
+# Parçalanmış katalog (catalog_shards.py, shard_router.py) için yerel çok süreçli yük testi. Aynı sentetik
+# katalog her parça sayısı için n ayrı servis sürecine bölünür; istekler yönlendirici üzerinden gönderilir
+# ve verim, gecikme ile toplam bellek (PSS) parça sayısına göre karşılaştırılır. Verimin parça sayısıyla
+# doğrusala yakın artması için çekirdek sayısının parça + yönlendirici worker sayısından az olmaması gerekir.
+# Kullanım: python benchmark_sharded_service.py --size 200000 --shards 1 2 4 [--strategy url_hash] [--json sonuc.json]
+
+DEFAULT_SHARD_COUNTS = (1, 2, 4)
+
+def start_shards(catalog_path, snapshot_path, num_shards, strategy, args):
+    # Her parça benchmark_recommendation_service.py --serve ile, CATALOG_SHARD=i/n ortamında başlatılır
+    shard_args = argparse.Namespace(workers=args.shard_workers, columnar=args.columnar,
+                                    result_cache_size=args.result_cache_size)
+    shards = []
+    for i in range(num_shards):
+        env = {**os.environ, "CATALOG_SHARD": f"{i}/{num_shards}", "CATALOG_SHARD_STRATEGY": strategy}
+        shards.append(bench.start_wsgi_server(catalog_path, snapshot_path, shard_args, env))
+    return shards
+
+def start_router(shard_urls, strategy, workers):
+    port = bench.get_free_port()
+    command = [sys.executable, os.path.abspath(__file__), '--serve-router', '--port', str(port),
+               '--strategy', strategy, '--router-workers', str(workers), '--shard-urls', *shard_urls]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    line = process.stdout.readline()
+    if not line:
+        process.kill()
+        raise RuntimeError("Yönlendirici başlatılamadı")
+    return process, port, json.loads(line)["pids"]
+
+def serve_router(args):
+    shard_router.SHARD_URLS = args.shard_urls
+    shard_router.SHARD_STRATEGY = args.strategy
+    serve_prefork(shard_router.app, '127.0.0.1', args.port, args.router_workers,
+                  on_ready=lambda pids: print(json.dumps({"ready": True, "pids": pids}), flush=True))
+
+def stop_processes(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+def run_shard_count(catalog_path, snapshot_path, num_shards, payloads_by_mix, args):
+    started = time.perf_counter()
+    shards = start_shards(catalog_path, snapshot_path, num_shards, args.strategy, args)
+    processes = [process for process, _, _, _ in shards]
+    results = []
+    try:
+        shard_urls = [f'http://127.0.0.1:{port}' for _, port, _, _ in shards]
+        router, router_port, router_pids = start_router(shard_urls, args.strategy, args.router_workers)
+        processes.insert(0, router)
+        load_seconds = time.perf_counter() - started
+        pids = router_pids + [pid for _, _, shard_pids, _ in shards for pid in shard_pids]
+        for mix, payloads in payloads_by_mix.items():
+            result = bench.run_wsgi(router_port, pids, payloads, args.concurrency, args.warmup)
+            results.append({"shards": num_shards, "strategy": args.strategy, "mix": mix,
+                            "load_s": load_seconds, **result})
+            print_result(results[-1])
+    finally:
+        stop_processes(processes)
+    return results
+
+def print_result(r):
+    if not r["requests"]:
+        print(f"{r['shards']:>6} {r['mix']:<20} istek tamamlanamadı ({r['errors']} hata)")
+        return
+    print(f"{r['shards']:>6} {r['mix']:<20} p50 {r['p50_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  "
+          f"{r['throughput_rps']:>8.1f} istek/sn  {r['rss_mb']:>8.1f} MB  {r['errors']} hata")
+
+def main():
+    parser = argparse.ArgumentParser(description="Parçalanmış katalogla scatter-gather yük testi.")
+    parser.add_argument('--size', type=int, default=200000, help="Sentetik katalogdaki ürün sayısı")
+    parser.add_argument('--shards', type=int, nargs='+', default=list(DEFAULT_SHARD_COUNTS))
+    parser.add_argument('--strategy', choices=SHARD_STRATEGIES, default="main_category")
+    parser.add_argument('--mixes', nargs='+', default=["color_preference", "score"],
+                        choices=[mix for mix in bench.REQUEST_MIXES if mix not in bench.MIX_ENDPOINTS])
+    parser.add_argument('--requests', type=int, default=2000, help="Karışım başına istek sayısı")
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--shard-workers', type=int, default=1, help="Parça başına worker süreç sayısı")
+    parser.add_argument('--router-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--concurrency', type=int, default=16, help="Eşzamanlı istemci sayısı")
+    parser.add_argument('--columnar', action='store_true', help="Parçaları USE_COLUMNAR_STORE=1 ile çalıştır")
+    parser.add_argument('--snapshot', action='store_true', help="Parçalar kataloğu ikili anlık görüntüden yüklesin")
+    parser.add_argument('--result-cache-size', type=int, default=0,
+                        help="Parçalardaki sonuç önbelleği (varsayılan kapalı: her istek gerçekten hesaplanır)")
+    parser.add_argument('--reference', default=bench.REFERENCE_FILE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Sonuçların yazılacağı JSON dosyası")
+    # Dahili: --serve-router ile yalnızca yönlendirici çalışır (start_router kullanır)
+    parser.add_argument('--serve-router', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--shard-urls', nargs='+', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_router:
+        serve_router(args)
+        return
+
+    reference_products = bench.load_reference_products(args.reference)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='kombin-shards-') as directory:
+        started = time.perf_counter()
+        products = bench.generate_synthetic_products(args.size, reference_products, args.seed)
+        catalog_path, snapshot_path = bench.write_catalog(products, directory, args.snapshot)
+        print(f"{args.size} ürünlük sentetik katalog hazırlandı ({time.perf_counter() - started:.1f} sn); "
+              f"{os.cpu_count()} çekirdek, strateji: {args.strategy}.")
+        payloads_by_mix = {mix: bench.make_payloads(products, mix, args.requests, args.seed) for mix in args.mixes}
+        del products
+        for num_shards in args.shards:
+            results.extend(run_shard_count(catalog_path, snapshot_path, num_shards, payloads_by_mix, args))
+
+    # Her karışımda ilk parça sayısına göre verim artışı
+    print()
+    for mix in args.mixes:
+        rows = [r for r in results if r["mix"] == mix and r["requests"]]
+        if rows:
+            base = rows[0]
+            print(f"{mix}: " + ', '.join(f"{r['shards']} parça x{r['throughput_rps'] / base['throughput_rps']:.2f}"
+                                         for r in rows))
+
+    if args.json:
+        report = {
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "size": args.size,
+            "router_workers": args.router_workers,
+            "shard_workers": args.shard_workers,
+            "concurrency": args.concurrency,
+            "results": results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar '{args.json}' dosyasına yazıldı.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+# Trendyol listeleme sayfalarındaki ürün kartları için ayrıştırıcı arka uçları.
+# Hepsi aynı alanları aynı kurallarla çıkarır (ad, fiyat, görsel, bağlantı); yalnızca HTML kütüphanesi
+# değişir. selectolax (lexbor) ve lxml C ile yazılmıştır ve isteğe bağlıdır; kurulu değillerse
+# BeautifulSoup'un saf Python html.parser'ı kullanılır.
+import threading
+
+PARSER_BACKENDS = ("selectolax", "lxml", "bs4")
+
+def _has_class(name):
+    # XPath'te CSS'teki .name seçicisinin karşılığı (class listesinde tam kelime eşleşmesi)
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+class Bs4CardParser:
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def cards(self, page_source):
+        return self._soup(page_source, 'html.parser').find_all('div', class_='p-card-wrppr')
+
+    def fields(self, card):
+        # (ad, fiyat, görsel URL'si, href) döndürür; bulunamayan alanlar 'N/A'
+        name = 'N/A'
+        name_element = card.find('span', class_='prdct-desc-cntnr-name')
+        if name_element:
+            name = name_element.get_text(strip=True)
+
+        image_for_alt_name = card.find('img', class_='p-card-img')
+        if name == 'N/A' and image_for_alt_name and image_for_alt_name.get('alt'):
+            name = image_for_alt_name.get('alt', 'N/A').strip()
+        if name == 'N/A' and card.get('title'):
+            name = card.get('title').strip()
+
+        # Fiyatları çekmek için güncellenmiş mantık
+        price = 'N/A'
+        price_text_parts = []
+
+        # 1. Öncelik: class="price-item discounted" (veya sadece price-item)
+        # Bazen sadece "price-item" da olabilir, "discounted" olmadan.
+        price_item_div = card.find('div', class_='price-item discounted')
+        if not price_item_div: # Eğer "price-item discounted" yoksa, sadece "price-item" dene
+            price_item_div = card.find('div', class_='price-item')
+
+        if price_item_div:
+            # Bu div içindeki tüm doğrudan metinleri al (text=True sadece ilkini alır)
+            for content in price_item_div.contents:
+                if isinstance(content, str):
+                    part = content.strip()
+                    if part: # Boş stringleri ekleme
+                        price_text_parts.append(part)
+            if price_text_parts:
+                price = " ".join(price_text_parts).replace('TL', '').strip()
+
+        # 2. Yedek Yöntem: Eğer price-item bulunamazsa, eski class'ları dene
+        if price == 'N/A':
+            price_elements = card.find_all('div', class_='prc-box-dscntd')
+            if not price_elements:
+                price_elements = card.find_all('span', class_='prc-slg')
+            for pe in price_elements:
+                if pe.get_text(strip=True):
+                    price = pe.get_text(strip=True).replace('TL', '').strip()
+                    break
+
+        image_url = 'N/A'
+        image_wrapper = card.find('div', class_='p-card-img-wr')
+        if image_wrapper:
+            image_element = image_wrapper.find('img', class_='p-card-img')
+            if image_element:
+                image_url = image_element.get('src')
+
+        link_element = card.find('a', href=True)
+        if not link_element:
+            link_element = card.find('a', class_='p-card-chldrn-cntnr', href=True)
+        href = link_element.get('href') if link_element else None
+        return name, price, image_url, href
+
+class LxmlCardParser:
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html
+        self._html = html
+        # Seçiciler bir kez derlenir ve her sayfada/kartta yeniden kullanılır
+        xpath = etree.XPath
+        self._cards = xpath(f"//div[{_has_class('p-card-wrppr')}]")
+        self._name = xpath(f".//span[{_has_class('prdct-desc-cntnr-name')}]")
+        self._image = xpath(f".//img[{_has_class('p-card-img')}]")
+        self._price_discounted = xpath(".//div[@class='price-item discounted']")
+        self._price_item = xpath(f".//div[{_has_class('price-item')}]")
+        self._price_box = xpath(f".//div[{_has_class('prc-box-dscntd')}]")
+        self._price_single = xpath(f".//span[{_has_class('prc-slg')}]")
+        self._image_wrapper = xpath(f".//div[{_has_class('p-card-img-wr')}]")
+        self._link = xpath(".//a[@href]")
+
+    @staticmethod
+    def _text(element):
+        # BeautifulSoup get_text(strip=True) karşılığı
+        return ''.join(part.strip() for part in element.itertext())
+
+    @staticmethod
+    def _first(query, element):
+        found = query(element)
+        return found[0] if found else None
+
+    def cards(self, page_source):
+        if not page_source.strip():
+            return []
+        return self._cards(self._html.fromstring(page_source))
+
+    def fields(self, card):
+        name = 'N/A'
+        name_element = self._first(self._name, card)
+        if name_element is not None:
+            name = self._text(name_element)
+        image_for_alt_name = self._first(self._image, card)
+        if name == 'N/A' and image_for_alt_name is not None and image_for_alt_name.get('alt'):
+            name = image_for_alt_name.get('alt').strip()
+        if name == 'N/A' and card.get('title'):
+            name = card.get('title').strip()
+
+        price = 'N/A'
+        price_item_div = self._first(self._price_discounted, card)
+        if price_item_div is None:
+            price_item_div = self._first(self._price_item, card)
+        if price_item_div is not None:
+            # Doğrudan metinler: elemanın kendi metni ve alt elemanlarının ardından gelen metinler
+            texts = [price_item_div.text] + [child.tail for child in price_item_div]
+            parts = [text.strip() for text in texts if text and text.strip()]
+            if parts:
+                price = " ".join(parts).replace('TL', '').strip()
+        if price == 'N/A':
+            for pe in self._price_box(card) or self._price_single(card):
+                text = self._text(pe)
+                if text:
+                    price = text.replace('TL', '').strip()
+                    break
+
+        image_url = 'N/A'
+        image_wrapper = self._first(self._image_wrapper, card)
+        if image_wrapper is not None:
+            image_element = self._first(self._image, image_wrapper)
+            if image_element is not None:
+                image_url = image_element.get('src')
+
+        link_element = self._first(self._link, card)
+        href = link_element.get('href') if link_element is not None else None
+        return name, price, image_url, href
+
+class SelectolaxCardParser:
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def cards(self, page_source):
+        return self._parser(page_source).css('div.p-card-wrppr')
+
+    def fields(self, card):
+        name = 'N/A'
+        name_element = card.css_first('span.prdct-desc-cntnr-name')
+        if name_element is not None:
+            name = name_element.text(deep=True, separator='', strip=True)
+        image_for_alt_name = card.css_first('img.p-card-img')
+        if name == 'N/A' and image_for_alt_name is not None and image_for_alt_name.attributes.get('alt'):
+            name = image_for_alt_name.attributes['alt'].strip()
+        if name == 'N/A' and card.attributes.get('title'):
+            name = card.attributes['title'].strip()
+
+        price = 'N/A'
+        price_item_div = card.css_first('div[class="price-item discounted"]')
+        if price_item_div is None:
+            price_item_div = card.css_first('div.price-item')
+        if price_item_div is not None:
+            parts = []
+            for child in price_item_div.iter(include_text=True):
+                if child.tag == '-text':
+                    part = child.text(deep=False).strip()
+                    if part:
+                        parts.append(part)
+            if parts:
+                price = " ".join(parts).replace('TL', '').strip()
+        if price == 'N/A':
+            for pe in card.css('div.prc-box-dscntd') or card.css('span.prc-slg'):
+                text = pe.text(deep=True, separator='', strip=True)
+                if text:
+                    price = text.replace('TL', '').strip()
+                    break
+
+        image_url = 'N/A'
+        image_wrapper = card.css_first('div.p-card-img-wr')
+        if image_wrapper is not None:
+            image_element = image_wrapper.css_first('img.p-card-img')
+            if image_element is not None:
+                image_url = image_element.attributes.get('src')
+
+        link_element = card.css_first('a[href]')
+        href = link_element.attributes.get('href') if link_element is not None else None
+        return name, price, image_url, href
+
+_PARSER_CLASSES = {
+    "selectolax": SelectolaxCardParser,
+    "lxml": LxmlCardParser,
+    "bs4": Bs4CardParser,
+}
+_local = threading.local()
+
+def get_card_parser(backend="auto"):
+    """
+    Ayrıştırıcı örneğini döndürür. Derlenmiş seçiciler iş parçacıkları arasında paylaşılmasın diye
+    her iş parçacığında bir kez oluşturulur. "auto", kurulu olan en hızlı arka ucu seçer:
+    selectolax, lxml, bs4.
+    """
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    candidates = PARSER_BACKENDS if backend == "auto" else (backend,)
+    for name in candidates:
+        parser = parsers.get(name)
+        if parser is not None:
+            return parser
+        try:
+            parser = parsers[name] = _PARSER_CLASSES[name]()
+            return parser
+        except ImportError:
+            if backend != "auto":
+                raise
+    raise ImportError("Hiçbir HTML ayrıştırıcısı kurulu değil (selectolax, lxml veya beautifulsoup4 gerekli)")
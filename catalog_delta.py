@@ -0,0 +1,154 @@
+import json
+import os
+import time
+
+from product_catalog import CatalogView, get_view_rows, product_field_values
+
+# Artımlı katalog güncellemeleri. preprocess_products.py --incremental her çalıştırmada yeni kazınan
+# ürünleri mevcut kataloğa product_url ile eşler ve farkı bu dosyaya tek satırlık bir JSON kaydı
+# olarak ekler. Servis temel kataloğu (JSON veya ikili anlık görüntü) yükledikten sonra kayıtları
+# sırayla uygular; sonraki değişikliklerde yalnızca dosyanın yeni satırlarını okur.
+# Tam bir preprocess çalıştırması (veya --compact) temel dosyaları yeniden yazar ve bu dosyayı siler.
+DELTA_FILE = 'products_with_colors.delta.jsonl'
+
+# Karşılaştırmaya girmeyen alanlar: renkler ve görsel tanımlayıcı görselden, price_value fiyat
+# metninden türetilir; source yalnızca kazıma yöntemini gösterir
+IGNORED_FIELDS = ('dominant_colors', 'visual_descriptor', 'price_value', 'source')
+
+def get_product_url(product):
+    url = product.get('product_url')
+    return url if url and url != 'N/A' else None
+
+def index_by_url(products):
+    # product_url -> ürün; aynı URL birden fazla kez varsa ilki kullanılır (katalogdaki id_by_url gibi)
+    by_url = {}
+    for product in products:
+        url = get_product_url(product)
+        if url is not None:
+            by_url.setdefault(url, product)
+    return by_url
+
+def get_changed_fields(old, new):
+    # {alan: [eski değer, yeni değer]}; eksik alanlar None sayılır
+    changed = {}
+    for field in set(old) | set(new):
+        if field in IGNORED_FIELDS:
+            continue
+        if old.get(field) != new.get(field):
+            changed[field] = [old.get(field), new.get(field)]
+    return changed
+
+def diff_products(previous_products, scraped_products):
+    """
+    İki kazıma arasındaki farkı product_url ile bulur. Döndürülen sözlük:
+      new:     [yeni ürün, ...]
+      changed: [(eski ürün, yeni ürün, {alan: [eski, yeni]}), ...]
+      removed: [product_url, ...]
+      untracked: URL'si olmadığı için eşlenemeyen kazınmış ürün sayısı
+    """
+    previous_by_url = index_by_url(previous_products)
+    scraped_by_url = index_by_url(scraped_products)
+    new, changed = [], []
+    for url, product in scraped_by_url.items():
+        old = previous_by_url.get(url)
+        if old is None:
+            new.append(product)
+            continue
+        fields = get_changed_fields(old, product)
+        if fields:
+            changed.append((old, product, fields))
+    removed = [url for url in previous_by_url if url not in scraped_by_url]
+    untracked = sum(1 for product in scraped_products if get_product_url(product) is None)
+    return {"new": new, "changed": changed, "removed": removed, "untracked": untracked}
+
+def make_delta(upserts, removed, changes):
+    # upserts: renkleri eklenmiş yeni/değişmiş ürünler; changes: [{"product_url", "fields"}]
+    fields_changed = {}
+    for change in changes:
+        for field in change["fields"]:
+            fields_changed[field] = fields_changed.get(field, 0) + 1
+    return {
+        "created_at": time.time(),
+        "upserts": upserts,
+        "removed": removed,
+        "changes": changes,
+        "stats": {
+            "new": len(upserts) - len(changes),
+            "changed": len(changes),
+            "removed": len(removed),
+            "price_changed": fields_changed.get('price', 0),
+            "image_changed": fields_changed.get('image_url', 0),
+        },
+    }
+
+def append_delta(path, delta):
+    # Tek satır + fsync: okuyucu yalnızca '\n' ile biten satırları uyguladığından yarım kayıt görülmez
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(delta, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_deltas(path, offset=0):
+    """
+    offset baytından sonraki tamamlanmış kayıtları ve bir sonraki okumanın başlayacağı ofseti döndürür.
+    Dosya offset'ten kısaysa (silinip yeniden oluşturulmuşsa) (None, None) döner; çağıran tam yükleme yapmalıdır.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return ([], 0) if offset == 0 else (None, None)
+    if size < offset:
+        return None, None
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    complete = data[:data.rfind(b'\n') + 1] # Yazılmakta olan son satır bir sonraki okumaya kalır
+    deltas = [json.loads(line) for line in complete.decode('utf-8').splitlines() if line.strip()]
+    return deltas, offset + len(complete)
+
+def merge_descriptors(descriptors, entries):
+    # entries[i]: girdideki sıra (satırı descriptors'tan alınır) veya tanımlayıcısını metin olarak taşıyan ürün
+    texts = [None if isinstance(entry, int) else entry.get('visual_descriptor') for entry in entries]
+    if descriptors is None and not any(texts):
+        return None
+    from visual_index import decode_descriptors # numpy yalnızca sütunlu katalogda gerekir
+    merged = decode_descriptors(texts)
+    if descriptors is not None:
+        from_input = [i for i, entry in enumerate(entries) if isinstance(entry, int)]
+        if from_input:
+            merged[from_input] = descriptors[[entries[i] for i in from_input]]
+    return merged
+
+def apply_deltas(products, deltas):
+    """
+    Kayıtları sırayla uygulayıp yeni bir ürün listesi döndürür. Değişen ürünler katalogdaki yerini
+    korur, yeni ürünler sona eklenir, silinen URL'ler çıkarılır. products sütunlu bir katalogsa
+    (SnapshotCatalog veya onun üzerindeki bir CatalogView) değişmeyen ürünler sözlüğe çevrilmez; sonuç,
+    aynı kök katalog üzerinde tanımlayıcı matrisiyle birlikte bir CatalogView'dur.
+    """
+    columnar = hasattr(products, 'field_values')
+    # Girdideki sıra (değişmeyen ürün) veya deltadan gelen ürün; silinenler None olur ve sonda atılır
+    entries = list(range(len(products))) if columnar else list(products)
+    positions_by_url = {} # URL -> girdideki sıralar; kayıt başına yeniden oluşturulmaz
+    for i, url in enumerate(product_field_values(products, 'product_url')):
+        if url and url != 'N/A':
+            positions_by_url.setdefault(url, []).append(i)
+    for delta in deltas:
+        for product in delta.get('upserts', []):
+            url = get_product_url(product)
+            positions = positions_by_url.get(url) if url is not None else None
+            if positions:
+                entries[positions[0]] = product
+            else:
+                if url is not None:
+                    positions_by_url[url] = [len(entries)]
+                entries.append(product)
+        for url in delta.get('removed', []):
+            for position in positions_by_url.pop(url, ()):
+                entries[position] = None
+    entries = [entry for entry in entries if entry is not None]
+    if not columnar:
+        return entries
+    base, base_rows = get_view_rows(products)
+    rows = [base_rows[entry] if isinstance(entry, int) else entry for entry in entries]
+    return CatalogView(base, rows, merge_descriptors(getattr(products, 'descriptors', None), entries))
@@ -0,0 +1,65 @@
+import zlib
+
+from product_catalog import CatalogView, get_view_rows, product_field_values
+
+# Kataloğun yerel süreçlere bölünmesi (sharding). Her parça (shard) süreci kataloğun yalnızca kendi
+# payını yükler (recommendation_service, CATALOG_SHARD=i/n); shard_router.py istekleri yalnızca hedef
+# alt kategorileri tutan parçalara dağıtıp sonuçları birleştirir.
+#   main_category: COMPLEMENTARY_RULES'taki her ana kategori tek bir parçada tutulur (sırayla dağıtılır);
+#                  bir istek yalnızca önerilecek ana kategorilerin parçalarına gider. Kural dışı
+#                  kategorilerdeki ürünler (yalnızca seçili ürün olabilirler) URL özetine göre dağıtılır.
+#                  Parça sayısı en fazla ana kategori sayısı kadar anlamlıdır.
+#   url_hash:      ürünler product_url'nin CRC32 özetine göre dağıtılır; her istek tüm parçalara gider,
+#                  her parça adayların 1/n'ini işler.
+# Not: main_category'de her alt kategori kurallarda tek bir ana kategoride bulunmalıdır.
+SHARD_STRATEGIES = ("main_category", "url_hash")
+
+def parse_shard_spec(spec):
+    # "2/4" -> (2, 4); geçersizse ValueError
+    index, count = (int(part) for part in spec.split('/'))
+    if count <= 0 or not 0 <= index < count:
+        raise ValueError(f"Geçersiz parça tanımı: {spec!r} (beklenen: sıra/adet, ör. 0/4)")
+    return index, count
+
+def get_url_shard(product_url, num_shards):
+    # Python'un hash()'i süreçten sürece değiştiğinden sabit bir özet kullanılır
+    return zlib.crc32((product_url or '').encode('utf-8')) % num_shards
+
+def get_main_category_shards(complementary_rules, num_shards):
+    return {main_cat: i % num_shards for i, main_cat in enumerate(complementary_rules)}
+
+def get_shard_by_category(strategy, num_shards, complementary_rules):
+    # alt kategori -> parça; url_hash'te ve kural dışı kategorilerde boş (URL özeti kullanılır)
+    if strategy != "main_category":
+        return {}
+    main_category_shards = get_main_category_shards(complementary_rules, num_shards)
+    shard_by_category = {}
+    for main_cat, sub_cats in complementary_rules.items():
+        for sub_cat in sub_cats:
+            shard_by_category.setdefault(sub_cat, main_category_shards[main_cat])
+    return shard_by_category
+
+def get_product_shard(category, product_url, num_shards, shard_by_category):
+    shard = shard_by_category.get(category)
+    return shard if shard is not None else get_url_shard(product_url, num_shards)
+
+def select_shard_products(products, shard_index, num_shards, strategy, complementary_rules):
+    # Ürün listesinden (veya SnapshotCatalog'dan) bu parçaya düşen ürünler, katalog sırasıyla. Sütun
+    # bazlı kataloglarda ürün sözlükleri oluşturulmaz; sonuç kök katalog üzerinde bir CatalogView'dur.
+    categories = product_field_values(products, 'category')
+    urls = product_field_values(products, 'product_url')
+    shard_by_category = get_shard_by_category(strategy, num_shards, complementary_rules)
+    ids = [i for i, (category, url) in enumerate(zip(categories, urls))
+           if get_product_shard(category, url, num_shards, shard_by_category) == shard_index]
+    if not hasattr(products, 'field_values'):
+        return [products[i] for i in ids]
+    base, rows = get_view_rows(products)
+    descriptors = getattr(products, 'descriptors', None)
+    return CatalogView(base, [rows[i] for i in ids], descriptors[ids] if descriptors is not None else None)
+
+def get_target_shards(main_categories, strategy, num_shards, complementary_rules):
+    # Verilen ana kategorilerdeki adayları tutan parçalar (artan sırada)
+    if strategy != "main_category":
+        return list(range(num_shards))
+    main_category_shards = get_main_category_shards(complementary_rules, num_shards)
+    return sorted({main_category_shards[main_cat] for main_cat in main_categories if main_cat in main_category_shards})
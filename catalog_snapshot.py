@@ -0,0 +1,180 @@
+import json
+import math
+import mmap
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+from product_catalog import get_product_price
+from visual_index import DESCRIPTOR_SIZE, decode_descriptors
+
+# İkili katalog anlık görüntüsü (snapshot) biçimi:
+#   MAGIC | uint32 başlık uzunluğu | JSON başlık | 8 bayta hizalanmış bölümler
+# Başlık her bölüm için [ofset, dtype, eleman sayısı] tutar. Metinler tek bir string tablosunda
+# (string_offsets + string_data) saklanır; ürün alanları bu tabloya uint32 indeks olan sabit
+# genişlikli sütunlardır. Dosya salt okunur mmap ile açıldığından tüm worker'lar aynı fiziksel
+# sayfaları paylaşır.
+MAGIC = b'KMBSNAP1'
+STRING_FIELDS = ('name', 'price', 'image_url', 'product_url', 'category', 'source')
+MISSING = np.uint32(0xFFFFFFFF) # Üründe bu alan yok
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.chunks = []
+        self.offsets = [0]
+
+    def add(self, text):
+        sid = self.ids.get(text)
+        if sid is None:
+            data = text.encode('utf-8')
+            sid = self.ids[text] = len(self.chunks)
+            self.chunks.append(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+        return sid
+
+def write_snapshot(products, path):
+    strings = _StringTable()
+    n = len(products)
+    field_columns = {field: np.full(n, MISSING, dtype=np.uint32) for field in STRING_FIELDS}
+    extras = np.full(n, MISSING, dtype=np.uint32)
+    prices = np.empty(n, dtype=np.float64)
+    color_names = []
+    color_id_by_name = {}
+    color_offsets = np.zeros(n + 1, dtype=np.uint32)
+    color_ids = []
+
+    for i, p in enumerate(products):
+        extra = {}
+        for key, value in p.items():
+            if key in field_columns and isinstance(value, str):
+                field_columns[key][i] = strings.add(value)
+            elif key not in ('dominant_colors', 'price_value', 'visual_descriptor'): # Bunların kendi bölümleri var
+                extra[key] = value # Sütunu olmayan veya metin olmayan alanlar JSON olarak saklanır
+        if extra:
+            extras[i] = strings.add(json.dumps(extra, ensure_ascii=False))
+        prices[i] = get_product_price(p)
+        for color in p.get('dominant_colors', []):
+            cid = color_id_by_name.get(color)
+            if cid is None:
+                cid = color_id_by_name[color] = len(color_names)
+                color_names.append(color)
+            color_ids.append(cid)
+        color_offsets[i + 1] = len(color_ids)
+
+    sections = {
+        'string_offsets': np.array(strings.offsets, dtype=np.uint64),
+        'string_data': np.frombuffer(b''.join(strings.chunks), dtype=np.uint8),
+        'extras': extras,
+        'prices': prices,
+        'color_offsets': color_offsets,
+        'color_ids': np.array(color_ids, dtype=np.uint16),
+    }
+    for field, column in field_columns.items():
+        sections[f'field_{field}'] = column
+    # Görsel tanımlayıcılar (varsa) satır başına DESCRIPTOR_SIZE baytlık düz bir uint8 bölümüdür;
+    # tanımlayıcısı olmayan ürünlerin satırı sıfırdır. Ürün sözlüklerine eklenmezler.
+    descriptor_texts = [p.get('visual_descriptor') for p in products]
+    if any(descriptor_texts):
+        sections['descriptors'] = decode_descriptors(descriptor_texts).reshape(-1)
+
+    # Başlık boyutu ofsetlere bağlı olduğundan ofsetler başlıktan sonra gelen göreli konumlardır
+    header = {'count': n, 'fields': list(STRING_FIELDS), 'color_names': color_names, 'sections': {}}
+    offset = 0
+    for name, array in sections.items():
+        header['sections'][name] = [offset, array.dtype.str, len(array)]
+        offset += (array.nbytes + 7) // 8 * 8
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = (len(MAGIC) + 4 + len(header_bytes) + 7) // 8 * 8
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+        for name, array in sections.items():
+            f.write(array.tobytes())
+            f.write(b'\0' * ((8 - array.nbytes % 8) % 8))
+    os.replace(tmp_path, path) # Okuyucular hiçbir zaman yarım yazılmış dosya görmez
+
+class SnapshotCatalog(Sequence):
+    """
+    write_snapshot ile yazılmış dosyanın salt okunur görünümü. all_products listesinin yerine
+    kullanılabilir: catalog[i] ürün sözlüğünü mmap'teki sütunlardan o anda oluşturur.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} geçerli bir katalog anlık görüntüsü değil")
+        header_len = int(np.frombuffer(self._mmap, dtype=np.uint32, count=1, offset=len(MAGIC))[0])
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mmap[header_start:header_start + header_len].decode('utf-8'))
+        data_start = (header_start + header_len + 7) // 8 * 8
+
+        self.path = path
+        self.size = header['count']
+        self.fields = header['fields']
+        self.color_names = header['color_names']
+        self._sections = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=count, offset=data_start + offset)
+            for name, (offset, dtype, count) in header['sections'].items()
+        }
+        self._string_offsets = self._sections['string_offsets']
+        self._string_data = self._sections['string_data']
+        self.prices = self._sections['prices']
+        descriptors = self._sections.get('descriptors')
+        self.descriptors = descriptors.reshape(self.size, DESCRIPTOR_SIZE) if descriptors is not None else None
+        self._field_columns = [(field, self._sections[f'field_{field}']) for field in self.fields]
+
+    def get_string(self, sid):
+        start, end = self._string_offsets[sid], self._string_offsets[sid + 1]
+        return self._string_data[start:end].tobytes().decode('utf-8')
+
+    def get_colors(self, index):
+        start, end = self.color_offsets[index], self.color_offsets[index + 1]
+        return [self.color_names[cid] for cid in self._sections['color_ids'][start:end]]
+
+    @property
+    def color_offsets(self):
+        return self._sections['color_offsets']
+
+    def field_values(self, field, default=None):
+        # Bir metin alanının tüm ürünlerdeki değerleri; her farklı metin yalnızca bir kez çözülür
+        column = self._sections[f'field_{field}']
+        unique_sids, inverse = np.unique(column, return_inverse=True)
+        decoded = [default if sid == MISSING else self.get_string(sid) for sid in unique_sids]
+        return [decoded[k] for k in inverse.tolist()]
+
+    def colors_column(self):
+        names = self.color_names
+        color_ids = self._sections['color_ids'].tolist()
+        offsets = self.color_offsets.tolist()
+        return [[names[c] for c in color_ids[offsets[i]:offsets[i + 1]]] for i in range(self.size)]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        index = int(index)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        product = {}
+        for field, column in self._field_columns:
+            sid = column[index]
+            if sid != MISSING:
+                product[field] = self.get_string(sid)
+        extra_sid = self._sections['extras'][index]
+        if extra_sid != MISSING:
+            product.update(json.loads(self.get_string(extra_sid)))
+        price = float(self.prices[index])
+        product['price_value'] = None if math.isnan(price) else price
+        product['dominant_colors'] = self.get_colors(index)
+        return product
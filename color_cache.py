@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+class ImageColorCache:
+    """
+    Görsel URL'si ve içerik özeti (sha256) ile adreslenen disk önbelleği.
+    - urls:   image_url -> content_hash (aynı görsel farklı URL'lerde paylaşılabilir)
+    - images: content_hash -> küçültülmüş piksel dizisi (.npy), boyut, son erişim zamanı
+    - colors: (content_hash, method) -> merkezler ve renk adları
+    Toplam piksel boyutu max_bytes'ı aşarsa en uzun süredir kullanılmayan görsellerin pikselleri silinir (LRU).
+    urls ve colors satırları silinmez (bilerek sınırsız): görsel başına birkaç yüz baytlık bu satırlar
+    sayesinde pikselleri silinmiş bir görselin renkleri de indirme ve yeniden hesaplama olmadan bulunur.
+    Pikseller yalnızca başka bir yöntemle yeniden renk çıkarmak için gerekir. Sıfırlamak için dizin silinir.
+    """
+
+    def __init__(self, cache_dir='.color_cache', max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.pixels_dir = os.path.join(cache_dir, 'pixels')
+        self.max_bytes = max_bytes
+        os.makedirs(self.pixels_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (image_url TEXT PRIMARY KEY, content_hash TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS images (content_hash TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS colors (
+                content_hash TEXT NOT NULL, method TEXT NOT NULL,
+                centroids TEXT NOT NULL, color_names TEXT NOT NULL,
+                PRIMARY KEY (content_hash, method)
+            );
+            CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access);
+        """)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+        self.hits = 0
+        self.misses = 0 # Renkleri yeniden hesaplanmak zorunda kalınan görseller
+        self._evict() # max_bytes küçültülmüş olabilir
+        self.db.commit()
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def _pixels_path(self, content_hash):
+        return os.path.join(self.pixels_dir, f"{content_hash}.npy")
+
+    def _touch(self, content_hash):
+        self.db.execute("UPDATE images SET last_access = ? WHERE content_hash = ?", (time.time(), content_hash))
+
+    def hash_for_url(self, image_url):
+        row = self.db.execute("SELECT content_hash FROM urls WHERE image_url = ?", (image_url,)).fetchone()
+        return row[0] if row else None
+
+    def get_colors(self, content_hash, method):
+        row = self.db.execute(
+            "SELECT color_names FROM colors WHERE content_hash = ? AND method = ?", (content_hash, method)
+        ).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        self._touch(content_hash)
+        return json.loads(row[0])
+
+    def get_colors_for_url(self, image_url, method):
+        # İndirmeden önce denenir: URL daha önce görüldüyse içerik özeti üzerinden renkleri döndürür
+        content_hash = self.hash_for_url(image_url)
+        if content_hash is None:
+            return None
+        return self.get_colors(content_hash, method)
+
+    def get_pixels(self, content_hash):
+        try:
+            pixels = np.load(self._pixels_path(content_hash))
+        except (FileNotFoundError, ValueError):
+            return None
+        self._touch(content_hash)
+        return pixels
+
+    def put(self, image_url, content_hash, pixels, method, centroids, color_names):
+        now = time.time()
+        self.db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?)", (image_url, content_hash))
+        exists = self.db.execute("SELECT 1 FROM images WHERE content_hash = ?", (content_hash,)).fetchone()
+        if not exists and pixels is not None:
+            path = self._pixels_path(content_hash)
+            np.save(path, np.ascontiguousarray(pixels, dtype=np.uint8))
+            size = os.path.getsize(path)
+            self.db.execute("INSERT INTO images VALUES (?, ?, ?)", (content_hash, size, now))
+            self.total_bytes += size
+        known = self.db.execute(
+            "SELECT 1 FROM colors WHERE content_hash = ? AND method = ?", (content_hash, method)
+        ).fetchone()
+        if not known:
+            self.misses += 1
+        self.db.execute(
+            "INSERT OR REPLACE INTO colors VALUES (?, ?, ?, ?)",
+            (content_hash, method, json.dumps(np.asarray(centroids).tolist()), json.dumps(color_names, ensure_ascii=False)),
+        )
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            row = self.db.execute("SELECT content_hash, size FROM images ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            content_hash, size = row
+            self.db.execute("DELETE FROM images WHERE content_hash = ?", (content_hash,))
+            try:
+                os.remove(self._pixels_path(content_hash))
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+
+    def stats(self):
+        return f"Önbellek: {self.hits} isabet, {self.misses} ıskalama, {self.total_bytes / (1024 * 1024):.1f} MB"
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,24 @@
+import gc
+import os
+
+from prefork_server import get_default_workers
+
+# gunicorn ile çalıştırma: gunicorn -c gunicorn_conf.py
+# preload_app ile katalog ana süreçte bir kez yüklenir ve worker'lar fork sonrası onu paylaşır (bkz. wsgi.py).
+wsgi_app = 'wsgi:create_app()'
+bind = f"{os.environ.get('HOST', '127.0.0.1')}:{os.environ.get('PORT', '5000')}"
+preload_app = True
+workers = get_default_workers()
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', '4'))
+graceful_timeout = float(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+timeout = 60
+
+def when_ready(server):
+    # Worker'lar fork edilmeden önce: yüklenmiş nesneler çöp toplayıcının dışında kalır (bkz. prefork_server.py)
+    gc.freeze()
+
+def post_fork(server, worker):
+    # İş parçacıkları fork'ta kopyalanmaz; katalog izleyicisi her worker'da başlatılır
+    import recommendation_service
+    recommendation_service.start_catalog_watcher()
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+
+# Prometheus metin biçiminde (text exposition format) histogramlar. prometheus_client bağımlılığı
+# olmadan /metrics uç noktasının ihtiyacı kadarını karşılar: etiketli histogramlar ve sayaçlar.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (0, 1, 3, 10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+
+trace_logger = logging.getLogger('kombin.trace')
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+class Histogram:
+    """
+    Etiket değerleri başına kova sayaçları, toplam ve gözlem sayısı tutan histogram.
+    İş parçacığı güvenlidir; observe yalnızca bir kilit ve birkaç toplama yapar.
+    """
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series = {} # etiket değerleri -> [kova sayaçları, toplam, sayı]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for label_values, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, [('le', _format_bound(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return '\n'.join(lines)
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for label_values, value in snapshot:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return '\n'.join(lines)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+class RequestTrace:
+    """
+    Tek bir öneri hesaplamasının aşama süreleri ve aşama sonundaki aday sayıları.
+    mark(aşama, aday sayısı) bir önceki işaretten bu yana geçen süreyi o aşamaya yazar.
+    finish, ölçümleri histogramlara işler ve istenirse tek satırlık JSON olarak loglar.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = self._last = time.perf_counter()
+        self.stages = [] # (aşama, süre sn, aday sayısı veya None)
+
+    def mark(self, stage, candidates=None):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last, candidates))
+        self._last = now
+
+    def finish(self, stage_seconds, stage_candidates, log_structured=False, **fields):
+        total = time.perf_counter() - self.started
+        for stage, seconds, candidates in self.stages:
+            stage_seconds.observe(seconds, self.endpoint, stage)
+            if candidates is not None:
+                stage_candidates.observe(candidates, self.endpoint, stage)
+        if log_structured and trace_logger.isEnabledFor(logging.INFO):
+            trace_logger.info(json.dumps({
+                "endpoint": self.endpoint,
+                "total_ms": round(total * 1000, 3),
+                "stages": [
+                    {"stage": stage, "ms": round(seconds * 1000, 3), "candidates": candidates}
+                    for stage, seconds, candidates in self.stages
+                ],
+                **fields,
+            }, ensure_ascii=False))
+        return total
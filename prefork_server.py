@@ -0,0 +1,122 @@
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+# Yalnızca standart kütüphaneyle çok süreçli (pre-fork) WSGI sunucusu (POSIX). Uygulama ve katalog ana
+# süreçte bir kez yüklenir, ardından worker'lar fork edilir: katalog sayfaları copy-on-write paylaşılır
+# (ikili anlık görüntüde zaten tüm süreçlerin ortak mmap'idir). Tüm worker'lar aynı dinleyen soketi
+# kabul eder. gunicorn kuruluysa aynı düzen için gunicorn_conf.py kullanılabilir.
+logger = logging.getLogger('kombin.server')
+
+WORKER_RESTART_DELAY = 1.0 # Beklenmedik şekilde kapanan worker yeniden başlatılmadan önce beklenen süre
+POLL_INTERVAL = 0.5
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass # İstek logları servisin kendi metrik ve loglarında
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    # Her worker'da istek başına bir iş parçacığı; server_close devam eden istekleri bekler
+    daemon_threads = False
+    block_on_close = True
+
+def get_default_workers():
+    # Öneri hesaplaması CPU'ya bağlıdır ve GIL yüzünden bir süreç tek çekirdek kullanır: çekirdek başına bir worker
+    return int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+def _run_worker(server, on_worker_start):
+    # SIGTERM: yeni bağlantı kabul etmeyi bırak, devam eden istekleri bitir ve çık
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C'yi ana süreç yönetir
+    exit_code = 0
+    try:
+        if on_worker_start is not None:
+            on_worker_start()
+        server.serve_forever()
+        server.server_close()
+    except Exception:
+        logger.exception("Worker %d hatayla kapandı.", os.getpid())
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+def serve_prefork(app, host, port, workers, on_worker_start=None, graceful_timeout=30.0, on_ready=None):
+    """
+    app'i workers süreçle sunar; SIGTERM/SIGINT gelene kadar döner. Kapanan worker'lar yeniden başlatılır.
+    Kapanışta worker'lara SIGTERM gönderilir, graceful_timeout saniye içinde bitmeyenler SIGKILL ile kapatılır.
+    on_worker_start her worker'da fork'tan sonra çağrılır (ör. arka plan iş parçacıklarını başlatmak için;
+    iş parçacıkları fork'ta kopyalanmaz). on_ready, worker'lar başladıktan sonra pid listesiyle çağrılır.
+    """
+    server = make_server(host, port, app, server_class=ThreadingWSGIServer, handler_class=QuietRequestHandler)
+    server.socket.listen(1024)
+    # Fork öncesi mevcut tüm nesneler çöp toplayıcının dışında tutulur; toplama sırasında katalog
+    # nesnelerine dokunulup paylaşılan sayfaların worker'larda kopyalanmasının önüne geçer
+    gc.freeze()
+
+    children = set()
+    stopping = []
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            _run_worker(server, on_worker_start)
+        children.add(pid)
+
+    def reap(pid, flags=os.WNOHANG):
+        # Süreç bittiyse (veya zaten toplanmışsa) True; children'dan çıkarılır
+        try:
+            finished, status = os.waitpid(pid, flags)
+        except ChildProcessError:
+            finished, status = pid, 0
+        if finished:
+            children.discard(pid)
+        return finished, status
+
+    def request_stop(signum, frame):
+        stopping.append(signum)
+    previous_handlers = {sig: signal.signal(sig, request_stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    try:
+        for _ in range(workers):
+            spawn()
+        logger.info("%s:%d adresinde %d worker ile hizmet veriliyor (ana süreç %d).", host, port, workers, os.getpid())
+        if on_ready is not None:
+            on_ready([os.getpid()] + sorted(children))
+        while not stopping:
+            time.sleep(POLL_INTERVAL)
+            for pid in list(children):
+                finished, status = reap(pid)
+                if finished and not stopping:
+                    logger.warning("Worker %d kapandı (durum %d), yeniden başlatılıyor.", pid, status)
+                    time.sleep(WORKER_RESTART_DELAY)
+                    spawn()
+    finally:
+        logger.info("Kapanıyor: worker'ların devam eden istekleri bitirmesi bekleniyor (en fazla %.0f sn).",
+                    graceful_timeout)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + graceful_timeout
+        while children and time.monotonic() < deadline:
+            for pid in list(children):
+                reap(pid)
+            time.sleep(0.1)
+        for pid in list(children):
+            logger.warning("Worker %d zamanında kapanmadı, sonlandırılıyor.", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            reap(pid, 0)
+        server.server_close()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
@@ -1,70 +1,263 @@
+import argparse
 import json
 import cv2
 import numpy as np
 import requests
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from io import BytesIO
 from PIL import Image
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 import os
 
+from catalog_delta import (DELTA_FILE, append_delta, apply_deltas, diff_products, get_product_url, make_delta,
+                           read_deltas)
+from catalog_snapshot import write_snapshot
+from product_catalog import parse_price
+from visual_index import DESCRIPTOR_SIZE, encode_descriptor
+from color_cache import ImageColorCache
+
+INPUT_FILE = 'trendyol_multi_category_products.json'
+OUTPUT_FILE = 'products_with_colors.json'
+# Servisin hızlı açılışı için OUTPUT_FILE ile birlikte yazılan ikili anlık görüntü (catalog_snapshot.py)
+SNAPSHOT_FILE = 'products_with_colors.snapshot'
+# Pipeline modunda her tamamlanan ürün bu dosyaya bir satır olarak eklenir (kaldığı yerden devam için)
+CHECKPOINT_FILE = 'products_with_colors.checkpoint.jsonl'
+
+# İsimli renk paleti: çıkarılan renkler bu 16 renkten birine eşlenir
+PALETTE = {
+    "kırmızı": (255, 0, 0), "yeşil": (0, 128, 0), "mavi": (0, 0, 255),
+    "sarı": (255, 255, 0), "beyaz": (255, 255, 255), "siyah": (0, 0, 0),
+    "turuncu": (255, 165, 0), "mor": (128, 0, 128), "pembe": (255, 192, 203),
+    "kahverengi": (165, 42, 42), "gri": (128, 128, 128), "bej": (245, 245, 220),
+    "lacivert": (0, 0, 128), "bordo": (128, 0, 0), "haki": (107, 142, 35),
+    "krem": (255, 253, 208),
+}
+
+PALETTE_NAMES = list(PALETTE)
+PALETTE_RGB = np.array([PALETTE[name] for name in PALETTE_NAMES], dtype=np.int32)
+
+# Toplu eşleme için 64x64x64 arama tablosu: her kanalın üst 6 biti -> en yakın palet rengi indeksi.
+# İlk kullanımda bir kez oluşturulur (~256 KB); tam eşlemeyle uyumu ~%98'dir.
+COLOR_LUT_BITS = 6
+_color_lut = None
+
+def _nearest_palette_indices(rgb_array):
+    # Karesel Öklid uzaklığı; eşitlikte paletteki ilk renk seçilir (eski döngüyle aynı)
+    rgb_array = np.asarray(rgb_array, dtype=np.int32).reshape(-1, 3)
+    distances = ((rgb_array[:, None, :] - PALETTE_RGB[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+def _get_color_lut():
+    global _color_lut
+    if _color_lut is None:
+        levels = 1 << COLOR_LUT_BITS
+        step = 256 // levels
+        centers = np.arange(levels) * step + (step - 1) // 2
+        grid = np.stack(np.meshgrid(centers, centers, centers, indexing='ij'), axis=-1).reshape(-1, 3)
+        _color_lut = _nearest_palette_indices(grid).astype(np.uint8)
+    return _color_lut
+
+def rgb_to_color_indices(pixels, exact=False):
+    # (N, 3) uint8 dizisini tek seferde PALETTE_NAMES indekslerine eşler
+    pixels = np.asarray(pixels).reshape(-1, 3)
+    if exact:
+        return _nearest_palette_indices(pixels).astype(np.uint8)
+    shift = 8 - COLOR_LUT_BITS
+    q = pixels.astype(np.uint32) >> shift
+    return _get_color_lut()[(q[:, 0] << (2 * COLOR_LUT_BITS)) | (q[:, 1] << COLOR_LUT_BITS) | q[:, 2]]
+
+def rgb_to_color_names(pixels, exact=False):
+    return [PALETTE_NAMES[i] for i in rgb_to_color_indices(pixels, exact)]
+
 def rgb_to_color_name(rgb_tuple):
-    colors = {
-        "kırmızı": (255, 0, 0), "yeşil": (0, 128, 0), "mavi": (0, 0, 255),
-        "sarı": (255, 255, 0), "beyaz": (255, 255, 255), "siyah": (0, 0, 0),
-        "turuncu": (255, 165, 0), "mor": (128, 0, 128), "pembe": (255, 192, 203),
-        "kahverengi": (165, 42, 42), "gri": (128, 128, 128), "bej": (245, 245, 220),
-        "lacivert": (0, 0, 128), "bordo": (128, 0, 0), "haki": (107, 142, 35),
-        "krem": (255, 253, 208),
-    }
-    min_distance = float('inf')
-    closest_color_name = "bilinmeyen"
     if isinstance(rgb_tuple, (list, tuple, np.ndarray)) and len(rgb_tuple) == 3:
-        r, g, b = int(rgb_tuple[0]), int(rgb_tuple[1]), int(rgb_tuple[2])
-        for name, (cr, cg, cb) in colors.items():
-            distance = np.sqrt((r - cr)**2 + (g - cg)**2 + (b - cb)**2)
-            if distance < min_distance:
-                min_distance = distance
-                closest_color_name = name
+        rgb = [int(rgb_tuple[0]), int(rgb_tuple[1]), int(rgb_tuple[2])]
+        return PALETTE_NAMES[_nearest_palette_indices(rgb)[0]]
+    return "hata"
+
+def download_image_bytes(image_url):
+    response = requests.get(image_url, timeout=15)
+    response.raise_for_status()
+    return response.content
+
+def decode_image_pixels(content, max_dim=200):
+    # Görseli çözer, en fazla max_dim boyutuna küçültür ve (N, 3) uint8 piksel dizisi döndürür
+    image = Image.open(BytesIO(content))
+    image_np = np.array(image.convert('RGB'))
+    if image_np is None or image_np.size == 0: return None
+    h, w, _ = image_np.shape
+    if h > max_dim or w > max_dim:
+        if h > w:
+            new_h, new_w = max_dim, int(w * (max_dim / h))
+        else:
+            new_w, new_h = max_dim, int(h * (max_dim / w))
+        image_np = cv2.resize(image_np, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return image_np.reshape((-1, 3))
+
+def download_image_pixels(image_url, max_dim=200):
+    return decode_image_pixels(download_image_bytes(image_url), max_dim)
+
+# Renk çıkarım yöntemleri:
+# - kmeans:      tüm pikseller üzerinde KMeans(n_init=10) (varsayılan, eski davranış)
+# - kmeans_fast: alt örneklenmiş pikseller üzerinde tek başlangıçlı k-means++
+# - minibatch:   alt örneklenmiş pikseller üzerinde MiniBatchKMeans
+# - histogram:   her pikseli en yakın isimli renge eşleyip en sık görülen renkleri seçer
+COLOR_METHODS = ("kmeans", "kmeans_fast", "minibatch", "histogram")
+FAST_SAMPLE_SIZE = 4000      # kmeans_fast/minibatch için en fazla piksel sayısı
+HISTOGRAM_MIN_SHARE = 0.05   # histogram modunda bir rengin seçilmesi için gereken en az piksel oranı
+
+def get_color_method_key(num_colors=5, method="kmeans"):
+    # Önbellekte renk sonuçlarını ayırt eden çıkarım yöntemi anahtarı
+    return f"{method}{num_colors}"
+
+def _subsample_pixels(pixels, sample_size=FAST_SAMPLE_SIZE):
+    if len(pixels) <= sample_size:
+        return pixels
+    rng = np.random.default_rng(42)
+    return pixels[rng.choice(len(pixels), sample_size, replace=False)]
+
+def _centroid_color_names(centroids):
+    # Merkez sayısı az olduğundan tam (tablosuz) eşleme kullanılır
+    return list(set(rgb_to_color_names(centroids, exact=True)))
+
+def _extract_colors_histogram(pixels, num_colors):
+    counts = np.bincount(rgb_to_color_indices(pixels), minlength=len(PALETTE_NAMES))
+    order = np.argsort(counts)[::-1][:num_colors]
+    selected = [i for i in order if counts[i] >= HISTOGRAM_MIN_SHARE * len(pixels)]
+    return PALETTE_RGB[selected], [PALETTE_NAMES[i] for i in selected]
+
+def extract_colors(pixels, num_colors=5, method="kmeans"):
+    # (merkezler, renk adları) döndürür; merkezler önbelleğe de yazılır
+    if np.isnan(pixels).any() or np.isinf(pixels).any(): return [], []
+    if method == "histogram":
+        return _extract_colors_histogram(pixels, num_colors)
+    if method == "kmeans_fast":
+        model = KMeans(n_clusters=num_colors, random_state=42, n_init=1, init="k-means++")
+        model.fit(_subsample_pixels(pixels))
+    elif method == "minibatch":
+        model = MiniBatchKMeans(n_clusters=num_colors, random_state=42, n_init=1, batch_size=1024)
+        model.fit(_subsample_pixels(pixels))
     else:
-        return "hata"
-    return closest_color_name
+        model = KMeans(n_clusters=num_colors, random_state=42, n_init=10)
+        model.fit(pixels)
+    dominant_rgb_colors = model.cluster_centers_.astype(int)
+    return dominant_rgb_colors, _centroid_color_names(dominant_rgb_colors)
+
+def get_dominant_colors_from_pixels(pixels, num_colors=5, method="kmeans"):
+    return extract_colors(pixels, num_colors, method)[1]
+
+# Görsel benzerlik araması için ürün başına tanımlayıcı: pikseller LAB uzayında L x a x b = 4 x 8 x 8
+# kutuya nicelenir, histogramın karekökü 0-255 aralığına ölçeklenip uint8 olarak saklanır
+# (visual_index.py). Ürüne base64 metin olarak visual_descriptor alanında yazılır.
+LAB_HISTOGRAM_BINS = (4, 8, 8)
+VISUAL_DESCRIPTOR_KEY = "labhist" # Önbellekte tanımlayıcıların renk yöntemi anahtarı
 
-def get_dominant_colors_from_image_url(image_url, num_colors=5):
+def compute_visual_descriptor(pixels):
+    lab = cv2.cvtColor(np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, 1, 3), cv2.COLOR_RGB2LAB).reshape(-1, 3)
+    l_bins, a_bins, b_bins = LAB_HISTOGRAM_BINS
+    # OpenCV'nin uint8 LAB değerleri üç kanalda da 0-255 aralığındadır
+    q = lab.astype(np.uint32)
+    bins = ((q[:, 0] * l_bins) >> 8) * (a_bins * b_bins) + ((q[:, 1] * a_bins) >> 8) * b_bins + ((q[:, 2] * b_bins) >> 8)
+    histogram = np.bincount(bins, minlength=DESCRIPTOR_SIZE).astype(np.float64)
+    return np.round(255 * np.sqrt(histogram / max(len(bins), 1))).astype(np.uint8)
+
+def extract_features(pixels, num_colors=5, method="kmeans"):
+    # (merkezler, renk adları, base64 görsel tanımlayıcı); pipeline modunda süreç havuzunda çalışır
+    centroids, colors = extract_colors(pixels, num_colors, method)
+    return centroids, colors, encode_descriptor(compute_visual_descriptor(pixels))
+
+def get_dominant_colors_from_image_url(image_url, num_colors=5, cache=None, method="kmeans"):
+    return get_image_features_from_url(image_url, num_colors, cache, method)[0]
+
+def get_image_features_from_url(image_url, num_colors=5, cache=None, method="kmeans"):
+    # (renk adları, base64 görsel tanımlayıcı veya None) döndürür
     try:
-        response = requests.get(image_url, timeout=15)
-        response.raise_for_status()
-        image = Image.open(BytesIO(response.content))
-        image_np = np.array(image.convert('RGB'))
-        if image_np is None or image_np.size == 0: return []
-        max_dim = 200
-        h, w, _ = image_np.shape
-        if h > max_dim or w > max_dim:
-            if h > w:
-                new_h, new_w = max_dim, int(w * (max_dim / h))
-            else:
-                new_w, new_h = max_dim, int(h * (max_dim / w))
-            image_np = cv2.resize(image_np, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        pixels = image_np.reshape((-1, 3))
-        if np.isnan(pixels).any() or np.isinf(pixels).any(): return []
-        kmeans = KMeans(n_clusters=num_colors, random_state=42, n_init=10)
-        kmeans.fit(pixels)
-        dominant_rgb_colors = kmeans.cluster_centers_.astype(int)
-        dominant_color_names = [rgb_to_color_name(color_rgb) for color_rgb in dominant_rgb_colors]
-        return list(set(c for c in dominant_color_names if c not in ["bilinmeyen", "hata"]))
+        if cache is None:
+            pixels = download_image_pixels(image_url)
+            if pixels is None: return [], None
+            return extract_features(pixels, num_colors, method)[1:]
+
+        # Tanımlayıcılar da önbellekte, renklerin yanında ayrı bir yöntem anahtarıyla saklanır
+        method_key = get_color_method_key(num_colors, method)
+        colors = cache.get_colors_for_url(image_url, method_key)
+        descriptor = cache.get_colors_for_url(image_url, VISUAL_DESCRIPTOR_KEY)
+        if colors is not None and descriptor is not None:
+            return colors, descriptor
+        # URL biliniyor ama bu yöntemle hesaplanmamışsa önbellekteki pikselleri kullan
+        content_hash = cache.hash_for_url(image_url)
+        pixels = cache.get_pixels(content_hash) if content_hash else None
+        if pixels is None:
+            content = download_image_bytes(image_url)
+            content_hash = cache.content_hash(content)
+            colors = cache.get_colors(content_hash, method_key)
+            descriptor = cache.get_colors(content_hash, VISUAL_DESCRIPTOR_KEY)
+            if colors is not None and descriptor is not None:
+                cache.put(image_url, content_hash, None, method_key, [], colors)
+                return colors, descriptor
+            pixels = decode_image_pixels(content)
+            if pixels is None: return [], None
+        if colors is None:
+            centroids, colors = extract_colors(pixels, num_colors, method)
+            cache.put(image_url, content_hash, pixels, method_key, centroids, colors)
+        if descriptor is None:
+            descriptor = encode_descriptor(compute_visual_descriptor(pixels))
+            cache.put(image_url, content_hash, pixels, VISUAL_DESCRIPTOR_KEY, [], descriptor)
+        return colors, descriptor
     except Exception as e:
         print(f"\n[Hata] URL işlenemedi: {image_url} - Sebep: {e}")
-        return []
+        return [], None
 
-def preprocess_products():
-    input_file = 'trendyol_multi_category_products.json'
-    output_file = 'products_with_colors.json'
-    
+def add_price_value(product):
+    # Türkçe biçimli metin fiyat ("2.190", "671,12") bir kez sayıya çevrilir; servis filtre ve
+    # sıralamada bu alanı kullanır. Ayrıştırılamayan fiyatlar None olur.
+    price = parse_price(product.get('price'))
+    product['price_value'] = None if np.isnan(price) else price
+    return product
+
+def load_input_products(input_file):
     try:
         with open(input_file, 'r', encoding='utf-8') as f:
             products = json.load(f)
         print(f"'{input_file}' dosyasından {len(products)} ürün yüklendi.")
+        return products
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"HATA: '{input_file}' dosyası okunamadı: {e}")
+        return None
+
+def save_enriched_products(enriched_products, output_file):
+    # Yeni temel dosyalar önce yan dosyalara yazılır. Bekleyen delta kayıtları temel dosyalar yerine
+    # konmadan önce silinir: arada kesilirse servis eski kataloğu görür, deltaları yeni temele tekrar uygulamaz.
+    json_tmp_path = output_file + '.tmp'
+    snapshot_new_path = SNAPSHOT_FILE + '.new'
+    try:
+        with open(json_tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(enriched_products, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+    except IOError as e:
+        print(f"HATA: '{output_file}' dosyasına yazılırken bir sorun oluştu: {e}")
+        return
+    try:
+        write_snapshot(enriched_products, snapshot_new_path)
+    except IOError as e:
+        print(f"HATA: '{SNAPSHOT_FILE}' dosyasına yazılırken bir sorun oluştu: {e}")
+        snapshot_new_path = None # Eski anlık görüntü JSON'dan eski kalır; servis JSON'u kullanır
+    # Temel dosyalar artık güncel; bekleyen delta kayıtları tekrar uygulanmamalı
+    if os.path.exists(DELTA_FILE):
+        os.remove(DELTA_FILE)
+    os.replace(json_tmp_path, output_file) # Servis hiçbir zaman yarım yazılmış JSON okumaz
+    print(f"Başarılı: Zenginleştirilmiş ürün verisi '{output_file}' dosyasına kaydedildi.")
+    if snapshot_new_path is not None:
+        os.replace(snapshot_new_path, SNAPSHOT_FILE)
+        print(f"İkili katalog anlık görüntüsü '{SNAPSHOT_FILE}' dosyasına kaydedildi.")
+
+def preprocess_products(cache=None, color_method="kmeans"):
+    input_file = INPUT_FILE
+    output_file = OUTPUT_FILE
+    
+    products = load_input_products(input_file)
+    if products is None:
         return
 
     enriched_products = []
@@ -74,12 +267,14 @@ def preprocess_products():
     
     for i, product in enumerate(products):
         image_url = product.get('image_url')
-        product_id = product.get('product_url', f"index_{i}")
+        product_id = get_product_key(product, i)
         
+        add_price_value(product)
         if image_url:
-            product['dominant_colors'] = get_dominant_colors_from_image_url(image_url)
+            product['dominant_colors'], product['visual_descriptor'] = get_image_features_from_url(
+                image_url, cache=cache, method=color_method)
         else:
-            product['dominant_colors'] = []
+            product['dominant_colors'], product['visual_descriptor'] = [], None
             
         enriched_products.append(product)
         
@@ -87,13 +282,291 @@ def preprocess_products():
         print(f"\rİşleniyor: {i + 1}/{total_products} (%{progress:.2f})", end="")
 
     print("\n\nRenk analizi tamamlandı.")
+    if cache is not None:
+        print(cache.stats())
+
+    save_enriched_products(enriched_products, output_file)
+
+# --- PIPELINE MODU: eşzamanlı indirme + süreç havuzunda kümeleme + artımlı checkpoint ---
 
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.done = 0
+        self.failed = 0
+        self.started_at = None
+
+    def mark(self, ok=True):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    def rate(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return (self.done + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return f"{self.name}: {self.rate():.2f} görsel/sn ({self.done} tamam, {self.failed} hata)"
+
+def get_product_key(product, index):
+    # Bağlantısı olmayan kartlarda kazıyıcı 'N/A' yazar; bu ürünler tek bir kontrol noktası kaydını paylaşmasın
+    return get_product_url(product) or f"index_{index}"
+
+def load_checkpoint(checkpoint_file):
+    # product_url -> {"image_url": ..., "dominant_colors": [...]}
+    done = {}
+    if not os.path.exists(checkpoint_file):
+        return done
+    with open(checkpoint_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # Çökme anında yarım yazılmış son satır
+            done[record['product_url']] = record
+    return done
+
+def _download_for_pipeline(image_url):
+    # (içerik özeti, pikseller) döndürür; hata durumunda (None, None)
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(enriched_products, f, ensure_ascii=False, indent=2)
-        print(f"Başarılı: Zenginleştirilmiş ürün verisi '{output_file}' dosyasına kaydedildi.")
-    except IOError as e:
-        print(f"HATA: '{output_file}' dosyasına yazılırken bir sorun oluştu: {e}")
+        content = download_image_bytes(image_url)
+        return ImageColorCache.content_hash(content), decode_image_pixels(content)
+    except Exception as e:
+        print(f"[Hata] Görsel indirilemedi: {image_url} - Sebep: {e}")
+        return None, None
+
+def preprocess_products_pipeline(download_workers=16, cluster_workers=None, max_in_flight=64,
+                                 report_interval=5.0, checkpoint_file=CHECKPOINT_FILE, cache=None,
+                                 color_method="kmeans"):
+    products = load_input_products(INPUT_FILE)
+    if products is None:
+        return
+
+    method_key = get_color_method_key(method=color_method)
+    checkpoint = load_checkpoint(checkpoint_file)
+    features_by_key = {} # key -> (renk adları, görsel tanımlayıcı)
+    todo = []
+    for i, product in enumerate(products):
+        key = get_product_key(product, i)
+        image_url = product.get('image_url')
+        record = checkpoint.get(key)
+        # Görsel tanımlayıcısı olmayan eski checkpoint kayıtları yeniden işlenir
+        if (record is not None and record.get('image_url') == image_url
+                and record.get('method', get_color_method_key()) == method_key
+                and 'visual_descriptor' in record):
+            features_by_key[key] = (record['dominant_colors'], record['visual_descriptor'])
+        elif not image_url:
+            features_by_key[key] = ([], None)
+        else:
+            todo.append((key, image_url))
+    print(f"{len(features_by_key)} ürün checkpoint'ten alındı, {len(todo)} ürün işlenecek.")
+
+    download_stats = StageStats("İndirme")
+    cluster_stats = StageStats("Kümeleme")
+    last_report = time.monotonic()
+    todo_iter = iter(todo)
+    downloads = {}
+    clusterings = {}
+
+    with ThreadPoolExecutor(max_workers=download_workers) as download_pool, \
+            ProcessPoolExecutor(max_workers=cluster_workers) as cluster_pool, \
+            open(checkpoint_file, 'a', encoding='utf-8') as checkpoint_out:
+
+        def finish(key, image_url, colors, descriptor):
+            features_by_key[key] = (colors, descriptor)
+            checkpoint_out.write(json.dumps(
+                {"product_url": key, "image_url": image_url, "method": method_key, "dominant_colors": colors,
+                 "visual_descriptor": descriptor},
+                ensure_ascii=False) + "\n")
+            checkpoint_out.flush()
+
+        def submit_clustering(key, image_url, content_hash, pixels):
+            future = cluster_pool.submit(extract_features, pixels, 5, color_method)
+            clusterings[future] = (key, image_url, content_hash, pixels)
+
+        def fill_downloads():
+            # Bellekte bekleyen piksel dizilerini sınırlamak için toplam iş sayısını max_in_flight ile kısıtla
+            while len(downloads) + len(clusterings) < max_in_flight:
+                item = next(todo_iter, None)
+                if item is None:
+                    return
+                key, image_url = item
+                if cache is not None:
+                    colors = cache.get_colors_for_url(image_url, method_key)
+                    descriptor = cache.get_colors_for_url(image_url, VISUAL_DESCRIPTOR_KEY)
+                    if colors is not None and descriptor is not None:
+                        finish(key, image_url, colors, descriptor)
+                        continue
+                    content_hash = cache.hash_for_url(image_url)
+                    pixels = cache.get_pixels(content_hash) if content_hash else None
+                    if pixels is not None:
+                        submit_clustering(key, image_url, content_hash, pixels)
+                        continue
+                downloads[download_pool.submit(_download_for_pipeline, image_url)] = item
+
+        fill_downloads()
+        while downloads or clusterings:
+            finished, _ = wait(list(downloads) + list(clusterings), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in downloads:
+                    key, image_url = downloads.pop(future)
+                    content_hash, pixels = future.result()
+                    download_stats.mark(ok=pixels is not None)
+                    if pixels is None:
+                        features_by_key[key] = ([], None) # Checkpoint'e yazılmaz; sonraki çalıştırmada tekrar denenir
+                        continue
+                    if cache is not None:
+                        # Aynı görsel başka bir URL ile daha önce işlenmiş olabilir
+                        colors = cache.get_colors(content_hash, method_key)
+                        descriptor = cache.get_colors(content_hash, VISUAL_DESCRIPTOR_KEY)
+                        if colors is not None and descriptor is not None:
+                            cache.put(image_url, content_hash, None, method_key, [], colors)
+                            finish(key, image_url, colors, descriptor)
+                            continue
+                    submit_clustering(key, image_url, content_hash, pixels)
+                else:
+                    key, image_url, content_hash, pixels = clusterings.pop(future)
+                    try:
+                        centroids, colors, descriptor = future.result()
+                        cluster_stats.mark()
+                    except Exception as e:
+                        print(f"[Hata] Renkler çıkarılamadı: {image_url} - Sebep: {e}")
+                        features_by_key[key] = ([], None)
+                        cluster_stats.mark(ok=False)
+                        continue
+                    if cache is not None:
+                        cache.put(image_url, content_hash, pixels, method_key, centroids, colors)
+                        cache.put(image_url, content_hash, pixels, VISUAL_DESCRIPTOR_KEY, [], descriptor)
+                    finish(key, image_url, colors, descriptor)
+            fill_downloads()
+
+            now = time.monotonic()
+            if now - last_report >= report_interval:
+                print(f"{download_stats.summary()} | {cluster_stats.summary()}")
+                last_report = now
+
+    print(f"Renk analizi tamamlandı. {download_stats.summary()} | {cluster_stats.summary()}")
+    if cache is not None:
+        print(cache.stats())
+
+    enriched_products = []
+    for i, product in enumerate(products):
+        add_price_value(product)
+        product['dominant_colors'], product['visual_descriptor'] = features_by_key.get(
+            get_product_key(product, i), ([], None))
+        enriched_products.append(product)
+    save_enriched_products(enriched_products, OUTPUT_FILE)
+
+# --- ARTIMLI MOD: yalnızca yeni/değişen ürünler işlenir, fark delta dosyasına eklenir ---
+
+def load_current_products():
+    # Servisin gördüğü katalog: temel dosya + bekleyen delta kayıtları
+    products = load_input_products(OUTPUT_FILE)
+    if products is None:
+        return None
+    deltas, _ = read_deltas(DELTA_FILE)
+    if deltas:
+        products = apply_deltas(products, deltas)
+        print(f"{len(deltas)} delta kaydı uygulandı, güncel katalogda {len(products)} ürün var.")
+    return products
+
+def preprocess_products_incremental(cache=None, color_method="kmeans"):
+    scraped = load_input_products(INPUT_FILE)
+    if scraped is None:
+        return
+    previous = load_current_products()
+    if previous is None:
+        print("Mevcut katalog bulunamadı, tam renk analizi yapılıyor.")
+        preprocess_products(cache=cache, color_method=color_method)
+        return
+
+    diff = diff_products(previous, scraped)
+    print(f"Yeni: {len(diff['new'])}, değişen: {len(diff['changed'])}, silinen: {len(diff['removed'])}"
+          f" (URL'siz, eşlenemeyen: {diff['untracked']})")
+    if diff['untracked']:
+        # Deltalar product_url ile eşlendiğinden URL'siz ürünler artımlı modda kataloğa eklenemez
+        print(f"UYARI: {diff['untracked']} kazınmış ürünün URL'si yok ve artımlı modda kataloğa eklenmedi. "
+              f"Bu ürünleri de işlemek için tam bir çalıştırma (--incremental olmadan) gerekir.")
+
+    # Renk analizi yalnızca yeni ürünlerde ve görseli değişen ürünlerde yapılır
+    upserts = []
+    changes = []
+    todo = [(product, None) for product in diff['new']] # (ürün, korunacak (renkler, tanımlayıcı) veya None)
+    for old, product, fields in diff['changed']:
+        changes.append({"product_url": product['product_url'], "fields": fields})
+        if 'image_url' in fields:
+            todo.append((product, None))
+        else:
+            todo.append((product, (old.get('dominant_colors', []), old.get('visual_descriptor'))))
+    recolored = sum(1 for _, features in todo if features is None)
+    print(f"{recolored} görselin renk analizi yapılacak.")
+    done = 0
+    for product, features in todo:
+        product = add_price_value(dict(product))
+        if features is None:
+            image_url = product.get('image_url')
+            features = get_image_features_from_url(image_url, cache=cache, method=color_method) if image_url else ([], None)
+            done += 1
+            print(f"\rİşleniyor: {done}/{recolored}", end="")
+        product['dominant_colors'], product['visual_descriptor'] = features
+        upserts.append(product)
+    if recolored:
+        print()
+    if cache is not None:
+        print(cache.stats())
+
+    if not upserts and not diff['removed']:
+        print("Katalogda değişiklik yok, delta yazılmadı.")
+        return
+    delta = make_delta(upserts, diff['removed'], changes)
+    append_delta(DELTA_FILE, delta)
+    print(f"Delta '{DELTA_FILE}' dosyasına eklendi: {delta['stats']}")
+
+def compact_deltas():
+    # Bekleyen delta kayıtlarını temel dosyalara (JSON + anlık görüntü) işler ve delta dosyasını siler
+    products = load_current_products()
+    if products is not None:
+        save_enriched_products(products, OUTPUT_FILE)
 
 if __name__ == '__main__':
-    preprocess_products() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ürün görsellerinden baskın renkleri çıkarır.")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Eşzamanlı, checkpoint'li pipeline modunda çalıştır")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Yalnızca yeni/değişen ürünleri işle ve farkı delta dosyasına ekle")
+    parser.add_argument('--compact', action='store_true',
+                        help="Bekleyen delta kayıtlarını temel katalog dosyalarına işle")
+    parser.add_argument('--download-workers', type=int, default=16)
+    parser.add_argument('--cluster-workers', type=int, default=None,
+                        help="Kümeleme süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument('--cache-dir', default='.color_cache',
+                        help="Görsel/renk önbelleği dizini")
+    parser.add_argument('--cache-max-mb', type=int, default=1024)
+    parser.add_argument('--no-cache', action='store_true', help="Disk önbelleğini kullanma")
+    parser.add_argument('--color-method', choices=COLOR_METHODS, default="kmeans",
+                        help="Renk çıkarım yöntemi (hız/doğruluk karşılaştırması için benchmark_color_extraction.py)")
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_deltas()
+    else:
+        cache = None
+        if not args.no_cache:
+            cache = ImageColorCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+        try:
+            if args.incremental:
+                preprocess_products_incremental(cache=cache, color_method=args.color_method)
+            elif args.pipeline:
+                preprocess_products_pipeline(download_workers=args.download_workers,
+                                             cluster_workers=args.cluster_workers, cache=cache,
+                                             color_method=args.color_method)
+            else:
+                preprocess_products(cache=cache, color_method=args.color_method)
+        finally:
+            if cache is not None:
+                cache.close()
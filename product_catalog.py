@@ -0,0 +1,350 @@
+import bisect
+import heapq
+import json
+import logging
+import math
+import re
+import time
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+def parse_price(price_text):
+    # Trendyol fiyatları Türkçe formatta gelir: "2.190" -> 2190.0, "671,12" -> 671.12
+    if isinstance(price_text, (int, float)):
+        return float(price_text)
+    if not isinstance(price_text, str):
+        return float('nan')
+    cleaned = price_text.replace('TL', '').replace(' ', '').replace('.', '').replace(',', '.')
+    try:
+        return float(cleaned)
+    except ValueError:
+        return float('nan')
+
+def get_product_price(product):
+    # preprocess_products.py fiyatı bir kez ayrıştırıp price_value alanına yazar (ayrıştırılamazsa None);
+    # bu alanı içermeyen eski dosyalarda metin fiyat burada ayrıştırılır
+    price_value = product.get('price_value')
+    if price_value is not None:
+        return float(price_value)
+    if 'price_value' in product:
+        return float('nan')
+    return parse_price(product.get('price'))
+
+def get_product_prices(products):
+    if hasattr(products, 'prices'):
+        return products.prices.tolist() # Anlık görüntüde fiyatlar zaten ayrıştırılmış
+    return [get_product_price(p) for p in products]
+
+def product_field_values(products, field, default=None):
+    # Ürünlerin bir alanını sütun olarak döndürür; SnapshotCatalog gibi sütunlu kaynaklarda sözlük oluşturmaz
+    if hasattr(products, 'field_values'):
+        return products.field_values(field, default)
+    return [p.get(field, default) for p in products]
+
+def product_colors_column(products):
+    if hasattr(products, 'colors_column'):
+        return products.colors_column()
+    return [p.get('dominant_colors', []) for p in products]
+
+class CatalogView(Sequence):
+    """
+    Sütunlu bir kök katalog (SnapshotCatalog) üzerinde salt okunur ürün görünümü. rows[i] ya kök katalogdaki
+    satır sırası ya da (ör. deltadan gelen) bir ürün sözlüğüdür; kök satırlar mmap'te kalır ve sözlükleri
+    yalnızca erişildiğinde oluşturulur. Deltalar (catalog_delta.py) ve parça seçimi (catalog_shards.py)
+    görünümleri iç içe değil, her zaman kök katalog üzerinde kurar (bkz. get_view_rows).
+    descriptors: görünüm sırasıyla görsel tanımlayıcı matrisi veya None.
+    """
+
+    def __init__(self, base, rows, descriptors=None):
+        self.base = base
+        self.rows = rows
+        self.descriptors = descriptors
+        if hasattr(base, 'prices'):
+            import numpy as np # Sütunlu kök katalog numpy ile okunur
+            prices = np.empty(len(rows), dtype=np.float64)
+            base_positions = [i for i, row in enumerate(rows) if isinstance(row, int)]
+            prices[base_positions] = base.prices[[rows[i] for i in base_positions]]
+            for i, row in enumerate(rows):
+                if not isinstance(row, int):
+                    prices[i] = get_product_price(row)
+            self.prices = prices
+
+    def field_values(self, field, default=None):
+        values = product_field_values(self.base, field, default)
+        return [values[row] if isinstance(row, int) else row.get(field, default) for row in self.rows]
+
+    def colors_column(self):
+        colors = product_colors_column(self.base)
+        return [colors[row] if isinstance(row, int) else row.get('dominant_colors', []) for row in self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = self.rows[index]
+        return self.base[row] if isinstance(row, int) else row
+
+def get_view_rows(products):
+    # (kök katalog, satırlar); görünüm değilse ürünlerin kendisi ve sıraları
+    if isinstance(products, CatalogView):
+        return products.base, products.rows
+    return products, range(len(products))
+
+def compile_keyword_matcher(keywords):
+    # Anahtar kelimelerden herhangi birini arayan tek bir regex (iç içe any(... in ...) yerine)
+    if not keywords:
+        return None
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+def get_rule_tables_fingerprint(tag_tables):
+    return hash(json.dumps(tag_tables, sort_keys=True, ensure_ascii=False))
+
+class ProductCatalog:
+    """
+    Ürün listesi ve ondan türetilen tüm indekslerin değişmez bir sürümü.
+    Ürünler, products içindeki sıralarıyla (id) adreslenir. Yeniden yüklemede yeni bir
+    ProductCatalog arka planda oluşturulur ve servis tek bir atamayla ona geçer; böylece
+    bir istek hiçbir zaman yarım oluşturulmuş indeksleri görmez.
+    """
+
+    def __init__(self, products, complementary_rules, tag_tables, use_columnar_store=False,
+                 previous=None, version=1, delta_offset=0):
+        self.products = products
+        self.version = version
+        self.delta_offset = delta_offset # Delta dosyasında bu sürüme uygulanmış kayıtların bittiği bayt
+        self.loaded_at = time.time()
+        self.complementary_rules = complementary_rules
+        self._build_indexes()
+        self._build_tags(tag_tables, previous)
+        self.store = self._build_store() if use_columnar_store else None
+        self.visual_index = self._build_visual_index(previous)
+
+    def __len__(self):
+        return len(self.products)
+
+    # Ürün alanlarını sütun olarak okur; ikili anlık görüntüde ürün sözlükleri oluşturulmaz
+    def field_values(self, field, default=None):
+        return product_field_values(self.products, field, default)
+
+    def colors_column(self):
+        return product_colors_column(self.products)
+
+    def _build_indexes(self):
+        by_url = {}           # product_url -> id
+        by_category = {}      # alt kategori -> {id, ...}
+        by_color = {}         # renk adı -> {id, ...}
+        colors_column = self.colors_column()
+        categories = self.field_values('category')
+        columns = zip(self.field_values('product_url'), categories, colors_column)
+        for product_id, (product_url, category, colors) in enumerate(columns):
+            # Aynı URL birden fazla kez varsa ilkini kullan (eski next(...) davranışı)
+            by_url.setdefault(product_url, product_id)
+            by_category.setdefault(category, set()).add(product_id)
+            for color in colors:
+                by_color.setdefault(color, set()).add(product_id)
+
+        # Ana kategori kümeleri, alt kategorilerin birebir eşleşmesiyle oluşturulur
+        by_main_category = {}
+        for main_cat, sub_cats in self.complementary_rules.items():
+            ids = set()
+            for sub_cat in sub_cats:
+                ids |= by_category.get(sub_cat, set())
+            by_main_category[main_cat] = ids
+
+        self.id_by_url = by_url
+        self.ids_by_category = by_category
+        self.ids_by_main_category = by_main_category
+        self.ids_by_color = by_color
+        # Puanlama için ürün başına kategori, renkler ve sayısal fiyat (id ile erişilir)
+        self.categories_by_id = categories
+        self.colors_by_id = colors_column
+        self.prices = get_product_prices(self.products)
+
+        # Fiyat indeksi: alt kategori -> (artan fiyatlar, aynı sıradaki id'ler). Fiyat aralığı sorguları
+        # her kategoride iki ikili aramayla yanıtlanır; fiyatı olmayan ürünler indekse girmez.
+        priced = sorted((category, price, product_id)
+                        for product_id, (category, price) in enumerate(zip(categories, self.prices))
+                        if category is not None and not math.isnan(price))
+        price_index = {}
+        for category, price, product_id in priced:
+            prices, ids = price_index.setdefault(category, ([], []))
+            prices.append(price)
+            ids.append(product_id)
+        self.price_index_by_category = price_index
+
+    def _build_tags(self, tag_tables, previous):
+        # Her ürünü, adında/kategorisinde eşleşen stil, mevsim ve silüet gruplarıyla etiketler.
+        # Etiketler yalnızca ad + kategori metnine bağlı olduğundan, kurallar değişmediyse önceki
+        # sürümde hesaplanmış metin -> etiket sonuçları yeniden kullanılır (artımlı yeniden yükleme).
+        fingerprint = get_rule_tables_fingerprint(tag_tables)
+        tags_by_text = {}
+        if previous is not None and previous.tags_fingerprint == fingerprint:
+            tags_by_text = previous.tags_by_text
+
+        matchers = []
+        for table_name, table in tag_tables.items():
+            for group, keywords in table.items():
+                matcher = compile_keyword_matcher(keywords)
+                if matcher is not None:
+                    matchers.append(((table_name, group), matcher))
+
+        by_tag = {tag: set() for tag, _ in matchers}
+        new_tags_by_text = {}
+        columns = zip(self.field_values('name', ''), self.field_values('category', ''))
+        for product_id, (name, category) in enumerate(columns):
+            # Eski filtrelerle aynı metin: küçük harfli ad + ' ' + küçük harfli kategori
+            text = name.lower() + ' ' + category.lower()
+            tags = new_tags_by_text.get(text)
+            if tags is None:
+                tags = tags_by_text.get(text)
+                if tags is None:
+                    tags = tuple(tag for tag, matcher in matchers if matcher.search(text))
+                new_tags_by_text[text] = tags
+            for tag in tags:
+                by_tag[tag].add(product_id)
+
+        self.ids_by_tag = by_tag
+        self.tags_by_text = new_tags_by_text
+        self.tags_fingerprint = fingerprint
+
+    def _build_store(self):
+        from product_store import ColumnarProductStore # numpy yalnızca bu modda gerekir
+        store = ColumnarProductStore(self.products)
+        store.set_tags(self.ids_by_tag)
+        logger.info("Sütun bazlı ürün deposu oluşturuldu (%d ürün, %d renk).", store.size, len(store.color_bit_by_name))
+        return store
+
+    def _build_visual_index(self, previous):
+        # Ürünlerde görsel tanımlayıcı yoksa (ör. eski preprocess çıktısı) benzerlik araması kapalıdır
+        descriptors = getattr(self.products, 'descriptors', None) # Anlık görüntüde mmap'teki bölüm
+        if descriptors is None and not hasattr(self.products, 'descriptors'):
+            texts = self.field_values('visual_descriptor')
+            if any(texts):
+                try:
+                    from visual_index import decode_descriptors
+                except ImportError as e:
+                    logger.warning("Görsel benzerlik indeksi oluşturulamadı (%s).", e)
+                    return None
+                descriptors = decode_descriptors(texts)
+        if descriptors is None:
+            return None
+        if len(descriptors) != len(self.products):
+            # Satırlar ürün id'leriyle eşleşmezse aramalar yanlış ürünler döndürür
+            logger.error("Görsel tanımlayıcı sayısı (%d) ürün sayısından (%d) farklı; benzerlik araması kapalı.",
+                         len(descriptors), len(self.products))
+            return None
+        from visual_index import VisualIndex # numpy yalnızca tanımlayıcılar varsa gerekir
+        # IVF merkezleri önceki sürümden alınır; ürünlerin küçük bir kısmı değiştiğinde yeniden eğitmeye gerek yok
+        previous_index = previous.visual_index if previous is not None else None
+        centroids = previous_index.centroids if previous_index is not None else None
+        index = VisualIndex(descriptors, centroids=centroids)
+        logger.info("Görsel benzerlik indeksi oluşturuldu (%d tanımlayıcı, %s).", index.count,
+                    f"IVF, {len(index.centroids)} liste" if index.centroids is not None else "tam arama")
+        return index
+
+    def ids_with_any_color(self, colors):
+        ids = set()
+        for color in colors:
+            ids |= self.ids_by_color.get(color, set())
+        return ids
+
+    # Filtre adımları: id listelerini alır, katalog sırasını koruyarak filtrelenmiş id listesi döndürür
+    # price_range: (en düşük, en yüksek) kapalı aralık veya None; sınırlardan biri None olabilir
+    def candidate_ids(self, main_categories, excluded_id, price_range=None):
+        if self.store is not None:
+            sub_categories = []
+            for main_cat in main_categories:
+                sub_categories.extend(self.complementary_rules.get(main_cat, []))
+            return self.exclude_id(self.store.ids_in_categories(sub_categories, price_range), excluded_id)
+        if price_range is not None:
+            sub_categories = set()
+            for main_cat in main_categories:
+                sub_categories.update(self.complementary_rules.get(main_cat, []))
+            candidate_ids = self.ids_in_price_range(sub_categories, *price_range)
+        else:
+            candidate_ids = set()
+            for main_cat in main_categories:
+                candidate_ids |= self.ids_by_main_category.get(main_cat, set())
+        candidate_ids.discard(excluded_id)
+        return sorted(candidate_ids)
+
+    def ids_in_price_range(self, sub_categories, min_price=None, max_price=None):
+        ids = set()
+        for category in sub_categories:
+            index = self.price_index_by_category.get(category)
+            if index is None:
+                continue
+            prices, category_ids = index
+            start = 0 if min_price is None else bisect.bisect_left(prices, min_price)
+            end = len(prices) if max_price is None else bisect.bisect_right(prices, max_price)
+            ids.update(category_ids[start:end])
+        return ids
+
+    def exclude_id(self, ids, excluded_id):
+        if excluded_id is None:
+            return ids
+        if self.store is not None:
+            return ids[ids != excluded_id]
+        return [i for i in ids if i != excluded_id]
+
+    def filter_by_any_color(self, ids, colors):
+        if self.store is not None:
+            return self.store.filter_has_any_color(ids, colors)
+        color_ids = self.ids_with_any_color(colors)
+        return [i for i in ids if i in color_ids]
+
+    def filter_by_tag(self, ids, table_name, group):
+        if self.store is not None:
+            return self.store.filter_has_tag(ids, (table_name, group))
+        tag_ids = self.ids_by_tag.get((table_name, group), set())
+        return [i for i in ids if i in tag_ids]
+
+    def filter_by_name(self, ids, keywords):
+        if self.store is not None:
+            return self.store.filter_name_contains_any(ids, keywords)
+        matcher = compile_keyword_matcher(keywords)
+        if matcher is None:
+            return []
+        filtered = []
+        for i in ids:
+            name = self.products[i].get('name')
+            if name and matcher.search(name.lower()):
+                filtered.append(i)
+        return filtered
+
+    # --- PUANLAMA ---
+    # color_weights: {renk adı: ağırlık}, tag_weights: [(etiket, ağırlık)], keywords: ad içinde aranan kelimeler.
+    # Her aday için tek geçişte ağırlıklı uyum puanı hesaplanır; sıralama top_k ile yapılır.
+    def score(self, ids, color_weights, tag_weights, keywords, keyword_weight, target_price, price_weight):
+        if self.store is not None:
+            return self.store.score(ids, color_weights, tag_weights, keywords, keyword_weight,
+                                    target_price, price_weight)
+        matcher = compile_keyword_matcher(keywords)
+        tag_sets = [(self.ids_by_tag.get(tag, set()), weight) for tag, weight in tag_weights]
+        use_price = price_weight and target_price and not math.isnan(target_price)
+        scores = []
+        for i in ids:
+            score = max((color_weights.get(color, 0.0) for color in self.colors_by_id[i]), default=0.0)
+            for tag_ids, weight in tag_sets:
+                if i in tag_ids:
+                    score += weight
+            if matcher is not None:
+                name = self.products[i].get('name')
+                if name and matcher.search(name.lower()):
+                    score += keyword_weight
+            if use_price and not math.isnan(self.prices[i]):
+                # Fiyat yakınlığı: aynı fiyatta 1, fark büyüdükçe 0'a yaklaşır
+                score += price_weight / (1.0 + abs(self.prices[i] - target_price) / target_price)
+            scores.append(score)
+        return scores
+
+    def top_k(self, ids, scores, k, rng, tie_jitter=1e-6):
+        # En yüksek puanlı k aday; eşit puanlılar arasında rng ile rastgele seçim yapılır
+        if self.store is not None:
+            return self.store.top_k(ids, scores, k, rng.getrandbits(64), tie_jitter)
+        jittered = [score + rng.random() * tie_jitter for score in scores]
+        order = heapq.nlargest(k, range(len(ids)), key=jittered.__getitem__)
+        return [ids[j] for j in order], [scores[j] for j in order]
@@ -0,0 +1,157 @@
+import numpy as np
+
+from product_catalog import compile_keyword_matcher, get_product_prices, product_colors_column, product_field_values
+
+class ColumnarProductStore:
+    """
+    all_products listesinin sütun bazlı (NumPy) kopyası.
+    Ürünler, all_products içindeki sıralarıyla (id) adreslenir; filtreler
+    id dizileri üzerinde boolean maskelerle çalışır ve katalog sırasını korur.
+    """
+
+    def __init__(self, products):
+        self.size = len(products)
+
+        # Kategori kodları: category_names[category_codes[i]] == products[i]['category']
+        self.category_names = []
+        category_code_by_name = {}
+        category_codes = np.empty(self.size, dtype=np.int32)
+        for i, category in enumerate(product_field_values(products, 'category')):
+            code = category_code_by_name.get(category)
+            if code is None:
+                code = category_code_by_name[category] = len(self.category_names)
+                self.category_names.append(category)
+            category_codes[i] = code
+        self.category_codes = category_codes
+        self.category_code_by_name = category_code_by_name
+
+        self.prices = np.array(get_product_prices(products), dtype=np.float64)
+
+        # Fiyat indeksi: fiyatı olan ürünler (kategori kodu, fiyat) sırasında; her kategori kodunun
+        # bölümü price_code_bounds[kod]:price_code_bounds[kod + 1] aralığındadır
+        priced = np.flatnonzero(~np.isnan(self.prices))
+        order = priced[np.lexsort((self.prices[priced], category_codes[priced]))]
+        self.price_sorted_ids = order
+        self.price_sorted_values = self.prices[order]
+        self.price_code_bounds = np.searchsorted(category_codes[order], np.arange(len(self.category_names) + 1))
+
+        # Renkler: her renk adına bir bit; ürün başına tek bir uint64 maske
+        self.color_bit_by_name = {}
+        color_masks = np.zeros(self.size, dtype=np.uint64)
+        for i, colors in enumerate(product_colors_column(products)):
+            mask = 0
+            for color in colors:
+                bit = self.color_bit_by_name.get(color)
+                if bit is None:
+                    if len(self.color_bit_by_name) >= 64:
+                        continue # 64'ten fazla farklı renk adı maskeye sığmaz
+                    bit = self.color_bit_by_name[color] = 1 << len(self.color_bit_by_name)
+                mask |= bit
+            color_masks[i] = mask
+        self.color_masks = color_masks
+
+        # Ürün adları (anahtar kelime filtresi için) kategoriler gibi kodlanır: her farklı ad küçük harfle bir kez
+        # tutulur, ürün başına yalnızca int32 kod. Sabit genişlikli (UCS4) bir dizi her satırda en uzun ad kadar
+        # yer kaplardı; ürün sözlükleri zaten katalogda tutulduğundan sütunlar yalnızca kod ve sayı içerir.
+        self.name_texts = []
+        name_code_by_text = {}
+        name_codes = np.empty(self.size, dtype=np.int32)
+        for i, name in enumerate(product_field_values(products, 'name')):
+            text = (name or '').lower()
+            code = name_code_by_text.get(text)
+            if code is None:
+                code = name_code_by_text[text] = len(self.name_texts)
+                self.name_texts.append(text)
+            name_codes[i] = code
+        self.name_codes = name_codes
+
+        # Stil/mevsim/silüet etiketleri: etiket -> boolean maske (set_tags ile doldurulur)
+        self.tag_masks = {}
+
+    def set_tags(self, product_ids_by_tag):
+        tag_masks = {}
+        for tag, ids in product_ids_by_tag.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[np.fromiter(ids, dtype=np.intp, count=len(ids))] = True
+            tag_masks[tag] = mask
+        self.tag_masks = tag_masks
+
+    def ids_in_categories(self, sub_categories, price_range=None):
+        codes = [self.category_code_by_name[c] for c in sub_categories if c in self.category_code_by_name]
+        if price_range is None:
+            return np.flatnonzero(np.isin(self.category_codes, codes))
+        min_price, max_price = price_range
+        parts = []
+        for code in set(codes):
+            start, end = self.price_code_bounds[code], self.price_code_bounds[code + 1]
+            values = self.price_sorted_values[start:end]
+            low = 0 if min_price is None else np.searchsorted(values, min_price, 'left')
+            high = len(values) if max_price is None else np.searchsorted(values, max_price, 'right')
+            parts.append(self.price_sorted_ids[start + low:start + high])
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(parts))
+
+    def color_mask_for(self, colors):
+        mask = 0
+        for color in colors:
+            mask |= self.color_bit_by_name.get(color, 0)
+        return np.uint64(mask)
+
+    def filter_has_any_color(self, ids, colors):
+        ids = np.asarray(ids, dtype=np.intp)
+        return ids[(self.color_masks[ids] & self.color_mask_for(colors)) != 0]
+
+    def filter_has_tag(self, ids, tag):
+        ids = np.asarray(ids, dtype=np.intp)
+        mask = self.tag_masks.get(tag)
+        if mask is None:
+            return ids[:0]
+        return ids[mask[ids]]
+
+    def filter_name_contains_any(self, ids, keywords):
+        # Her farklı ad bir kez aranır; ismi olmayan ürünler anahtar kelime filtresinden her zaman elenir
+        ids = np.asarray(ids, dtype=np.intp)
+        matcher = compile_keyword_matcher(keywords)
+        if matcher is None or not len(ids):
+            return ids[:0]
+        codes, inverse = np.unique(self.name_codes[ids], return_inverse=True)
+        texts = self.name_texts
+        matches = np.fromiter((bool(texts[code]) and matcher.search(texts[code]) is not None for code in codes.tolist()),
+                              dtype=bool, count=len(codes))
+        return ids[matches[inverse]]
+
+    def score(self, ids, color_weights, tag_weights, keywords, keyword_weight, target_price, price_weight):
+        ids = np.asarray(ids, dtype=np.intp)
+        scores = np.zeros(len(ids), dtype=np.float64)
+        candidate_colors = self.color_masks[ids]
+        # Ürünün renkleri arasındaki en yüksek renk ağırlığı
+        for color, weight in color_weights.items():
+            bit = self.color_bit_by_name.get(color)
+            if bit is not None:
+                has_color = (candidate_colors & np.uint64(bit)) != 0
+                scores = np.where(has_color, np.maximum(scores, weight), scores)
+        for tag, weight in tag_weights:
+            mask = self.tag_masks.get(tag)
+            if mask is not None:
+                scores += weight * mask[ids]
+        if keywords:
+            scores += keyword_weight * np.isin(ids, self.filter_name_contains_any(ids, keywords))
+        if price_weight and target_price and not np.isnan(target_price):
+            prices = self.prices[ids]
+            proximity = price_weight / (1.0 + np.abs(prices - target_price) / target_price)
+            scores += np.where(np.isnan(prices), 0.0, proximity)
+        return scores
+
+    def top_k(self, ids, scores, k, seed, tie_jitter=1e-6):
+        ids = np.asarray(ids, dtype=np.intp)
+        scores = np.asarray(scores, dtype=np.float64)
+        if k <= 0 or len(ids) == 0:
+            return [], []
+        jittered = scores + np.random.default_rng(seed).random(len(scores)) * tie_jitter
+        if k < len(ids):
+            top = np.argpartition(-jittered, k - 1)[:k]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-jittered[top])]
+        return ids[top].tolist(), scores[top].tolist()
@@ -1,28 +1,214 @@
+import heapq
+import hmac
 import json
+import logging
+import math
+import os
 import random
-from flask import Flask, request, jsonify
+import threading
+import time
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS # CORS hatalarını önlemek için
+from catalog_delta import DELTA_FILE, apply_deltas, read_deltas
+from catalog_shards import SHARD_STRATEGIES, parse_shard_spec, select_shard_products
+from metrics import COUNT_BUCKETS, MetricsRegistry, RequestTrace
+from product_catalog import ProductCatalog, get_product_price
+from response_encoding import RawJSON, compress_body, encode_json
+from result_cache import ResultCache
 
 app = Flask(__name__)
 CORS(app) # Tüm endpoint'ler için CORS'u etkinleştir
 
+# YENİ: print yerine seviyeli loglama. İstek başına ayrıntılar DEBUG seviyesindedir; varsayılan INFO
+# seviyesinde biçimlendirilmezler. TRACE_LOG=1 ile her öneri hesaplaması aşama süreleriyle birlikte
+# 'kombin.trace' logger'ına tek satırlık JSON olarak yazılır.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+TRACE_LOG = os.environ.get('TRACE_LOG') == '1'
+logger = logging.getLogger(__name__)
+
+# YENİ: /metrics uç noktasında Prometheus biçiminde sunulan istek ve aşama histogramları
+metrics_registry = MetricsRegistry()
+request_seconds = metrics_registry.histogram(
+    'kombin_request_duration_seconds', 'HTTP isteklerinin süresi', ('endpoint', 'status'))
+stage_seconds = metrics_registry.histogram(
+    'kombin_stage_duration_seconds', 'Öneri hesaplama aşamalarının süresi', ('endpoint', 'stage'))
+stage_candidates = metrics_registry.histogram(
+    'kombin_stage_candidates', 'Aşama sonunda kalan aday sayısı', ('endpoint', 'stage'), buckets=COUNT_BUCKETS)
+result_cache_lookups = metrics_registry.counter(
+    'kombin_result_cache_lookups_total', 'Sonuç önbelleği aramaları', ('result',))
+
 # YENİ: Önceden işlenmiş, renk bilgisi eklenmiş dosyayı kullan
 PRODUCTS_FILE = 'products_with_colors.json'
-all_products = []
+# YENİ: preprocess_products.py'nin yazdığı ikili anlık görüntü. JSON'dan eski değilse
+# salt okunur mmap ile açılır (hızlı açılış, worker'lar arası paylaşılan bellek); yoksa JSON kullanılır.
+PRODUCTS_SNAPSHOT_FILE = 'products_with_colors.snapshot'
+# YENİ: preprocess_products.py --incremental'ın eklediği fark kayıtları (catalog_delta.py). Temel
+# katalogdan sonra uygulanır; yalnızca bu dosya değiştiğinde mevcut sürüme sadece yeni kayıtlar eklenir.
+# Dosya adı preprocess_products.py ile aynı kaynaktan gelir; testler/benchmark'lar bu değişkeni değiştirebilir.
+PRODUCTS_DELTA_FILE = DELTA_FILE
+
+# YENİ: İsteğe bağlı sütun bazlı (NumPy) ürün deposu. USE_COLUMNAR_STORE=1 ile
+# açılır; açıkken filtreler product_store.ColumnarProductStore üzerinden çalışır.
+USE_COLUMNAR_STORE = os.environ.get('USE_COLUMNAR_STORE') == '1'
+
+# YENİ: Katalog dosyaları bu aralıkla (saniye) izlenir ve değişince arka planda yeniden yüklenir.
+# 0 izlemeyi kapatır; /admin/reload_catalog ile elle yeniden yükleme her zaman mümkündür.
+CATALOG_WATCH_INTERVAL = float(os.environ.get('CATALOG_WATCH_INTERVAL', '10'))
+# /admin/* uç noktaları X-Admin-Token başlığında bu değeri ister; ayarlanmamışsa bu uç noktalar kapalıdır
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# YENİ: Ürünler ve türetilmiş tüm indeksler tek bir ProductCatalog nesnesindedir (product_catalog.py).
+# load_products() yeni sürümü oluşturup bu değişkene tek atamayla geçer; istekler başta
+# `current = catalog` ile bir sürümü yakalar ve istek boyunca onu kullanır.
+catalog = None
+catalog_build_lock = threading.Lock()   # Aynı anda yalnızca bir katalog oluşturulur
+catalog_reload_lock = threading.Lock()  # Arka plan yeniden yükleme iş parçacığının kaydı için
+catalog_reload_thread = None
 
-def load_products():
-    global all_products
+# YENİ: Aynı normalize isteğin filtrelenmiş aday listesi için LRU/TTL önbellek.
+# Anahtar katalog sürümünü içerir ve yeniden yüklemede önbellek temizlenir.
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '10000'))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', '300'))
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+# YENİ: Yanıtlardaki ürünler bir kez JSON'a kodlanıp (katalog sürümü, id, alanlar) anahtarıyla tutulur;
+# popüler ürünler her yanıtta yeniden kodlanmaz. Bu boyutu aşan yanıtlar istemci kabul ediyorsa
+# br/gzip ile sıkıştırılır (bkz. response_encoding.py).
+PRODUCT_JSON_CACHE_SIZE = int(os.environ.get('PRODUCT_JSON_CACHE_SIZE', '50000'))
+product_json_cache = ResultCache(PRODUCT_JSON_CACHE_SIZE, float('inf'))
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1400'))
+
+# YENİ: Parça (shard) süreci olarak çalıştırma (bkz. catalog_shards.py ve shard_router.py). CATALOG_SHARD=i/n
+# ile yalnızca kataloğun i. payı yüklenir. Seçili ürün başka bir parçada olabileceğinden yönlendirici onu
+# isteğin 'seed_product' alanında gönderir; yanıtlara yönlendiricinin birleştirmesi için aday sayısı eklenir.
+CATALOG_SHARD = os.environ.get('CATALOG_SHARD')
+CATALOG_SHARD_STRATEGY = os.environ.get('CATALOG_SHARD_STRATEGY', 'main_category')
+
+def load_products_snapshot():
+    if not os.path.exists(PRODUCTS_SNAPSHOT_FILE):
+        return None
+    if os.path.exists(PRODUCTS_FILE) and os.path.getmtime(PRODUCTS_FILE) > os.path.getmtime(PRODUCTS_SNAPSHOT_FILE):
+        logger.warning("%s dosyası %s dosyasından eski, JSON kullanılacak.", PRODUCTS_SNAPSHOT_FILE, PRODUCTS_FILE)
+        return None
+    try:
+        from catalog_snapshot import SnapshotCatalog # numpy yalnızca bu yolda gerekir
+        return SnapshotCatalog(PRODUCTS_SNAPSHOT_FILE)
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning("%s açılamadı (%s), JSON kullanılacak.", PRODUCTS_SNAPSHOT_FILE, e)
+        return None
+
+def load_products_json():
     try:
         with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-            all_products = json.load(f)
-        print(f"{len(all_products)} ürün (renk bilgisiyle) başarıyla yüklendi.")
+            products = json.load(f)
+        logger.info("%d ürün (renk bilgisiyle) başarıyla yüklendi.", len(products))
+        return products
     except FileNotFoundError:
-        print(f"HATA: {PRODUCTS_FILE} dosyası bulunamadı!")
-        print("Lütfen önce 'preprocess_products.py' script'ini çalıştırarak renk analiz dosyasını oluşturun.")
-        all_products = []
+        logger.error("%s dosyası bulunamadı! Lütfen önce 'preprocess_products.py' script'ini çalıştırarak "
+                     "renk analiz dosyasını oluşturun.", PRODUCTS_FILE)
     except json.JSONDecodeError:
-        print(f"HATA: {PRODUCTS_FILE} dosyası geçerli bir JSON formatında değil!")
-        all_products = []
+        logger.error("%s dosyası geçerli bir JSON formatında değil!", PRODUCTS_FILE)
+    return []
+
+def read_product_deltas(offset=0):
+    # (kayıtlar, yeni ofset); dosya yeniden oluşturulmuşsa (None, None), bozuksa ([], offset)
+    try:
+        return read_deltas(PRODUCTS_DELTA_FILE, offset)
+    except (ValueError, OSError) as e:
+        logger.error("%s okunamadı, delta uygulanmadı: %s", PRODUCTS_DELTA_FILE, e)
+        return [], offset
+
+def load_products(deltas_only=False):
+    # deltas_only: temel dosyaları yeniden okumadan mevcut sürüme yalnızca yeni delta kayıtlarını uygula
+    global catalog
+    with catalog_build_lock:
+        previous = catalog
+        products = None
+        if deltas_only and previous is not None:
+            deltas, delta_offset = read_product_deltas(previous.delta_offset)
+            if deltas is None:
+                logger.info("%s yeniden oluşturulmuş, katalog tamamen yeniden yükleniyor.", PRODUCTS_DELTA_FILE)
+            elif not deltas:
+                return previous
+            else:
+                products = apply_deltas(previous.products, deltas)
+                logger.info("%d delta kaydı uygulandı (%d ürün).", len(deltas), len(products))
+        if products is None:
+            products = load_products_snapshot()
+            if products is not None:
+                logger.info("%d ürün ikili anlık görüntüden (mmap) yüklendi.", len(products))
+            else:
+                products = load_products_json()
+            if not products and previous is not None:
+                # Okunamayan veya boş dosya yüzünden çalışan katalog boş bir sürümle değiştirilmez
+                logger.error("Katalog dosyaları okunamadı veya boş; önceki sürüm (%d) kullanılmaya devam ediliyor.",
+                             previous.version)
+                return previous
+            deltas, delta_offset = read_product_deltas()
+            if deltas:
+                products = apply_deltas(products, deltas)
+                logger.info("%d bekleyen delta kaydı uygulandı (%d ürün).", len(deltas), len(products))
+        if CATALOG_SHARD:
+            # Deltalar başka parçalara ait ürünler de ekleyebilir; seçim her sürümde yeniden yapılır
+            shard_index, num_shards = parse_shard_spec(CATALOG_SHARD)
+            if CATALOG_SHARD_STRATEGY not in SHARD_STRATEGIES:
+                raise ValueError(f"CATALOG_SHARD_STRATEGY şunlardan biri olmalı: {', '.join(SHARD_STRATEGIES)}")
+            products = select_shard_products(products, shard_index, num_shards, CATALOG_SHARD_STRATEGY,
+                                             COMPLEMENTARY_RULES)
+            logger.info("Parça %d/%d (%s): %d ürün yüklendi.", shard_index, num_shards, CATALOG_SHARD_STRATEGY,
+                        len(products))
+        new_catalog = ProductCatalog(
+            products, COMPLEMENTARY_RULES, RULE_TAG_TABLES,
+            use_columnar_store=USE_COLUMNAR_STORE,
+            previous=previous,
+            version=previous.version + 1 if previous is not None else 1,
+            delta_offset=delta_offset,
+        )
+        catalog = new_catalog # Atomik geçiş
+        result_cache.clear()
+        product_json_cache.clear()
+        return new_catalog
+
+def reload_products_in_background(deltas_only=False):
+    # Devam eden bir yeniden yükleme varsa yenisini başlatmaz; False döndürür
+    global catalog_reload_thread
+    with catalog_reload_lock:
+        if catalog_reload_thread is not None and catalog_reload_thread.is_alive():
+            return False
+        catalog_reload_thread = threading.Thread(target=load_products, args=(deltas_only,),
+                                                 name="catalog-reload", daemon=True)
+        catalog_reload_thread.start()
+        return True
+
+def get_catalog_files_signature():
+    signature = []
+    for path in (PRODUCTS_FILE, PRODUCTS_SNAPSHOT_FILE, PRODUCTS_DELTA_FILE):
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+def watch_catalog_files(interval):
+    last_signature = get_catalog_files_signature()
+    while True:
+        time.sleep(interval)
+        signature = get_catalog_files_signature()
+        if signature != last_signature:
+            # Yalnızca delta dosyası değiştiyse temel katalog yeniden okunmaz
+            deltas_only = signature[:-1] == last_signature[:-1]
+            logger.info("Katalog dosyası değişti, arka planda yeniden yükleniyor (yalnızca delta: %s)...", deltas_only)
+            # Başka bir yükleme sürüyorsa imza güncellenmez; değişiklik bir sonraki turda yeniden denenir
+            if reload_products_in_background(deltas_only):
+                last_signature = signature
+
+def start_catalog_watcher(interval=CATALOG_WATCH_INTERVAL):
+    if interval <= 0:
+        return None
+    watcher = threading.Thread(target=watch_catalog_files, args=(interval,), name="catalog-watcher", daemon=True)
+    watcher.start()
+    return watcher
 
 # Basit kategori eşleştirme kuralları
 # Bu kuralları ve kategori isimlerini kendi veri setinize göre detaylandırabilirsiniz.
@@ -76,6 +262,28 @@ def get_main_category(item_category_name):
             return main_cat
     return None # Eşleşme bulunamazsa
 
+def get_current_categories(data):
+    # (hata mesajı, None) veya (None, kombindeki kategori adları listesi) döndürür
+    current_categories = data.get('current_categories')
+    if current_categories is None:
+        return None, []
+    if not isinstance(current_categories, list) or not all(isinstance(cat, str) for cat in current_categories):
+        return "'current_categories' bir metin listesi olmalı.", None
+    return None, current_categories
+
+def get_excluded_main_categories(current_categories):
+    # Kombinde zaten bulunan tekil ana kategoriler (önerilerden çıkarılır)
+    excluded_main_categories = set()
+    for cat_name in current_categories:
+        main_cat = get_main_category(cat_name)
+        if main_cat and main_cat in SINGLE_INSTANCE_CATEGORIES:
+            excluded_main_categories.add(main_cat)
+        # YENİ KURAL: Eğer tek parça bir kıyafet varsa, üst ve alt giyimi de engelle
+        if main_cat == "ONE_PIECE":
+            excluded_main_categories.add("TOPS")
+            excluded_main_categories.add("BOTTOMS")
+    return excluded_main_categories
+
 def get_color_theory_matches(main_color):
     matches = set()
     theory = COLOR_THEORY.get(main_color, {})
@@ -126,6 +334,64 @@ ALT_UST_ORAN = {
     # ...
 }
 
+# Yükleme sırasında ürünlere etiket olarak işlenen kural tabloları
+RULE_TAG_TABLES = {
+    "style": STYLE_GROUPS,
+    "season": SEASON_GROUPS,
+    "silhouette": SILUET_DENGESI,
+}
+
+# YENİ: Puanlama modu ("mode": "score") ağırlıkları. Filtreler yerine her aday için tek bir uyum puanı
+# hesaplanır: renk ilişkisi (ürünün renkleri arasındaki en iyi ilişki) + eşleşen etiketler + fiyat yakınlığı.
+SUGGESTION_MODES = ("filter", "score")
+SCORE_WEIGHTS = {
+    "color_preference": 4.0, # Kullanıcının istediği renk
+    "complementary": 3.0,
+    "analogous": 2.0,
+    "triadic": 1.5,
+    "monochrome": 2.0,       # Ana renk ve tonları
+    "neutral": 1.0,
+    "style": 2.0,
+    "season": 2.0,
+    "silhouette": 1.5,
+    "keyword": 2.0,
+    "price": 1.0,            # Seçili ürünün fiyatına yakınlık (0-1 arası çarpılır)
+}
+SCORE_TIE_JITTER = 1e-6 # Eşit puanlı adaylar arasında rastgele seçim için eklenen çok küçük gürültü
+
+def get_color_relation_weights(main_color, color_preference=None):
+    # Renk adı -> o rengin ana renkle ilişkisinin puanı (bir renk birden çok ilişkideyse en yükseği)
+    weights = {}
+    def add(color, weight):
+        weights[color] = max(weights.get(color, 0.0), weight)
+    for color in NEUTRAL_COLORS:
+        add(color, SCORE_WEIGHTS["neutral"])
+    if main_color:
+        add(main_color, SCORE_WEIGHTS["monochrome"])
+        for relation, colors in COLOR_THEORY.get(main_color, {}).items():
+            for color in colors:
+                add(color, SCORE_WEIGHTS[relation])
+    if color_preference:
+        add(color_preference, SCORE_WEIGHTS["color_preference"])
+    return weights
+
+# YENİ: Tam kombin üretimi. Her şablon, bir kombini oluşturan ana kategorilerdir; şablonlar
+# SINGLE_INSTANCE_CATEGORIES ve tek parça kuralına (ONE_PIECE varsa TOPS/BOTTOMS yok) uyar.
+OUTFIT_TEMPLATES = [
+    ("TOPS", "BOTTOMS", "SHOES", "OUTERWEAR"),
+    ("TOPS", "BOTTOMS", "SHOES"),
+    ("ONE_PIECE", "SHOES", "OUTERWEAR"),
+    ("ONE_PIECE", "SHOES"),
+]
+# Katalogda hiç ürünü olmayan bu kategoriler kombinden çıkarılır; diğerleri yoksa şablon atlanır
+OUTFIT_OPTIONAL_CATEGORIES = {"SHOES", "OUTERWEAR"}
+OUTFIT_CANDIDATES_PER_CATEGORY = 50 # Her kategoride aramaya giren en yüksek puanlı aday sayısı
+OUTFIT_BEAM_WIDTH = 20              # Her adımda korunan en iyi yarım kombin sayısı
+OUTFIT_TIME_BUDGET_MS = 200         # Arama süresi sınırı; aşılırsa kalan kategoriler açgözlü doldurulur
+MAX_OUTFITS = 20
+MAX_OUTFIT_TIME_BUDGET_MS = 2000
+MAX_OUTFIT_BEAM_WIDTH = 200 # Adım başına en fazla beam x OUTFIT_CANDIDATES_PER_CATEGORY genişletme (>= MAX_OUTFITS)
+
 def get_silhouette_matches(bottom_category):
     # Alt parça tipine göre önerilen üst parça tiplerini döndür
     return SILUET_DENGESI.get(bottom_category, [])
@@ -143,45 +409,262 @@ def get_shoe_matches(shoe_type):
 def get_alt_ust_oran_matches(top_type):
     return ALT_UST_ORAN.get(top_type, None)
 
-@app.route('/suggest_complementary_items', methods=['POST'])
-def suggest_complementary_items():
-    if not all_products:
-        return jsonify({"error": "Ürün verisi yüklenemedi veya bulunamadı."}), 500
+# YENİ: Fiyat kısıtları. min_price / max_price kapalı bir aralık verir; near_seed_price: true ise
+# seçili ürünün fiyatının ±price_tolerance oranı içindeki ürünler önerilir (ikisi birlikte kesişir).
+# Aralıklar katalogdaki kategori başına sıralı fiyat indeksinden ikili aramayla yanıtlanır.
+NEAR_PRICE_TOLERANCE = 0.3
 
-    data = request.get_json()
-    selected_item_category_name = data.get('category')
-    selected_item_id = data.get('id')
+def get_seed_product(current, data, selected_product_id):
+    # Seçili ürün ve sayısal fiyatı; ürün yoksa (None, None). Parça süreçlerinde ürün bu parçada değilse
+    # yönlendiricinin gönderdiği 'seed_product' kullanılır.
+    if selected_product_id is not None:
+        return current.products[selected_product_id], current.prices[selected_product_id]
+    seed_product = data.get('seed_product') if CATALOG_SHARD else None
+    if isinstance(seed_product, dict):
+        return seed_product, get_product_price(seed_product)
+    return None, None
+
+def get_price_range(current, data, selected_product_id):
+    # (hata mesajı, None) veya (None, (en düşük, en yüksek) ya da kısıt yoksa None) döndürür
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value)
+    min_price = data.get('min_price')
+    max_price = data.get('max_price')
+    near_seed_price = data.get('near_seed_price', False)
+    tolerance = data.get('price_tolerance', NEAR_PRICE_TOLERANCE)
+    for name, value in (('min_price', min_price), ('max_price', max_price)):
+        if value is not None and (not is_number(value) or value < 0):
+            return f"'{name}' negatif olmayan bir sayı olmalı.", None
+    if min_price is not None and max_price is not None and min_price > max_price:
+        return "'min_price', 'max_price' değerinden büyük olamaz.", None
+    if not isinstance(near_seed_price, bool):
+        return "'near_seed_price' true veya false olmalı.", None
+    if not is_number(tolerance) or tolerance < 0:
+        return "'price_tolerance' negatif olmayan bir sayı olmalı.", None
+
+    seed_price = get_seed_product(current, data, selected_product_id)[1] if near_seed_price else None
+    if seed_price is not None:
+        if not math.isnan(seed_price):
+            low, high = seed_price * (1 - tolerance), seed_price * (1 + tolerance)
+            min_price = low if min_price is None else max(min_price, low)
+            max_price = high if max_price is None else min(max_price, high)
+        else:
+            logger.debug("Seçili ürünün fiyatı yok, fiyat yakınlığı kısıtı uygulanmadı.")
+    if min_price is None and max_price is None:
+        return None, None
+    return None, (min_price, max_price)
+
+# Yalnızca indeks oluşturmak için kullanılan, yanıtlarda döndürülmeyen ürün alanları
+INTERNAL_PRODUCT_FIELDS = ('visual_descriptor',)
+MAX_RESPONSE_FIELDS = 20
+
+def get_response_fields(data):
+    # İstek gövdesindeki "fields" listesi veya ?fields=name,price,... ile yanıttaki ürünler yalnızca bu
+    # alanlarla döner (ör. mobil istemci). (hata mesajı, alanlar) döndürür; alanlar None ise tüm alanlar.
+    fields = data.get('fields') if isinstance(data, dict) else None
+    if fields is None and request.args.get('fields'):
+        fields = request.args.get('fields').split(',')
+    if fields is None:
+        return None, None
+    if (not isinstance(fields, list) or not fields or len(fields) > MAX_RESPONSE_FIELDS
+            or not all(isinstance(field, str) and field.strip() for field in fields)):
+        return f"'fields' en fazla {MAX_RESPONSE_FIELDS} alan adından oluşan bir liste olmalı.", None
+    return None, tuple(dict.fromkeys(field.strip() for field in fields))
+
+def get_response_product(current, product_id, fields=None):
+    # Ürünün JSON'a kodlanmış hali (RawJSON); yanıt gövdesine yeniden kodlanmadan eklenir
+    cache_key = (current.version, product_id, fields)
+    encoded = product_json_cache.get(cache_key)
+    if encoded is None:
+        product = current.products[product_id]
+        if fields is None:
+            product = {key: value for key, value in product.items() if key not in INTERNAL_PRODUCT_FIELDS}
+        else:
+            product = {field: product[field] for field in fields
+                       if field in product and field not in INTERNAL_PRODUCT_FIELDS}
+        encoded = RawJSON(encode_json(product))
+        product_json_cache.put(cache_key, encoded)
+    return encoded
+
+def json_response(body, status=200):
+    # jsonify yerine: ürün parçalarını birleştirir ve büyük gövdeleri sıkıştırır
+    data, encoding = compress_body(encode_json(body), request.accept_encodings, COMPRESS_MIN_BYTES)
+    response = Response(data, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+# YENİ: Toplu istekte aynı hesaplamaları (kategori çözümleme, aday kümeleri, renk teorisi) paylaşmak için
+def memoized(memo, key, compute):
+    if memo is None:
+        return compute()
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+def get_result_cache_key(current, data):
+    # Önbelleğe alınan aday listesini etkileyen tüm alanların normalize edilmiş hali; beklenmeyen tiplerde
+    # None (önbelleğe alınmaz). count, seed ve fields önbellekten sonra uygulandığından anahtarda yoktur.
+    def lower_or_none(value):
+        return value.lower() if value else None
+    try:
+        current_categories = data.get('current_categories') or []
+        style_keywords = data.get('style_keywords')
+        if not isinstance(style_keywords, list):
+            style_keywords = []
+        # Parça modunda seçili ürün bu parçada yoksa yönlendiricinin gönderdiği ürün kullanılır (get_seed_product)
+        seed_product = None
+        if CATALOG_SHARD and data.get('id') not in current.id_by_url:
+            seed_product = data.get('seed_product')
+            seed_product = json.dumps(seed_product, sort_keys=True, ensure_ascii=False) if isinstance(seed_product, dict) else None
+        key = (
+            current.version,
+            data.get('category').lower(),
+            data.get('id'),
+            lower_or_none(data.get('color_preference')),
+            lower_or_none(data.get('style_preference')),
+            lower_or_none(data.get('season_preference')),
+            tuple(sorted(set(current_categories))),
+            tuple(sorted(set(keyword.lower() for keyword in style_keywords))),
+            data.get('mode', 'filter'),
+            data.get('min_price'),
+            data.get('max_price'),
+            data.get('near_seed_price', False),
+            data.get('price_tolerance', NEAR_PRICE_TOLERANCE),
+            seed_product,
+        )
+        hash(key) # Liste gibi hash'lenemeyen değerler önbelleğe alınmaz (doğrulama sonra yapılır)
+        return key
+    except (AttributeError, TypeError):
+        return None
+
+def get_seed_error(seed):
+    # İsteğe bağlı seed yalnızca sayı veya metin olabilir (random.Random'a verilir); geçersizse hata mesajı
+    if seed is not None and not isinstance(seed, (int, str)):
+        return "'seed' bir sayı veya metin olmalı."
+    return None
+
+def suggest_for_item(current, data, memo=None, endpoint='suggest', fields=None):
+    # Tek bir seçili ürün için öneri üretir; (yanıt gövdesi, HTTP durum kodu) döndürür.
+    # memo verilirse aynı toplu istekteki diğer ürünlerle ortak ara sonuçlar paylaşılır.
+    # Aşama süreleri ve aday sayıları metriklere (ve TRACE_LOG açıksa loga) yazılır.
+    trace = RequestTrace(endpoint)
+    body, status = compute_suggestions(current, data, trace, memo, fields)
+    trace.finish(stage_seconds, stage_candidates, TRACE_LOG, status=status, mode=data.get('mode', 'filter'))
+    return body, status
+
+SUGGESTION_TEXT_FIELDS = ('category', 'id', 'color_preference', 'style_preference', 'season_preference')
+
+def get_suggestion_request_error(data):
+    # Öneri isteğindeki alanların tipleri; compute_suggestions'ta her şeyden önce (toplu istekte her ürün için) denetlenir.
+    # Kategori ve fiyat alanlarının ayrıntılı doğrulaması resolve_candidates/get_price_range'dedir.
+    for name in SUGGESTION_TEXT_FIELDS:
+        value = data.get(name)
+        if value is not None and not isinstance(value, str):
+            return f"'{name}' bir metin olmalı."
     num_suggestions = data.get('count', 3)
-    color_preference = data.get('color_preference')
+    if not isinstance(num_suggestions, int) or isinstance(num_suggestions, bool) or num_suggestions <= 0:
+        return "'count' pozitif bir tam sayı olmalı."
     style_keywords = data.get('style_keywords')
-    style_preference = data.get('style_preference') # yeni: kullanıcıdan stil tercihi alınabilir
-    season_preference = data.get('season_preference') # yeni: kullanıcıdan mevsim tercihi alınabilir
+    if style_keywords is not None and (not isinstance(style_keywords, list)
+                                       or not all(isinstance(keyword, str) for keyword in style_keywords)):
+        return "'style_keywords' bir metin listesi olmalı."
+    return get_seed_error(data.get('seed'))
+
+def compute_suggestions(current, data, trace, memo=None, fields=None):
+    # Filtrelenmiş aday listesi result_cache'te tutulur; örnekleme her istekte yeniden yapılır.
+    request_error = get_suggestion_request_error(data)
+    if request_error:
+        return {"error": request_error}, 400
+    num_suggestions = data.get('count', 3)
+    seed = data.get('seed') # İsteğe bağlı: aynı seed ile aynı öneriler döner
+
+    mode = data.get('mode', 'filter') # "score": sert filtreler yerine uyum puanına göre sıralama
+    if mode not in SUGGESTION_MODES:
+        return {"error": f"'mode' şunlardan biri olmalı: {', '.join(SUGGESTION_MODES)}."}, 400
+    rng = random.Random(seed) if seed is not None else random
+
+    cache_key = get_result_cache_key(current, data)
+    cached = result_cache.get(cache_key) if cache_key is not None else None
+    if cache_key is not None:
+        result_cache_lookups.inc('hit' if cached is not None else 'miss')
+    trace.mark('cache_lookup')
+    if mode == "score":
+        if cached is not None:
+            candidate_ids, scores = cached
+            logger.debug("Önbellekten %d adet puanlanmış aday alındı.", len(candidate_ids))
+        else:
+            body, status, scored = score_candidates(current, data, trace, memo)
+            if scored is None:
+                return body, status
+            candidate_ids, scores = scored
+            if cache_key is not None:
+                result_cache.put(cache_key, scored)
+        selected_ids, selected_scores = current.top_k(candidate_ids, scores, num_suggestions, rng, SCORE_TIE_JITTER)
+        trace.mark('top_k', len(selected_ids))
+        body = {
+            "recommendations": [get_response_product(current, i, fields) for i in selected_ids],
+            "scores": [round(score, 4) for score in selected_scores],
+        }
+        if CATALOG_SHARD:
+            body["candidate_count"] = len(candidate_ids)
+        return body, 200
+
+    candidate_ids = cached
+    if candidate_ids is not None:
+        logger.debug("Önbellekten %d adet potansiyel öneri alındı.", len(candidate_ids))
+    else:
+        body, status, candidate_ids = filter_candidate_ids(current, data, trace, memo)
+        if candidate_ids is None:
+            return body, status
+        # NumPy dizileri de dahil, örneklemeye hazır değişmez bir listeye çevir
+        candidate_ids = tuple(candidate_ids.tolist() if hasattr(candidate_ids, 'tolist') else candidate_ids)
+        if cache_key is not None:
+            result_cache.put(cache_key, candidate_ids)
+
+    suggestions = []
+    if candidate_ids:
+        num_to_select = min(num_suggestions, len(candidate_ids))
+        selected_ids = rng.sample(candidate_ids, num_to_select)
+        suggestions = [get_response_product(current, i, fields) for i in selected_ids]
+    trace.mark('sampling', len(suggestions))
+
+    body = {"recommendations": suggestions}
+    if CATALOG_SHARD:
+        # Yönlendirici parçaların örneklerini aday sayılarıyla orantılı birleştirir (bkz. shard_router.py)
+        body["candidate_count"] = len(candidate_ids)
+    return body, 200
+
+def resolve_candidates(current, data, trace, memo=None):
+    # Filtreleme ve puanlama modlarının ortak ilk adımı: ana kategori ve kombin kurallarına göre adaylar.
+    # (yanıt gövdesi, durum kodu, None) erken dönüşü veya
+    # (None, None, (aday id listesi, seçili ürün id'si, ana kategori anahtarı, kategori id listesi)) döndürür.
+    selected_item_category_name = data.get('category')
+    selected_item_id = data.get('id')
     # YENİ: Kombinde mevcut olan kategorilerin listesi
-    current_categories = data.get('current_categories', [])
+    categories_error, current_categories = get_current_categories(data)
 
     if not selected_item_category_name:
-        return jsonify({"error": "Kategori bilgisi eksik."}), 400
+        return {"error": "Kategori bilgisi eksik."}, 400, None
+    if categories_error:
+        return {"error": categories_error}, 400, None
 
-    current_main_category = get_main_category(selected_item_category_name)
+    current_main_category = memoized(memo, ('main_category', selected_item_category_name),
+                                     lambda: get_main_category(selected_item_category_name))
     if not current_main_category:
         error_message = f"'{selected_item_category_name}' için ana kategori bulunamadı veya tanımlı değil."
-        return jsonify({"error": error_message}), 400
+        return {"error": error_message}, 400, None
     
     # YENİ: Önerilerden hariç tutulacak ana kategorileri belirle
     excluded_main_categories = set()
     if current_categories:
-        for cat_name in current_categories:
-            main_cat = get_main_category(cat_name)
-            if main_cat and main_cat in SINGLE_INSTANCE_CATEGORIES:
-                excluded_main_categories.add(main_cat)
-            # YENİ KURAL: Eğer tek parça bir kıyafet varsa, üst ve alt giyimi de engelle
-            if main_cat == "ONE_PIECE":
-                excluded_main_categories.add("TOPS")
-                excluded_main_categories.add("BOTTOMS")
-
-    print(f"Seçilen ürün kategorisi: {selected_item_category_name} (Ana Kategori: {current_main_category})")
+        excluded_main_categories = memoized(memo, ('excluded', tuple(current_categories)),
+                                            lambda: get_excluded_main_categories(current_categories))
+
+    logger.debug("Seçilen ürün kategorisi: %s (Ana Kategori: %s)", selected_item_category_name, current_main_category)
     if excluded_main_categories:
-        print(f"Kombinde zaten var olan (ve tekil) ana kategoriler: {excluded_main_categories}")
+        logger.debug("Kombinde zaten var olan (ve tekil) ana kategoriler: %s", excluded_main_categories)
 
     possible_suggestion_main_categories = SUGGESTION_LOGIC.get(current_main_category, [])
 
@@ -192,14 +675,12 @@ def suggest_complementary_items():
             cat for cat in possible_suggestion_main_categories if cat not in excluded_main_categories
         ]
         if len(possible_suggestion_main_categories) < original_suggestion_count:
-            print(f"Filtreleme sonrası önerilecek ana kategoriler: {possible_suggestion_main_categories}")
+            logger.debug("Filtreleme sonrası önerilecek ana kategoriler: %s", possible_suggestion_main_categories)
 
     if not possible_suggestion_main_categories:
-        return jsonify({"recommendations": [], "message": "Bu kategori için tanımlı veya uygun bir öneri kalmadı."}), 200
+        return {"recommendations": [], "message": "Bu kategori için tanımlı veya uygun bir öneri kalmadı."}, 200, None
 
-    print(f"Öneri için potansiyel ana kategoriler: {possible_suggestion_main_categories}")
-    
-    suggestions = []
+    logger.debug("Öneri için potansiyel ana kategoriler: %s", possible_suggestion_main_categories)
     
     # Önerilecek alt kategorileri topla
     target_sub_categories = []
@@ -207,90 +688,504 @@ def suggest_complementary_items():
         target_sub_categories.extend(COMPLEMENTARY_RULES.get(main_cat_to_suggest, []))
     
     if not target_sub_categories:
-         return jsonify({"recommendations": [], "message": "Önerilecek uygun alt kategori bulunamadı."}), 200
+         return {"recommendations": [], "message": "Önerilecek uygun alt kategori bulunamadı."}, 200, None
 
-    print(f"Öneri için hedeflenen alt kategoriler: {target_sub_categories}")
+    logger.debug("Öneri için hedeflenen alt kategoriler: %s", target_sub_categories)
+    trace.mark('category_resolution')
 
-    # Hedeflenen alt kategorilerdeki ürünleri filtrele
-    candidate_products = [
-        p for p in all_products
-        if p.get('category') in target_sub_categories and p.get('product_url') != selected_item_id
-    ]
-    
-    print(f"{len(candidate_products)} adet potansiyel kategori bazlı öneri bulundu.")
+    # Hedeflenen alt kategorilerdeki (varsa fiyat aralığındaki) ürünleri indeksten topla
+    # (Seçili ürün hariç tutulmadan önceki kümeler toplu istekte paylaşılır)
+    selected_product_id = current.id_by_url.get(selected_item_id)
+    price_error, price_range = get_price_range(current, data, selected_product_id)
+    if price_error:
+        return {"error": price_error}, 400, None
+    main_categories_key = (tuple(possible_suggestion_main_categories), price_range)
+    category_ids = memoized(memo, ('candidates', main_categories_key),
+                            lambda: current.candidate_ids(possible_suggestion_main_categories, None, price_range))
+    candidate_ids = current.exclude_id(category_ids, selected_product_id)
+
+    logger.debug("%d adet potansiyel kategori bazlı öneri bulundu.", len(candidate_ids))
+    trace.mark('candidate_scan', len(candidate_ids))
+
+    return None, None, (candidate_ids, selected_product_id, main_categories_key, category_ids)
+
+def filter_candidate_ids(current, data, trace, memo=None):
+    # Öneri adaylarını sırayla uygulanan filtrelerle daraltır. (yanıt gövdesi, durum kodu, None) erken
+    # dönüşü veya (None, None, katalog sırasında aday id listesi) döndürür.
+    color_preference = data.get('color_preference')
+    style_keywords = data.get('style_keywords')
+    style_preference = data.get('style_preference') # yeni: kullanıcıdan stil tercihi alınabilir
+    season_preference = data.get('season_preference') # yeni: kullanıcıdan mevsim tercihi alınabilir
+
+    body, status, resolved = resolve_candidates(current, data, trace, memo)
+    if resolved is None:
+        return body, status, None
+    candidate_ids, selected_product_id, main_categories_key, category_ids = resolved
 
     # --- HIZLANDIRILMIŞ RENK TEORİSİ UYGULAMASI ---
-    # Artık resim analizi yok, sadece önceden hesaplanmış veriyi oku!
-    renk_uyumlu_urunler = []
+    # Artık resim analizi yok, sadece önceden hesaplanmış renk indeksini kullan!
+    selected_product = get_seed_product(current, data, selected_product_id)[0]
     ana_renk = None
-    if color_preference and candidate_products:
+    if color_preference and len(candidate_ids):
         color_preference_lower = color_preference.lower()
         ana_renk = color_preference_lower
-        for p in candidate_products:
-            # Önceden işlenmiş renkleri kullan
-            dominant_colors = p.get('dominant_colors', [])
-            if color_preference_lower in dominant_colors:
-                renk_uyumlu_urunler.append(p)
-        candidate_products = renk_uyumlu_urunler
-        print(f"Kullanıcı renk tercihiyle filtrelenen ürün sayısı: {len(candidate_products)}")
-    elif candidate_products:
-        selected_product = next((p for p in all_products if p.get('product_url') == selected_item_id), None)
-        if selected_product:
-            # Seçilen ürünün önceden işlenmiş renklerini kullan
-            dominant_colors = selected_product.get('dominant_colors', [])
-            if dominant_colors:
-                ana_renk = dominant_colors[0]
-                uyumlu_renkler = get_color_theory_matches(ana_renk)
-                for p in candidate_products:
-                    # Aday ürünlerin önceden işlenmiş renklerini kullan
-                    urun_renkler = p.get('dominant_colors', [])
-                    if any(r in uyumlu_renkler for r in urun_renkler):
-                        renk_uyumlu_urunler.append(p)
-                candidate_products = renk_uyumlu_urunler
-                print(f"Renk teorisiyle filtrelenen ürün sayısı: {len(candidate_products)}")
-
-    # --- KOMBiN TEORiSi UYGULAMA (Değişiklik yok, zaten hızlıydı) ---
-    selected_product = next((p for p in all_products if p.get('product_url') == selected_item_id), None)
+        color_ids = memoized(memo, ('colors', main_categories_key, (color_preference_lower,)),
+                             lambda: current.filter_by_any_color(category_ids, [color_preference_lower]))
+        candidate_ids = current.exclude_id(color_ids, selected_product_id)
+        logger.debug("Kullanıcı renk tercihiyle filtrelenen ürün sayısı: %d", len(candidate_ids))
+    elif len(candidate_ids) and selected_product:
+        # Seçilen ürünün önceden işlenmiş renklerini kullan
+        dominant_colors = selected_product.get('dominant_colors', [])
+        if dominant_colors:
+            ana_renk = dominant_colors[0]
+            uyumlu_renkler = memoized(memo, ('color_theory', ana_renk), lambda: get_color_theory_matches(ana_renk))
+            color_ids = memoized(memo, ('colors', main_categories_key, tuple(sorted(uyumlu_renkler))),
+                                 lambda: current.filter_by_any_color(category_ids, uyumlu_renkler))
+            candidate_ids = current.exclude_id(color_ids, selected_product_id)
+            logger.debug("Renk teorisiyle filtrelenen ürün sayısı: %d", len(candidate_ids))
+    trace.mark('color_filter', len(candidate_ids))
 
+    # --- KOMBiN TEORiSi UYGULAMA ---
     # 1. Stil tercihi
-    if style_preference and candidate_products:
-        style_matches = get_style_matches(style_preference.lower())
-        candidate_products = [p for p in candidate_products if any(st in (p.get('name','').lower() + ' ' + p.get('category','').lower()) for st in style_matches)]
-        print(f"Stil tercihiyle filtrelenen ürün sayısı: {len(candidate_products)}")
+    if style_preference and len(candidate_ids):
+        candidate_ids = current.filter_by_tag(candidate_ids, "style", style_preference.lower())
+        logger.debug("Stil tercihiyle filtrelenen ürün sayısı: %d", len(candidate_ids))
     # 2. Mevsim tercihi
-    elif season_preference and candidate_products:
-        season_matches = get_season_matches(season_preference.lower())
-        candidate_products = [p for p in candidate_products if any(ms in (p.get('name','').lower() + ' ' + p.get('category','').lower()) for ms in season_matches)]
-        print(f"Mevsim tercihiyle filtrelenen ürün sayısı: {len(candidate_products)}")
+    elif season_preference and len(candidate_ids):
+        candidate_ids = current.filter_by_tag(candidate_ids, "season", season_preference.lower())
+        logger.debug("Mevsim tercihiyle filtrelenen ürün sayısı: %d", len(candidate_ids))
     # 3. Alt-üst oranı ve silüet dengesi
-    elif candidate_products and selected_product:
+    elif len(candidate_ids) and selected_product:
         selected_cat = selected_product.get('category','')
-        siluet_matches = get_silhouette_matches(selected_cat)
-        siluet_uyumlu_urunler = [p for p in candidate_products if any(sil in (p.get('name','').lower() + ' ' + p.get('category','').lower()) for sil in siluet_matches)]
-        if siluet_uyumlu_urunler:
-            candidate_products = siluet_uyumlu_urunler
-            print(f"Silüet dengesiyle filtrelenen ürün sayısı: {len(candidate_products)}")
+        siluet_uyumlu_ids = current.filter_by_tag(candidate_ids, "silhouette", selected_cat)
+        if len(siluet_uyumlu_ids):
+            candidate_ids = siluet_uyumlu_ids
+            logger.debug("Silüet dengesiyle filtrelenen ürün sayısı: %d", len(candidate_ids))
+    trace.mark('tag_filter', len(candidate_ids))
 
     # Stil anahtar kelimelerine göre filtreleme
-    if style_keywords and isinstance(style_keywords, list) and candidate_products:
+    if style_keywords and isinstance(style_keywords, list) and len(candidate_ids):
         style_keywords_lower = [keyword.lower() for keyword in style_keywords]
-        filtered_by_style = []
-        for p in candidate_products:
-            if p.get('name'):
-                product_name_lower = p['name'].lower()
-                if any(keyword in product_name_lower for keyword in style_keywords_lower):
-                    filtered_by_style.append(p)
-        candidate_products = filtered_by_style
-        print(f"Stil anahtar kelimesiyle filtrelenen ürün sayısı: {len(candidate_products)}")
-    
-    print(f"Nihai filtreleme sonrası {len(candidate_products)} adet potansiyel öneri bulundu.")
+        candidate_ids = current.filter_by_name(candidate_ids, style_keywords_lower)
+        logger.debug("Stil anahtar kelimesiyle filtrelenen ürün sayısı: %d", len(candidate_ids))
+    trace.mark('keyword_filter', len(candidate_ids))
+
+    logger.debug("Nihai filtreleme sonrası %d adet potansiyel öneri bulundu.", len(candidate_ids))
+
+    return None, None, candidate_ids
+
+def score_candidates(current, data, trace, memo=None):
+    # Puanlama modu: kategori adaylarının tamamı tek geçişte puanlanır, hiçbir aday elenmez.
+    # (yanıt gövdesi, durum kodu, None) erken dönüşü veya (None, None, (aday id'leri, puanlar)) döndürür.
+    body, status, resolved = resolve_candidates(current, data, trace, memo)
+    if resolved is None:
+        return body, status, None
+    candidate_ids, selected_product_id, _, _ = resolved
+    scores = score_candidate_ids(current, data, candidate_ids, selected_product_id, memo)
+    logger.debug("%d adet aday uyum puanıyla sıralanmak üzere puanlandı.", len(candidate_ids))
+    trace.mark('scoring', len(candidate_ids))
+    return None, None, (candidate_ids, scores)
+
+def score_candidate_ids(current, data, candidate_ids, selected_product_id, memo=None):
+    # Adayların seçili ürüne ve isteğin tercihlerine göre uyum puanları (candidate_ids ile aynı sırada)
+    color_preference = data.get('color_preference')
+    style_keywords = data.get('style_keywords')
+    style_preference = data.get('style_preference')
+    season_preference = data.get('season_preference')
+
+    selected_product, target_price = get_seed_product(current, data, selected_product_id)
+    color_preference_lower = color_preference.lower() if color_preference else None
+    ana_renk = color_preference_lower
+    if ana_renk is None and selected_product:
+        dominant_colors = selected_product.get('dominant_colors', [])
+        ana_renk = dominant_colors[0] if dominant_colors else None
+    color_weights = memoized(memo, ('color_weights', ana_renk, color_preference_lower),
+                             lambda: get_color_relation_weights(ana_renk, color_preference_lower))
+
+    # Stil, mevsim ve silüet eşleşmeleri birbirini dışlamaz; hepsi puana eklenir
+    tag_weights = []
+    if style_preference:
+        tag_weights.append((("style", style_preference.lower()), SCORE_WEIGHTS["style"]))
+    if season_preference:
+        tag_weights.append((("season", season_preference.lower()), SCORE_WEIGHTS["season"]))
+    if selected_product:
+        tag_weights.append((("silhouette", selected_product.get('category', '')), SCORE_WEIGHTS["silhouette"]))
+
+    keywords = []
+    if style_keywords and isinstance(style_keywords, list):
+        keywords = [keyword.lower() for keyword in style_keywords]
+
+    return current.score(candidate_ids, color_weights, tag_weights, keywords, SCORE_WEIGHTS["keyword"],
+                         target_price, SCORE_WEIGHTS["price"])
+
+@app.route('/suggest_complementary_items', methods=['POST'])
+def suggest_complementary_items():
+    current = catalog # İstek boyunca aynı katalog sürümü kullanılır
+    # Parça modunda boş bir pay hata değildir (ör. yalnızca az ürünlü bir ana kategoriyi tutan parça):
+    # istek normal işlenir ve aday sayısı 0 döner, yönlendirici diğer parçaların sonuçlarını birleştirir
+    if current is None or (not len(current) and not CATALOG_SHARD):
+        return jsonify({"error": "Ürün verisi yüklenemedi veya bulunamadı."}), 500
+
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Geçersiz istek gövdesi."}), 400
+    fields_error, fields = get_response_fields(data)
+    if fields_error:
+        return jsonify({"error": fields_error}), 400
+    body, status = suggest_for_item(current, data, fields=fields)
+    return json_response(body, status)
+
+# YENİ: Birden çok seçili ürün (ör. tüm kombin) için tek istekte öneri
+MAX_BATCH_ITEMS = 50
+
+@app.route('/suggest_complementary_items_batch', methods=['POST'])
+def suggest_complementary_items_batch():
+    # Gövde: {"items": [<suggest_complementary_items gövdesi>, ...]}
+    # Yanıt: {"results": [{"status": ..., ...yanıt gövdesi}, ...]} (items ile aynı sırada)
+    current = catalog
+    if current is None or not len(current):
+        return jsonify({"error": "Ürün verisi yüklenemedi veya bulunamadı."}), 500
+
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'items' listesi eksik veya boş."}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"Tek istekte en fazla {MAX_BATCH_ITEMS} ürün gönderilebilir."}), 400
+    fields_error, fields = get_response_fields(data) # Tüm ürün isteklerine uygulanır
+    if fields_error:
+        return jsonify({"error": fields_error}), 400
+
+    # Hatalı bir ürün isteği yalnızca kendi sonucunu etkiler; hata mesajı ürünün sırasını belirtir
+    memo = {}
+    results = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"status": 400, "error": f"items[{i}]: Geçersiz ürün isteği."})
+            continue
+        body, status = suggest_for_item(current, item, memo, endpoint='suggest_batch', fields=fields)
+        if "error" in body:
+            body = {**body, "error": f"items[{i}]: {body['error']}"}
+        results.append({"status": status, **body})
+    return json_response({"results": results})
+
+def get_outfit_slots(seed_main_category, current_categories):
+    # Seçili ürün ve kombinde zaten bulunanlar dışında doldurulacak ana kategori listeleri (tekrarsız)
+    excluded_main_categories = get_excluded_main_categories(current_categories) if current_categories else set()
+    slot_lists = []
+    for template in OUTFIT_TEMPLATES:
+        if seed_main_category in SINGLE_INSTANCE_CATEGORIES and seed_main_category not in template:
+            continue
+        # Tek parça kuralı, seçili ürün şablon dışında kalsa bile (ör. aksesuar) uygulanır
+        if seed_main_category == "ONE_PIECE" and ("TOPS" in template or "BOTTOMS" in template):
+            continue
+        slots = tuple(cat for cat in template if cat != seed_main_category and cat not in excluded_main_categories)
+        if "ONE_PIECE" in slots and excluded_main_categories & {"TOPS", "BOTTOMS"}:
+            continue # Kombinde üst veya alt varsa tek parça eklenemez
+        if slots and slots not in slot_lists:
+            slot_lists.append(slots)
+    return slot_lists
+
+def get_pair_score(current, a, b, relation_weights):
+    # İki aday arasındaki renk teorisi ve silüet uyumu (sıra önemsiz)
+    score = 0.0
+    colors_a = current.colors_by_id[a]
+    colors_b = current.colors_by_id[b]
+    if colors_a and colors_b:
+        weights = relation_weights(colors_a[0])
+        score += max((weights.get(color, 0.0) for color in colors_b), default=0.0)
+    if (b in current.ids_by_tag.get(("silhouette", current.categories_by_id[a]), ())
+            or a in current.ids_by_tag.get(("silhouette", current.categories_by_id[b]), ())):
+        score += SCORE_WEIGHTS["silhouette"]
+    return score
+
+def search_outfits(current, slot_candidates, beam_width, deadline):
+    # Kategori sırasıyla ışın araması (beam search). slot_candidates: [(id listesi, seçili ürüne göre puanlar), ...]
+    # Her adımda yarım kombinler en iyi beam_width tanesine budanır; süre dolarsa kalan kategoriler
+    # her kombine en yüksek puanlı uygun adayla eklenir. (kombinler, süre aşıldı mı) döndürür.
+    relation_weights_memo = {}
+    def relation_weights(color):
+        return memoized(relation_weights_memo, color, lambda: get_color_relation_weights(color))
+
+    beam = [(0.0, ())]
+    truncated = False
+    for ids, scores in slot_candidates:
+        expanded = []
+        if truncated or time.perf_counter() > deadline:
+            truncated = True
+            for total, outfit in beam:
+                # ids puana göre sıralı: kombinde olmayan ilk aday
+                for candidate, score in zip(ids, scores):
+                    if candidate not in outfit:
+                        expanded.append((total + score, outfit + (candidate,)))
+                        break
+        else:
+            for total, outfit in beam:
+                for candidate, score in zip(ids, scores):
+                    if candidate in outfit:
+                        continue
+                    pair_total = sum(get_pair_score(current, other, candidate, relation_weights) for other in outfit)
+                    expanded.append((total + score + pair_total, outfit + (candidate,)))
+                if time.perf_counter() > deadline:
+                    truncated = True
+                    break
+        beam = heapq.nlargest(beam_width, expanded, key=lambda entry: entry[0])
+        if not beam:
+            return [], truncated
+    return beam, truncated
+
+def suggest_outfits_for_item(current, data, trace, fields=None):
+    # Seçili ürünü içeren en iyi tam kombinleri üretir; (yanıt gövdesi, HTTP durum kodu) döndürür
+    num_outfits = data.get('count', 3)
+    beam_width = data.get('beam_width', OUTFIT_BEAM_WIDTH)
+    time_budget_ms = data.get('time_budget_ms', OUTFIT_TIME_BUDGET_MS)
+    seed = data.get('seed')
+    for name, value in (('count', num_outfits), ('beam_width', beam_width)):
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            return {"error": f"'{name}' pozitif bir tam sayı olmalı."}, 400
+    if not isinstance(time_budget_ms, (int, float)) or isinstance(time_budget_ms, bool) or time_budget_ms <= 0:
+        return {"error": "'time_budget_ms' pozitif bir sayı olmalı."}, 400
+    seed_error = get_seed_error(seed)
+    if seed_error:
+        return {"error": seed_error}, 400
+    num_outfits = min(num_outfits, MAX_OUTFITS)
+    beam_width = min(max(beam_width, num_outfits), MAX_OUTFIT_BEAM_WIDTH)
+    deadline = time.perf_counter() + min(time_budget_ms, MAX_OUTFIT_TIME_BUDGET_MS) / 1000
+    rng = random.Random(seed) if seed is not None else random
+
+    selected_item_category_name = data.get('category')
+    if not selected_item_category_name:
+        return {"error": "Kategori bilgisi eksik."}, 400
+    seed_main_category = get_main_category(selected_item_category_name)
+    if not seed_main_category:
+        return {"error": f"'{selected_item_category_name}' için ana kategori bulunamadı veya tanımlı değil."}, 400
+    categories_error, current_categories = get_current_categories(data)
+    if categories_error:
+        return {"error": categories_error}, 400
+    slot_lists = get_outfit_slots(seed_main_category, current_categories)
+    trace.mark('category_resolution')
+    if not slot_lists:
+        return {"outfits": [], "message": "Bu ürünle tamamlanabilecek bir kombin şablonu yok."}, 200
+
+    # Her kategorinin adayları, seçili ürüne göre puanlama modunun puanıyla sıralanıp budanır.
+    # Fiyat kısıtları her parçaya ayrı ayrı uygulanır.
+    selected_product_id = current.id_by_url.get(data.get('id'))
+    price_error, price_range = get_price_range(current, data, selected_product_id)
+    if price_error:
+        return {"error": price_error}, 400
+    memo = {}
+    slot_cache = {}
+    def get_slot_candidates(main_cat):
+        ids = current.candidate_ids([main_cat], selected_product_id, price_range)
+        if not len(ids):
+            return [], []
+        scores = score_candidate_ids(current, data, ids, selected_product_id, memo)
+        return current.top_k(ids, scores, OUTFIT_CANDIDATES_PER_CATEGORY, rng, SCORE_TIE_JITTER)
+
+    outfits = []
+    searched_slots = set()
+    truncated = False
+    for slots in slot_lists:
+        slot_candidates = [memoized(slot_cache, main_cat, lambda: get_slot_candidates(main_cat)) for main_cat in slots]
+        trace.mark('candidate_scan', sum(len(ids) for ids, _ in slot_candidates))
+        if any(not ids for main_cat, (ids, _) in zip(slots, slot_candidates) if main_cat not in OUTFIT_OPTIONAL_CATEGORIES):
+            continue # Zorunlu bir kategoride hiç ürün yok, şablon tamamlanamaz
+        kept = [(main_cat, candidates) for main_cat, candidates in zip(slots, slot_candidates) if candidates[0]]
+        slots = tuple(main_cat for main_cat, _ in kept)
+        slot_candidates = [candidates for _, candidates in kept]
+        if not slots or slots in searched_slots:
+            continue
+        searched_slots.add(slots)
+        beam, slots_truncated = search_outfits(current, slot_candidates, beam_width, deadline)
+        truncated = truncated or slots_truncated
+        trace.mark('beam_search', len(beam))
+        # Farklı uzunluktaki şablonlar karşılaştırılabilsin diye puan, terim (aday + ikili) sayısına bölünür
+        num_terms = len(slots) + len(slots) * (len(slots) - 1) // 2
+        outfits.extend((total / num_terms, slots, outfit) for total, outfit in beam)
+
+    outfits = heapq.nlargest(num_outfits, outfits, key=lambda entry: entry[0])
+    trace.mark('ranking', len(outfits))
+    logger.debug("%d adet kombin üretildi (süre sınırı aşıldı: %s).", len(outfits), truncated)
+    seed_items = [get_response_product(current, selected_product_id, fields)] if selected_product_id is not None else []
+    return {
+        "outfits": [
+            {
+                "items": seed_items + [get_response_product(current, i, fields) for i in outfit],
+                "main_categories": ([seed_main_category] if seed_items else []) + list(slots),
+                "score": round(score, 4),
+            }
+            for score, slots, outfit in outfits
+        ],
+        "truncated": truncated,
+    }, 200
+
+@app.route('/suggest_outfits', methods=['POST'])
+def suggest_outfits():
+    # Gövde: suggest_complementary_items ile aynı alanlar + count (kombin sayısı), beam_width, time_budget_ms
+    current = catalog
+    if current is None or not len(current):
+        return jsonify({"error": "Ürün verisi yüklenemedi veya bulunamadı."}), 500
+
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Geçersiz istek gövdesi."}), 400
+    fields_error, fields = get_response_fields(data)
+    if fields_error:
+        return jsonify({"error": fields_error}), 400
+    trace = RequestTrace('outfits')
+    body, status = suggest_outfits_for_item(current, data, trace, fields)
+    trace.finish(stage_seconds, stage_candidates, TRACE_LOG, status=status, truncated=body.get('truncated'))
+    return json_response(body, status)
+
+# YENİ: "Buna benzeyen" öneriler. Ürünlerin LAB renk histogramı tanımlayıcıları üzerinde katalog
+# yüklenirken oluşturulan en yakın komşu indeksi (visual_index.py) kullanılır.
+# scope: "complementary" (varsayılan) kombin kurallarına göre tamamlayıcı kategorilerde, "similar" ise
+# seçili ürünün kendi ana kategorisinde görsel olarak en benzer ürünleri döndürür.
+SIMILARITY_SCOPES = ("complementary", "similar")
+MAX_SIMILAR_ITEMS = 50
+
+def suggest_similar_for_item(current, data, trace, fields=None):
+    # (yanıt gövdesi, HTTP durum kodu) döndürür
+    index = current.visual_index
+    if index is None:
+        return {"error": "Katalogda görsel tanımlayıcı yok; benzerlik araması kullanılamıyor."}, 503
+    num_suggestions = data.get('count', 3)
+    if not isinstance(num_suggestions, int) or isinstance(num_suggestions, bool) or num_suggestions <= 0:
+        return {"error": "'count' pozitif bir tam sayı olmalı."}, 400
+    num_suggestions = min(num_suggestions, MAX_SIMILAR_ITEMS)
+    scope = data.get('scope', 'complementary')
+    if scope not in SIMILARITY_SCOPES:
+        return {"error": f"'scope' şunlardan biri olmalı: {', '.join(SIMILARITY_SCOPES)}."}, 400
+
+    selected_product_id = current.id_by_url.get(data.get('id'))
+    query = index.query_vector(selected_product_id) if selected_product_id is not None else None
+    if query is None:
+        return {"error": "Seçili ürün katalogda yok veya görsel tanımlayıcısı bulunmuyor."}, 404
+
+    if scope == "complementary":
+        body, status, resolved = resolve_candidates(current, data, trace)
+        if resolved is None:
+            return body, status
+        candidate_ids = resolved[0]
+    else:
+        selected_item_category_name = data.get('category')
+        main_category = get_main_category(selected_item_category_name) if selected_item_category_name else None
+        if not main_category:
+            return {"error": f"'{selected_item_category_name}' için ana kategori bulunamadı veya tanımlı değil."}, 400
+        price_error, price_range = get_price_range(current, data, selected_product_id)
+        if price_error:
+            return {"error": price_error}, 400
+        candidate_ids = current.candidate_ids([main_category], selected_product_id, price_range)
+        trace.mark('candidate_scan', len(candidate_ids))
+
+    ids, similarities = index.search(query, candidate_ids, num_suggestions)
+    trace.mark('visual_search', len(ids))
+    return {
+        "recommendations": [get_response_product(current, i, fields) for i in ids.tolist()],
+        "similarities": [round(float(similarity), 4) for similarity in similarities],
+    }, 200
+
+@app.route('/suggest_similar_items', methods=['POST'])
+def suggest_similar_items():
+    # Gövde: category, id (zorunlu, tanımlayıcısı olan bir ürün), count, scope ve
+    # suggest_complementary_items'taki kategori/fiyat alanları (current_categories, min_price, ...)
+    current = catalog
+    if current is None or not len(current):
+        return jsonify({"error": "Ürün verisi yüklenemedi veya bulunamadı."}), 500
+
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Geçersiz istek gövdesi."}), 400
+    fields_error, fields = get_response_fields(data)
+    if fields_error:
+        return jsonify({"error": fields_error}), 400
+    trace = RequestTrace('similar')
+    body, status = suggest_similar_for_item(current, data, trace, fields)
+    trace.finish(stage_seconds, stage_candidates, TRACE_LOG, status=status, scope=data.get('scope', 'complementary'))
+    return json_response(body, status)
+
+@app.route('/shard/product', methods=['GET'])
+def shard_product():
+    # Yalnızca parça süreçlerinde: ?url= ile ürün (yönlendirici seçili ürünü bu parçadan alır)
+    current = catalog
+    if not CATALOG_SHARD or current is None:
+        return jsonify({"error": "Parça modu kapalı."}), 404
+    product_id = current.id_by_url.get(request.args.get('url'))
+    if product_id is None:
+        return jsonify({"error": "Ürün bu parçada yok."}), 404
+    return json_response({"product": get_response_product(current, product_id)})
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    started = g.get('request_started')
+    if started is not None:
+        request_seconds.observe(time.perf_counter() - started, request.endpoint or 'unknown', response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus metin biçimi; istek, aşama ve önbellek metrikleri ile katalog boyutu
+    current = catalog
+    lines = [
+        metrics_registry.render().rstrip('\n'),
+        "# HELP kombin_catalog_products Yüklü katalogdaki ürün sayısı",
+        "# TYPE kombin_catalog_products gauge",
+        f"kombin_catalog_products {len(current) if current is not None else 0}",
+        "# HELP kombin_catalog_version Yüklü katalog sürümü",
+        "# TYPE kombin_catalog_version gauge",
+        f"kombin_catalog_version {current.version if current is not None else 0}",
+    ]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+def check_admin_token():
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Yönetim uç noktaları kapalı (ADMIN_TOKEN ayarlanmamış)."}), 403
+    token = request.headers.get('X-Admin-Token', '')
+    # Sabit süreli karşılaştırma: yanıt süresi belirtecin ne kadarının doğru olduğunu sızdırmaz
+    if not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        return jsonify({"error": "Yetkisiz."}), 403
+    return None
+
+def get_catalog_status(current):
+    if current is None:
+        return {"version": None, "products": 0, "loaded_at": None}
+    return {"version": current.version, "products": len(current), "loaded_at": current.loaded_at,
+            "delta_offset": current.delta_offset}
+
+@app.route('/admin/reload_catalog', methods=['POST'])
+def reload_catalog():
+    # Kataloğu arka planda yeniden yükler; istek beklemez, mevcut sürüm hizmet vermeye devam eder
+    error = check_admin_token()
+    if error:
+        return error
+    started = reload_products_in_background()
+    status = get_catalog_status(catalog)
+    status["reload_started"] = started
+    return jsonify(status), 202
+
+@app.route('/admin/catalog_status', methods=['GET'])
+def catalog_status():
+    error = check_admin_token()
+    if error:
+        return error
+    status = get_catalog_status(catalog)
+    status["reloading"] = catalog_reload_thread is not None and catalog_reload_thread.is_alive()
+    return jsonify(status)
 
-    if candidate_products:
-        num_to_select = min(num_suggestions, len(candidate_products))
-        suggestions = random.sample(candidate_products, num_to_select)
-        
-    return jsonify({"recommendations": suggestions})
+@app.route('/admin/cache_stats', methods=['GET'])
+def cache_stats():
+    error = check_admin_token()
+    if error:
+        return error
+    return jsonify(result_cache.stats())
 
 if __name__ == '__main__':
+    logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     load_products()
+    start_catalog_watcher()
+    # Geliştirme sunucusu; production için çok süreçli giriş noktası: python wsgi.py (bkz. wsgi.py)
     app.run(debug=True, port=5000) # debug=True geliştirme için, production'da False yapın 
\ No newline at end of file
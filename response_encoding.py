@@ -0,0 +1,65 @@
+import gzip
+import json
+
+# Yanıt gövdelerinin hızlı kodlanması. orjson kuruluysa (isteğe bağlı) kullanılır, yoksa standart json.
+# Ürünler RawJSON parçaları olarak bir kez kodlanıp önbelleğe alınır (bkz. recommendation_service.
+# get_response_product); encode_json yanıtı bu parçaları yeniden kodlamadan birleştirerek oluşturur.
+GZIP_LEVEL = 3 # Hız/oran dengesi: üst seviyeler gövdeyi az küçültüp sıkıştırmayı belirgin şekilde yavaşlatır
+BROTLI_QUALITY = 4
+
+_dumps = None
+_brotli = None
+
+class RawJSON(bytes):
+    """Önceden kodlanmış JSON değeri; encode_json içinde olduğu gibi yazılır."""
+    __slots__ = ()
+
+def get_dumps():
+    # değer -> UTF-8 JSON baytları
+    global _dumps
+    if _dumps is None:
+        try:
+            import orjson
+            _dumps = lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except ImportError:
+            encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+            _dumps = lambda value: encoder.encode(value).encode('utf-8')
+    return _dumps
+
+def encode_json(value):
+    dumps = get_dumps()
+    def encode(value):
+        if isinstance(value, RawJSON):
+            return value
+        if isinstance(value, dict):
+            return b'{' + b','.join(dumps(str(key)) + b':' + encode(item) for key, item in value.items()) + b'}'
+        if isinstance(value, (list, tuple)) and any(isinstance(item, (RawJSON, dict, list, tuple)) for item in value):
+            return b'[' + b','.join(encode(item) for item in value) + b']'
+        return dumps(value) # Parça içermeyen değerler tek çağrıda kodlanır
+    return encode(value)
+
+def get_brotli():
+    # brotli isteğe bağlıdır; kurulu değilse yalnızca gzip kullanılır
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli = False
+    return _brotli or None
+
+def compress_body(body, accept_encodings, min_bytes):
+    """
+    İstemcinin kabul ettiği en iyi kodlamayla (br > gzip) sıkıştırır; (gövde, Content-Encoding veya None) döndürür.
+    accept_encodings, Accept-Encoding başlığındaki kodlama -> kalite eşlemesidir (werkzeug Accept).
+    min_bytes'tan küçük gövdeler sıkıştırılmaz: kazanç, harcanan CPU'ya değmez.
+    """
+    if len(body) < min_bytes:
+        return body, None
+    brotli = get_brotli()
+    if brotli is not None and accept_encodings['br']:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if accept_encodings['gzip']:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+    return body, None
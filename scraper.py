@@ -1,16 +1,43 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+import argparse
 import json
+import os
 import time
 import random # Kategoriler arası rastgele bekleme için
+import shutil
+import textwrap
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from card_parsers import PARSER_BACKENDS, get_card_parser
 
 # WebDriver'ın yolu
 CHROMEDRIVER_PATH = 'C:\\Users\\meyda\\React_native_project\\chromedriver.exe'
 
+BASE_URL = 'https://www.trendyol.com'
+OUTPUT_FILENAME = 'trendyol_multi_category_products.json'
+# Ürünler her kategori bittiğinde bu dosyaya satır satır eklenir (JSONL); JSON çıktısı sonunda bundan üretilir.
+# Çalışma sırasında ürünler '<jsonl>.partial' dosyasına yazılır; dosya yalnızca en az bir ürün çekildiyse
+# asıl JSONL'in yerine geçer, böylece başarısız bir çalıştırma önceki çıktıları silmez.
+OUTPUT_JSONL_FILENAME = 'trendyol_multi_category_products.jsonl'
+PARTIAL_SUFFIX = '.partial'
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# HTTP modu: listeleme sayfaları Selenium olmadan, ortak bağlantı havuzlu bir HTTP istemcisiyle
+# kategoriler ve sayfalar arasında paralel çekilir. Sabit beklemeler yerine host başına hız sınırı uygulanır.
+HTTP_WORKERS = 8
+HTTP_TIMEOUT = 20
+HTTP_RETRIES = 3
+REQUESTS_PER_SECOND_PER_HOST = 2.0
+MAX_PAGES = 5
+# Ağ erişimi olmadan denemek için kaydedilmiş örnek listeleme sayfaları (--serve-fixtures)
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scraper_fixtures')
+
 # Çekilecek kategoriler ve Trendyol URL slug'ları
 # Slug, https://www.trendyol.com/SLUG şeklinde URL oluşturmak için kullanılır
 CATEGORIES_TO_SCRAPE = [
@@ -24,10 +51,14 @@ CATEGORIES_TO_SCRAPE = [
     {'name_tr': 'Ceket & Yelek', 'url_slug': 'kadin-ceket-yelek-x-g1-c104153', 'json_category': 'Ceket & Yelek'},
 ]
 
-def scrape_category_page(driver, url, category_name_for_json):
+def scrape_category_page(driver, url, category_name_for_json, parser="auto"):
     """
     Belirtilen URL'den (tek bir kategori sayfası) ürün bilgilerini çeker.
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     print(f"\nFetching products from: {url} for category: {category_name_for_json}")
     driver.get(url)
 
@@ -44,79 +75,33 @@ def scrape_category_page(driver, url, category_name_for_json):
         print(f"Error waiting for product cards or getting page source for {url}: {e}")
         return []
 
-    soup = BeautifulSoup(page_source, 'html.parser')
+    return parse_product_cards(page_source, category_name_for_json, url, parser=parser)
+
+def parse_product_cards(page_source, category_name_for_json, url, verbose=True, source='Trendyol (Selenium)',
+                        parser="auto"):
+    """
+    Bir listeleme sayfasının HTML'inden ürün kartlarını ayrıştırır (Selenium ve HTTP modları ortak kullanır).
+    Alanlar card_parsers'daki arka uçla (varsayılan: kurulu en hızlı kütüphane) çıkarılır.
+    """
+    card_parser = get_card_parser(parser)
     products_on_page = []
-    product_cards = soup.find_all('div', class_='p-card-wrppr')
-    print(f"Found {len(product_cards)} product cards on this page.")
+    product_cards = card_parser.cards(page_source)
+    if verbose:
+        print(f"Found {len(product_cards)} product cards on this page.")
 
     if not product_cards:
-        print(f"No product cards found for {url}. Check selectors or page structure.")
+        if verbose:
+            print(f"No product cards found for {url}. Check selectors or page structure.")
         return []
 
     for card_index, card in enumerate(product_cards):
         try:
-            name = 'N/A'
-            name_element = card.find('span', class_='prdct-desc-cntnr-name')
-            if name_element:
-                name = name_element.get_text(strip=True)
-            
-            image_for_alt_name = card.find('img', class_='p-card-img') 
-            if name == 'N/A' and image_for_alt_name and image_for_alt_name.get('alt'):
-                name = image_for_alt_name.get('alt', 'N/A').strip()
-            if name == 'N/A' and card.get('title'):
-                 name = card.get('title').strip()
-
-            # Fiyatları çekmek için güncellenmiş mantık
-            price = 'N/A'
-            price_text_parts = []
-
-            # 1. Öncelik: class="price-item discounted" (veya sadece price-item)
-            # Bazen sadece "price-item" da olabilir, "discounted" olmadan.
-            # Ekran görüntüsünde "price-item discounted" olarak görünüyor.
-            price_item_div = card.find('div', class_='price-item discounted')
-            if not price_item_div: # Eğer "price-item discounted" yoksa, sadece "price-item" dene
-                price_item_div = card.find('div', class_='price-item')
-
-            if price_item_div:
-                # Bu div içindeki tüm doğrudan metinleri al (text=True sadece ilkini alır)
-                # contents kullanarak tüm çocukları alırız ve string olanları birleştiririz.
-                for content in price_item_div.contents:
-                    if isinstance(content, str):
-                        part = content.strip()
-                        if part: # Boş stringleri ekleme
-                            price_text_parts.append(part)
-                if price_text_parts:
-                    price = " ".join(price_text_parts).replace('TL', '').strip()
-            
-            # 2. Yedek Yöntem: Eğer price-item bulunamazsa, eski class'ları dene
-            if price == 'N/A':
-                price_elements = card.find_all('div', class_='prc-box-dscntd') 
-                if not price_elements:
-                    price_elements = card.find_all('span', class_='prc-slg')
-                
-                if price_elements: 
-                    for pe in price_elements:
-                        if pe.get_text(strip=True):
-                            price_text = pe.get_text(strip=True)
-                            price = price_text.replace('TL', '').strip()
-                            break 
-            
-            image_url = 'N/A'
-            image_wrapper = card.find('div', class_='p-card-img-wr')
-            if image_wrapper:
-                image_element = image_wrapper.find('img', class_='p-card-img')
-                if image_element:
-                    image_url = image_element.get('src')
-            
+            name, price, image_url, href = card_parser.fields(card)
+
             product_url = 'N/A'
-            link_element = card.find('a', href=True) 
-            if not link_element:
-                link_element = card.find('a', class_='p-card-chldrn-cntnr', href=True)
-            
-            if link_element and link_element.get('href'):
-                href = link_element.get('href')
+            if href:
                 if href.startswith('/'):
-                    product_url = "https://www.trendyol.com" + href
+                    product_url = BASE_URL + href
                 else:
                     product_url = href 
 
@@ -128,44 +113,201 @@ def scrape_category_page(driver, url, category_name_for_json):
                     'image_url': image_url,
                     'product_url': product_url,
                     'category': category_name_for_json, 
-                    'source': 'Trendyol (Selenium)'
+                    'source': source
                 })
-            # else:
-                # print(f"Skipping card {card_index+1} in {category_name_for_json} due to missing info or placeholder: Name='{name}', Image='{image_url}'")
 
         except Exception as e:
             print(f"Error parsing a product card (index {card_index}) in {category_name_for_json}: {e}")
             continue
     return products_on_page
 
-if __name__ == "__main__":
-    print("Starting Trendyol multi-category scraper with Selenium...")
-    
+def get_page_url(base_url, url_slug, page):
+    # Trendyol listeleme sayfalaması: ilk sayfa parametresiz, sonrakiler ?pi=<sayfa>
+    url = f"{base_url.rstrip('/')}/{url_slug}"
+    return url if page == 1 else f"{url}?pi={page}"
+
+class HostRateLimiter:
+    """
+    Host başına en fazla requests_per_second istek. Sabit time.sleep yerine kullanılır: bir host için
+    sıradaki izin verilen zamanı tutar, farklı hostlara giden istekler birbirini bekletmez.
+    """
+
+    def __init__(self, requests_per_second=REQUESTS_PER_SECOND_PER_HOST):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def delay(self, url, seconds):
+        # Sunucu Retry-After ile yavaşlamamızı istediğinde o hosttaki tüm istekleri ertele
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._next_allowed[host] = max(self._next_allowed.get(host, 0.0), time.monotonic() + seconds)
+
+def create_http_session(pool_size=HTTP_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    session.headers['Accept-Language'] = 'tr-TR,tr;q=0.9'
+    return session
+
+def fetch_page_http(session, rate_limiter, url, retries=HTTP_RETRIES, timeout=HTTP_TIMEOUT):
+    """
+    Sayfanın HTML'ini döndürür; sayfa yoksa (404) None. 429 ve 5xx yanıtlarında Retry-After'a
+    (yoksa üstel beklemeye) uyarak yeniden dener.
+    """
+    for attempt in range(retries + 1):
+        rate_limiter.wait(url)
+        try:
+            response = session.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            print(f"Request to {url} failed ({e}), retrying...")
+            time.sleep(2 ** attempt)
+            continue
+        if response.status_code == 404:
+            return None
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == retries:
+                response.raise_for_status()
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+            print(f"{url} returned {response.status_code}, retrying in {delay:.1f} seconds...")
+            rate_limiter.delay(url, delay)
+            continue
+        response.raise_for_status()
+        if 'charset' not in response.headers.get('Content-Type', ''):
+            response.encoding = 'utf-8' # requests aksi halde ISO-8859-1 varsayar
+        return response.text
+    return None
+
+def collect_products(on_category_done):
+    # on_category_done verilmezse ürünleri bir listede toplayan geri çağırma ve o liste
+    if on_category_done is not None:
+        return on_category_done, None
+    collected = []
+    return lambda info, products: collected.extend(products), collected
+
+def scrape_categories_http(categories, base_url=BASE_URL, max_pages=MAX_PAGES, workers=HTTP_WORKERS,
+                           requests_per_second=REQUESTS_PER_SECOND_PER_HOST, on_category_done=None,
+                           parser="auto"):
+    """
+    Tüm kategorilerin listeleme sayfalarını sınırlı bir iş parçacığı havuzuyla paralel çeker.
+    Her kategorinin ilk sayfası hemen kuyruğa alınır; bir sayfa yeni ürün getirdikçe o kategorinin
+    sonraki sayfası eklenir (boş sayfa, 404, hata veya max_pages sayfalamayı bitirir).
+    Bir kategori bittiğinde ürünleri (sayfa sırasıyla, product_url'e göre tekrarsız)
+    on_category_done(kategori bilgisi, ürünler) ile teslim edilir ve bellekten atılır.
+    on_category_done verilmezse tüm ürünler kategori sırasıyla liste olarak döner; verilirse ürün sayısı döner.
+    """
+    emit, collected = collect_products(on_category_done)
+    session = create_http_session(workers)
+    rate_limiter = HostRateLimiter(requests_per_second)
+    pages_by_category = {info['json_category']: {} for info in categories}
+    seen_urls = {info['json_category']: set() for info in categories}
+    finished = {}
+    total = 0
+
+    def fetch(info, page):
+        url = get_page_url(base_url, info['url_slug'], page)
+        html = fetch_page_http(session, rate_limiter, url)
+        if html is None:
+            return []
+        return parse_product_cards(html, info['json_category'], url, verbose=False, source='Trendyol (HTTP)',
+                                   parser=parser)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(fetch, info, 1): (info, 1) for info in categories}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    info, page = pending.pop(future)
+                    category = info['json_category']
+                    try:
+                        products = future.result()
+                    except Exception as e:
+                        print(f"Error fetching page {page} of {info['name_tr']}: {e}")
+                        products = []
+                    new_products = [p for p in products if p['product_url'] not in seen_urls[category]]
+                    seen_urls[category].update(p['product_url'] for p in new_products)
+                    pages_by_category[category][page] = new_products
+                    print(f"Fetched {len(new_products)} new products from {info['name_tr']} page {page}.")
+                    if new_products and page < max_pages:
+                        pending[executor.submit(fetch, info, page + 1)] = (info, page + 1)
+                        continue
+                    # Kategori bitti: sayfaları sırayla teslim et
+                    pages = pages_by_category.pop(category)
+                    del seen_urls[category]
+                    category_products = [p for page_number in sorted(pages) for p in pages[page_number]]
+                    total += len(category_products)
+                    if on_category_done is not None:
+                        emit(info, category_products)
+                    else:
+                        finished[category] = category_products
+    finally:
+        session.close()
+
+    if collected is None:
+        return total
+    for info in categories: # Toplama modunda eski davranış: kategori sırası
+        emit(info, finished.get(info['json_category'], []))
+    return collected
+
+def scrape_categories_selenium(categories, base_url=BASE_URL, max_pages=1,
+                               requests_per_second=REQUESTS_PER_SECOND_PER_HOST, on_category_done=None,
+                               parser="auto"):
+    # Tek bir Chrome oturumuyla sıralı çekim (eski davranış); Selenium yalnızca bu modda gerekir.
+    # Dönüş değeri ve on_category_done, scrape_categories_http ile aynıdır.
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
     options = webdriver.ChromeOptions()
     # options.add_argument('--headless') 
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    options.add_argument(f"user-agent={USER_AGENT}")
 
+    emit, collected = collect_products(on_category_done)
     service = ChromeService(executable_path=CHROMEDRIVER_PATH)
     driver = None
-    all_fetched_products = []
+    total = 0
+    rate_limiter = HostRateLimiter(requests_per_second)
 
     try:
         driver = webdriver.Chrome(service=service, options=options)
         print("Selenium WebDriver initialized.")
 
-        for category_info in CATEGORIES_TO_SCRAPE:
-            current_url = f"https://www.trendyol.com/{category_info['url_slug']}"
-            products_from_category = scrape_category_page(driver, current_url, category_info['json_category'])
-            all_fetched_products.extend(products_from_category)
-            print(f"Fetched {len(products_from_category)} products from {category_info['name_tr']}. Total so far: {len(all_fetched_products)}")
-            
-            # Kategoriler arası bekleme (sunucuyu yormamak için)
-            sleep_duration = random.uniform(5, 10) # 5 ila 10 saniye arası rastgele bekle
-            print(f"Waiting for {sleep_duration:.2f} seconds before next category...")
-            time.sleep(sleep_duration)
+        for category_info in categories:
+            seen_urls = set()
+            category_products = []
+            for page in range(1, max_pages + 1):
+                current_url = get_page_url(base_url, category_info['url_slug'], page)
+                rate_limiter.wait(current_url) # Sunucuyu yormamak için host başına hız sınırı
+                products_from_page = [
+                    p for p in scrape_category_page(driver, current_url, category_info['json_category'], parser)
+                    if p['product_url'] not in seen_urls
+                ]
+                if not products_from_page:
+                    break
+                seen_urls.update(p['product_url'] for p in products_from_page)
+                category_products.extend(products_from_page)
+            emit(category_info, category_products)
+            total += len(category_products)
+            print(f"Fetched {len(category_products)} products from {category_info['name_tr']}. Total so far: {total}")
 
     except Exception as e:
         print(f"An error occurred in the main scraping process: {e}")
@@ -173,14 +315,156 @@ if __name__ == "__main__":
         if driver:
             print("Closing Selenium WebDriver.")
             driver.quit()
+    return total if collected is None else collected
+
+def append_products_jsonl(path, products):
+    # Bir kategorinin ürünlerini tek seferde sona ekler ve diske yazar; çökmede biten kategoriler korunur
+    if not products:
+        return
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(p, ensure_ascii=False) + '\n' for p in products))
+        f.flush()
+        os.fsync(f.fileno())
+
+def iter_products_jsonl(path):
+    # Yarım yazılmış son satır (çökme) atlanır
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def load_finished_categories(path):
+    # Devam ederken: çökmeden kalan yarım son satırı kes, dosyadaki kategorileri döndür
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    return {p.get('category') for p in iter_products_jsonl(path)}
+
+def write_json_from_jsonl(jsonl_path, json_path):
+    # Eski çıktı biçimi (indent=4 JSON listesi), ürünler tek tek okunarak yazılır; bellek sabit kalır
+    count = 0
+    tmp_path = json_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for product in iter_products_jsonl(jsonl_path):
+            f.write(',\n' if count else '\n')
+            f.write(textwrap.indent(json.dumps(product, ensure_ascii=False, indent=4), '    '))
+            count += 1
+        f.write('\n]' if count else ']')
+    os.replace(tmp_path, json_path)
+    return count
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    # Kaydedilmiş sayfaları Trendyol URL düzeniyle sunar: /<slug> -> <slug>.html, /<slug>?pi=N -> <slug>.N.html
+    def translate_path(self, path):
+        # Sayfa dosyasının yolu; fixture dizininin dışına çıkan istekler (ör. ../) için None
+        parts = urlsplit(path)
+        slug = unquote(parts.path).strip('/')
+        page = 1
+        for param in parts.query.split('&'):
+            if param.startswith('pi=') and param[3:].isdigit():
+                page = int(param[3:])
+        filename = f"{slug}.html" if page == 1 else f"{slug}.{page}.html"
+        root = os.path.realpath(self.directory)
+        resolved = os.path.realpath(os.path.join(root, filename))
+        if os.path.commonpath([root, resolved]) != root:
+            return None
+        return resolved
+
+    def send_head(self):
+        if self.translate_path(self.path) is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        return super().send_head()
+
+    def log_message(self, format, *args):
+        pass
 
-    if all_fetched_products:
-        print(f"\nSuccessfully fetched a total of {len(all_fetched_products)} products from all categories.")
-        output_filename = 'trendyol_multi_category_products.json'
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(all_fetched_products, f, ensure_ascii=False, indent=4)
-        print(f"All products saved to {output_filename}")
+def run_fixture_server(directory, port=8000):
+    """
+    Kaydedilmiş listeleme sayfalarını yerelde sunar; HTTP modu --base-url http://127.0.0.1:<port> ile
+    ağ erişimi olmadan denenebilir. Depodaki scraper_fixtures dizini her kategori için küçük bir örnek
+    sayfa içerir (Elbise için ikinci sayfa da vardır).
+    """
+    handler = lambda *args, **kwargs: FixtureRequestHandler(*args, directory=directory, **kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    print(f"Serving fixture pages from {directory} at http://127.0.0.1:{server.server_address[1]}")
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Trendyol multi-category scraper.")
+    parser.add_argument('--mode', choices=('selenium', 'http'), default='selenium',
+                        help="selenium: single Chrome session (default); http: pooled parallel HTTP client")
+    parser.add_argument('--base-url', default=BASE_URL, help="Listing host, e.g. a local fixture server")
+    parser.add_argument('--max-pages', type=int, help=f"Pages per category (default: 1 for selenium, {MAX_PAGES} for http)")
+    parser.add_argument('--workers', type=int, default=HTTP_WORKERS)
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND_PER_HOST, help="Requests per second per host")
+    parser.add_argument('--parser', choices=('auto',) + PARSER_BACKENDS, default='auto',
+                        help="HTML parser backend (auto: fastest installed)")
+    parser.add_argument('--output', default=OUTPUT_FILENAME)
+    parser.add_argument('--jsonl', default=OUTPUT_JSONL_FILENAME,
+                        help="Append-only file products are streamed to as each category finishes")
+    parser.add_argument('--resume', action='store_true',
+                        help="Keep the existing JSONL file and skip categories already in it")
+    parser.add_argument('--serve-fixtures', metavar='DIR', nargs='?', const=FIXTURES_DIR,
+                        help="Serve saved listing pages from DIR (default: the bundled scraper_fixtures) until Ctrl+C")
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.serve_fixtures:
+        server = run_fixture_server(args.serve_fixtures, args.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    partial_path = args.jsonl + PARTIAL_SUFFIX
+    finished_categories = set()
+    if args.resume:
+        # Yarıda kalan çalıştırmanın dosyası yoksa son başarılı çalıştırmanın JSONL'inden devam edilir
+        if not os.path.exists(partial_path) and os.path.exists(args.jsonl):
+            shutil.copyfile(args.jsonl, partial_path)
+        finished_categories = load_finished_categories(partial_path)
+        if finished_categories:
+            print(f"Resuming: skipping {len(finished_categories)} categories already in {partial_path}")
     else:
+        open(partial_path, 'w').close()
+    categories = [c for c in CATEGORIES_TO_SCRAPE if c['json_category'] not in finished_categories]
+
+    def on_category_done(category_info, products):
+        append_products_jsonl(partial_path, products)
+        print(f"Saved {len(products)} products from {category_info['name_tr']} to {partial_path}")
+
+    started = time.perf_counter()
+    print(f"Using the '{get_card_parser(args.parser).name}' HTML parser.")
+    if args.mode == 'http':
+        print("Starting Trendyol multi-category scraper with pooled HTTP client...")
+        fetched_count = scrape_categories_http(
+            categories, args.base_url, args.max_pages or MAX_PAGES, args.workers, args.rate,
+            on_category_done, args.parser)
+    else:
+        print("Starting Trendyol multi-category scraper with Selenium...")
+        fetched_count = scrape_categories_selenium(
+            categories, args.base_url, args.max_pages or 1, args.rate, on_category_done, args.parser)
+
+    if os.path.getsize(partial_path):
+        os.replace(partial_path, args.jsonl)
+        total_count = write_json_from_jsonl(args.jsonl, args.output)
+        print(f"\nSuccessfully fetched {fetched_count} products in {time.perf_counter() - started:.1f} seconds "
+              f"({total_count} in total).")
+        print(f"All products saved to {args.output}")
+    else:
+        os.remove(partial_path)
         print("\nNo products were fetched from any category. Check logs for errors.")
+        print(f"Keeping the previous {args.output} and {args.jsonl}.")
+
+    print("Multi-category scraper finished.")
 
-    print("Multi-category scraper finished.") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
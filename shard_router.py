@@ -0,0 +1,256 @@
+import argparse
+import bisect
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import Flask, jsonify, request
+from requests.adapters import HTTPAdapter
+
+import recommendation_service as service
+from catalog_shards import SHARD_STRATEGIES, get_product_shard, get_shard_by_category, get_target_shards
+from prefork_server import get_default_workers, serve_prefork
+
+# Parçalanmış (sharded) katalog için scatter-gather yönlendirici. Her parça, kataloğun bir payını yükleyen
+# ayrı bir servis sürecidir (CATALOG_SHARD=i/n, bkz. catalog_shards.py). suggest_complementary_items:
+#   1. Seçili ürün, sahibi olan parçadan alınır (yoksa diğer parçalara sorulur).
+#   2. İstek, seçili ürünle birlikte yalnızca hedef ana kategorileri tutan parçalara paralel gönderilir.
+#   3. filter modunda her parça aday sayısını ve kendi adaylarından rastgele bir örnek döndürür; toplam
+#      adaylardan tek parça servisle aynı dağılımda örnek almak için her parçadan alınacak ürün sayısı,
+#      adayların birleşimi üzerinde rastgele seçilen sıralara göre belirlenir. score modunda parçaların
+#      en iyi count adayı puana göre birleştirilir.
+# Kullanım:
+#   python shard_router.py --local-shards 4 --port 5000
+#   python shard_router.py --shards http://10.0.0.1:5101 http://10.0.0.2:5101 --port 5000
+logger = logging.getLogger('kombin.router')
+
+SHARD_URLS = [url for url in os.environ.get('SHARD_URLS', '').split(',') if url]
+SHARD_STRATEGY = os.environ.get('CATALOG_SHARD_STRATEGY', 'main_category')
+SHARD_TIMEOUT = float(os.environ.get('SHARD_TIMEOUT', '10'))
+LOCAL_SHARD_BASE_PORT = 5101
+
+app = Flask(__name__)
+
+_local = threading.local()
+_executor = None
+_executor_pid = None
+
+def get_session():
+    # İş parçacığı başına bağlantı havuzlu oturum (keep-alive); fork'tan sonra oluşturulur
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = 'identity' # Yerel ağda sıkıştırma yalnızca CPU harcar
+        adapter = HTTPAdapter(pool_connections=len(SHARD_URLS), pool_maxsize=len(SHARD_URLS))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+def get_executor():
+    # İş parçacıkları fork'ta kopyalanmaz; havuz her worker sürecinde ilk istekte oluşturulur
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=4 * len(SHARD_URLS), thread_name_prefix='shard-client')
+        _executor_pid = os.getpid()
+    return _executor
+
+def call_shard(shard_index, method, path, **kwargs):
+    # (yanıt gövdesi, durum kodu); parçaya ulaşılamazsa 502
+    try:
+        response = get_session().request(method, SHARD_URLS[shard_index] + path, timeout=SHARD_TIMEOUT, **kwargs)
+        return response.json(), response.status_code
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Parça %d yanıt vermedi: %s", shard_index, e)
+        return {"error": f"Parça {shard_index} yanıt vermedi."}, 502
+
+def scatter(shard_indexes, method, path, payloads, params=None):
+    # payloads: parça sırası -> istek gövdesi; params tüm parçalara aynen iletilen sorgu parametreleri
+    # (ör. fields=); sonuçlar shard_indexes sırasıyla
+    if len(shard_indexes) == 1:
+        return [call_shard(shard_indexes[0], method, path, json=payloads[shard_indexes[0]], params=params)]
+    futures = [get_executor().submit(call_shard, i, method, path, json=payloads[i], params=params)
+               for i in shard_indexes]
+    return [future.result() for future in futures]
+
+def fetch_seed_product(data):
+    # Seçili ürün; önce sahibi olması gereken parçaya, orada yoksa diğer parçalara sorulur
+    product_url = data.get('id')
+    if not isinstance(product_url, str) or not product_url:
+        return None
+    shard_by_category = get_shard_by_category(SHARD_STRATEGY, len(SHARD_URLS), service.COMPLEMENTARY_RULES)
+    owner = get_product_shard(data.get('category'), product_url, len(SHARD_URLS), shard_by_category)
+    body, status = call_shard(owner, 'GET', '/shard/product', params={'url': product_url})
+    if status == 200:
+        return body["product"]
+    others = [i for i in range(len(SHARD_URLS)) if i != owner]
+    futures = [get_executor().submit(call_shard, i, 'GET', '/shard/product', params={'url': product_url})
+               for i in others]
+    for future in futures:
+        body, status = future.result()
+        if status == 200:
+            return body["product"]
+    return None
+
+def get_request_target_shards(data):
+    # İsteğin adaylarını tutan parçalar. Kategori çözümlenemezse istek tek parçaya gider; hata veya
+    # "öneri yok" yanıtını tek parçalı servisle aynı şekilde o üretir.
+    if SHARD_STRATEGY != "main_category":
+        return list(range(len(SHARD_URLS)))
+    try:
+        main_category = service.get_main_category(data.get('category'))
+        current_categories = data.get('current_categories') or []
+        excluded = service.get_excluded_main_categories(current_categories) if current_categories else set()
+    except (AttributeError, TypeError):
+        return [0]
+    targets = [cat for cat in service.SUGGESTION_LOGIC.get(main_category, []) if cat not in excluded]
+    return get_target_shards(targets, SHARD_STRATEGY, len(SHARD_URLS), service.COMPLEMENTARY_RULES) or [0]
+
+def merge_sampled(results, count, rng):
+    # Her parça min(count, aday sayısı) ürünlük rastgele bir örnek döndürür. Adayların birleşiminden count
+    # sıra rastgele seçilir ve her parçadan o parçaya düşen sıra sayısı kadar ürün (örneğinin başından) alınır;
+    # sonuç tek parçalı servisteki rng.sample ile aynı dağılımdadır.
+    bounds = []
+    total = 0
+    for body in results:
+        total += body.get("candidate_count", 0)
+        bounds.append(total)
+    taken = [0] * len(results)
+    for position in rng.sample(range(total), min(count, total)):
+        taken[bisect.bisect_right(bounds, position)] += 1
+    merged = [product for body, k in zip(results, taken) for product in body.get("recommendations", [])[:k]]
+    rng.shuffle(merged)
+    return {"recommendations": merged}
+
+def merge_scored(results, count):
+    # Aday bulamayan parçalar yalnızca mesaj döndürebilir
+    scored = [(score, product) for body in results
+              for product, score in zip(body.get("recommendations", []), body.get("scores", []))]
+    scored.sort(key=lambda entry: entry[0], reverse=True)
+    return {"recommendations": [product for _, product in scored[:count]],
+            "scores": [score for score, _ in scored[:count]]}
+
+@app.route('/suggest_complementary_items', methods=['POST'])
+def suggest_complementary_items():
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Geçersiz istek gövdesi."}), 400
+    # Parça tohumları seed'den türetildiğinden seed, tek parçalı servisle aynı kurallarla önce doğrulanır
+    seed = data.get('seed')
+    seed_error = service.get_seed_error(seed)
+    if seed_error:
+        return jsonify({"error": seed_error}), 400
+    rng = random.Random(seed) if seed is not None else random
+
+    shard_indexes = get_request_target_shards(data)
+    payload = dict(data)
+    payload["seed_product"] = fetch_seed_product(data)
+    payloads = {}
+    for i in shard_indexes:
+        # Parçalar farklı ama tekrarlanabilir örnekler alsın
+        payloads[i] = {**payload, "seed": f"{seed}/{i}"} if seed is not None else payload
+    results = scatter(shard_indexes, 'POST', '/suggest_complementary_items', payloads,
+                      params=request.args.to_dict(flat=False))
+
+    # Geçersiz istek tüm parçalarda aynı hatayı verir ve olduğu gibi döndürülür. Yanıt vermeyen veya
+    # hata veren parçalar atlanır; sonuç yanıt veren parçalardan birleştirilir.
+    for body, status in results:
+        if 400 <= status < 500:
+            return jsonify(body), status
+    bodies = [body for body, status in results if status == 200]
+    if not bodies:
+        body, status = results[0]
+        return jsonify(body), status
+    if len(bodies) < len(results):
+        logger.warning("%d/%d parça yanıt vermedi; sonuç kalan parçalardan birleştirildi.",
+                       len(results) - len(bodies), len(results))
+    if all("candidate_count" not in body for body in bodies):
+        return service.json_response(bodies[0]) # Ör. tüm parçalarda aynı "öneri kalmadı" mesajı
+    count = data.get('count', 3)
+    if data.get('mode', 'filter') == "score":
+        return service.json_response(merge_scored(bodies, count))
+    return service.json_response(merge_sampled(bodies, count, rng))
+
+@app.route('/admin/shards', methods=['GET'])
+def shard_status():
+    error = service.check_admin_token()
+    if error:
+        return error
+    return jsonify({"strategy": SHARD_STRATEGY, "shards": SHARD_URLS})
+
+def start_local_shards(num_shards, strategy, base_port, workers_per_shard, host='127.0.0.1'):
+    # Her parça için wsgi.py'yi CATALOG_SHARD=i/n ile ayrı bir süreçte başlatır; (süreçler, URL'ler) döndürür
+    here = os.path.dirname(os.path.abspath(__file__))
+    processes, urls = [], []
+    for i in range(num_shards):
+        env = {**os.environ, "CATALOG_SHARD": f"{i}/{num_shards}", "CATALOG_SHARD_STRATEGY": strategy}
+        command = [sys.executable, os.path.join(here, 'wsgi.py'), '--host', host, '--port', str(base_port + i),
+                   '--workers', str(workers_per_shard)]
+        processes.append(subprocess.Popen(command, env=env, cwd=here))
+        urls.append(f"http://{host}:{base_port + i}")
+    return processes, urls
+
+def wait_for_shards(processes, urls, timeout=600.0):
+    # Parçalar kataloglarını yükleyip dinlemeye başlayana kadar bekler
+    deadline = time.monotonic() + timeout
+    for process, url in zip(processes, urls):
+        host, port = url.rsplit('//', 1)[1].rsplit(':', 1)
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} parçası başlatılamadı (çıkış kodu {process.returncode})")
+            try:
+                socket.create_connection((host, int(port)), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} parçası {timeout:.0f} sn içinde hazır olmadı")
+                time.sleep(0.2)
+
+def stop_local_shards(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait()
+
+def main():
+    global SHARD_URLS, SHARD_STRATEGY
+    parser = argparse.ArgumentParser(description="Parçalanmış katalog için scatter-gather yönlendirici.")
+    shards = parser.add_mutually_exclusive_group()
+    shards.add_argument('--shards', nargs='+', default=SHARD_URLS, help="Parça servislerinin adresleri (sırayla 0..n-1)")
+    shards.add_argument('--local-shards', type=int, help="Bu makinede başlatılacak parça süreci sayısı")
+    parser.add_argument('--strategy', choices=SHARD_STRATEGIES, default=SHARD_STRATEGY)
+    parser.add_argument('--shard-base-port', type=int, default=LOCAL_SHARD_BASE_PORT)
+    parser.add_argument('--shard-workers', type=int, default=1, help="Yerel parça başına worker sayısı")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=get_default_workers(), help="Yönlendirici worker sayısı")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=service.LOG_LEVEL, format='%(asctime)s %(levelname)s %(process)d %(name)s: %(message)s')
+    SHARD_STRATEGY = args.strategy
+    processes = []
+    if args.local_shards:
+        processes, SHARD_URLS = start_local_shards(args.local_shards, args.strategy, args.shard_base_port,
+                                                   args.shard_workers)
+    else:
+        SHARD_URLS = args.shards
+    if not SHARD_URLS:
+        parser.error("--shards, --local-shards veya SHARD_URLS gerekli")
+    if SHARD_STRATEGY == "main_category" and len(SHARD_URLS) > len(service.COMPLEMENTARY_RULES):
+        logger.warning("main_category ile en fazla %d parça dolu olur; fazlası boş kalır.", len(service.COMPLEMENTARY_RULES))
+    try:
+        wait_for_shards(processes, SHARD_URLS[:len(processes)])
+        logger.info("%d parça (%s): %s", len(SHARD_URLS), SHARD_STRATEGY, ', '.join(SHARD_URLS))
+        serve_prefork(app, args.host, args.port, max(1, args.workers))
+    finally:
+        stop_local_shards(processes)
+
+if __name__ == '__main__':
+    main()
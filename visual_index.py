@@ -0,0 +1,126 @@
+import base64
+
+import numpy as np
+
+# Görsel tanımlayıcılar (preprocess_products.compute_visual_descriptor) üzerinde en yakın komşu araması.
+# Tanımlayıcı, LAB uzayında nicelenmiş renk histogramının karekökünün 0-255 aralığına ölçeklenmiş
+# halidir (uint8); iki tanımlayıcının normalize iç çarpımı Hellinger benzerliğine karşılık gelir.
+# Tanımlayıcısı olmayan ürünlerin satırı sıfırdır ve aramalarda hiçbir zaman döndürülmez.
+DESCRIPTOR_SIZE = 256
+
+# Küçük kataloglarda aday kümesi üzerinde tam (brute force) arama yapılır. Tanımlayıcılı ürün sayısı
+# IVF_MIN_PRODUCTS'ı aşarsa ürünler küresel k-means ile IVF_LISTS listeye ayrılır ve sorgu yalnızca
+# ona en yakın IVF_PROBES listedeki adaylarla karşılaştırılır.
+IVF_MIN_PRODUCTS = 20000
+IVF_LISTS = 512 # En fazla; liste sayısı tanımlayıcılı ürün sayısının karekökü kadardır
+IVF_PROBES = 16
+IVF_TRAIN_SAMPLE = 50000
+IVF_TRAIN_ITERATIONS = 10
+SEARCH_CHUNK = 65536 # Bellekte aynı anda float32'ye çevrilen satır sayısı
+
+def encode_descriptor(descriptor):
+    return base64.b64encode(np.asarray(descriptor, dtype=np.uint8).tobytes()).decode('ascii')
+
+def decode_descriptors(texts):
+    # Ürün sırasındaki base64 tanımlayıcılardan (n, DESCRIPTOR_SIZE) uint8 matris; eksik/bozuk olanlar sıfır
+    descriptors = np.zeros((len(texts), DESCRIPTOR_SIZE), dtype=np.uint8)
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        try:
+            data = base64.b64decode(text)
+        except ValueError:
+            continue
+        if len(data) == DESCRIPTOR_SIZE:
+            descriptors[i] = np.frombuffer(data, dtype=np.uint8)
+    return descriptors
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class VisualIndex:
+    """
+    (n, DESCRIPTOR_SIZE) uint8 tanımlayıcı matrisi üzerinde kosinüs benzerliği araması.
+    Matris kopyalanmaz (ikili anlık görüntüde mmap'teki bölümdür); yalnızca satır normları ve
+    IVF liste atamaları ayrıca tutulur. centroids verilirse (önceki katalog sürümünden) yeniden eğitilmez.
+    """
+
+    def __init__(self, descriptors, ivf_min_products=IVF_MIN_PRODUCTS, num_lists=IVF_LISTS,
+                 centroids=None, seed=0):
+        self.descriptors = descriptors
+        norms = np.empty(len(descriptors), dtype=np.float32)
+        for start in range(0, len(descriptors), SEARCH_CHUNK):
+            block = descriptors[start:start + SEARCH_CHUNK].astype(np.float32)
+            norms[start:start + SEARCH_CHUNK] = np.sqrt(np.einsum('ij,ij->i', block, block))
+        self.has_descriptor = norms > 0
+        self.inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        self.count = int(self.has_descriptor.sum())
+        self.centroids = None
+        self.list_ids = None
+        if self.count >= ivf_min_products:
+            if centroids is None:
+                centroids = self._train_centroids(min(num_lists, int(np.sqrt(self.count))), seed)
+            self.centroids = centroids
+            self.list_ids = self._assign_lists()
+
+    def _rows(self, ids):
+        # Satırları birim uzunluklu float32 vektörler olarak döndürür
+        return self.descriptors[ids].astype(np.float32) * self.inverse_norms[ids, None]
+
+    def _train_centroids(self, num_lists, seed):
+        # Örneklem üzerinde küresel k-means (iç çarpımla atama, merkezler birim uzunluğa normalize)
+        rng = np.random.default_rng(seed)
+        valid = np.flatnonzero(self.has_descriptor)
+        sample = self._rows(rng.choice(valid, min(len(valid), IVF_TRAIN_SAMPLE), replace=False))
+        centroids = sample[rng.choice(len(sample), num_lists, replace=False)]
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            assignment = (sample @ centroids.T).argmax(axis=1)
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=num_lists)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = centroids.copy() # Boş kalan listeler eski merkezini korur
+            sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            centroids = _normalize_rows(sums)
+        return centroids
+
+    def _assign_lists(self):
+        list_ids = np.full(len(self.descriptors), -1, dtype=np.int32)
+        for start in range(0, len(self.descriptors), SEARCH_CHUNK):
+            ids = np.arange(start, min(start + SEARCH_CHUNK, len(self.descriptors)))
+            ids = ids[self.has_descriptor[ids]]
+            if len(ids):
+                list_ids[ids] = (self._rows(ids) @ self.centroids.T).argmax(axis=1)
+        return list_ids
+
+    def query_vector(self, product_id):
+        if not self.has_descriptor[product_id]:
+            return None
+        return self._rows(np.array([product_id]))[0]
+
+    def search(self, query, ids, k, probes=IVF_PROBES):
+        """
+        ids içinden sorguya en benzer k ürünü (id dizisi, benzerlikler) olarak, benzerliğe göre azalan
+        sırada döndürür. IVF varsa adaylar önce en yakın probes listeye daraltılır; daraltılmış küme
+        k'dan küçük kalırsa tüm adaylar taranır.
+        """
+        ids = np.asarray(ids, dtype=np.intp)
+        ids = ids[self.has_descriptor[ids]]
+        if self.list_ids is not None and len(ids) > k:
+            probed = np.zeros(len(self.centroids), dtype=bool)
+            probed[np.argsort(self.centroids @ query)[-probes:]] = True
+            narrowed = ids[probed[self.list_ids[ids]]]
+            if len(narrowed) >= k:
+                ids = narrowed
+        if not len(ids):
+            return ids, np.empty(0, dtype=np.float32)
+        similarities = np.empty(len(ids), dtype=np.float32)
+        for start in range(0, len(ids), SEARCH_CHUNK):
+            similarities[start:start + SEARCH_CHUNK] = self._rows(ids[start:start + SEARCH_CHUNK]) @ query
+        if len(ids) > k:
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return ids[top], similarities[top]
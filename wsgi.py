@@ -0,0 +1,46 @@
+import argparse
+import logging
+import os
+
+import recommendation_service as service
+from prefork_server import get_default_workers, serve_prefork
+
+# Production giriş noktası. Katalog (tercihen ikili anlık görüntü; bkz. catalog_snapshot.py) ve
+# indeksler ana süreçte bir kez yüklenir, worker'lar ardından fork edilir; böylece her worker
+# kataloğu yeniden ayrıştırmaz ve bellekte tek kopya paylaşılır. Katalog izleyicisi her worker'da
+# ayrı çalışır: değişiklikte her worker kendi kataloğunu yeniden yükler (anlık görüntü mmap'i
+# yine işletim sisteminin sayfa önbelleğinden paylaşılır).
+#
+#   python wsgi.py --workers 4 --port 5000          (yalnızca standart kütüphane, POSIX)
+#   gunicorn -c gunicorn_conf.py                    (gunicorn kuruluysa)
+#
+# Worker sayısı: öneri hesaplaması CPU'ya bağlıdır, varsayılan çekirdek sayısıdır (WEB_CONCURRENCY ile
+# değiştirilebilir). İş parçacıkları yalnızca yavaş istemcileri karşılar, CPU işini hızlandırmaz.
+# Not: /metrics ve /admin uç noktaları isteği alan worker'ın kendi sayaçlarını gösterir.
+HOST = os.environ.get('HOST', '127.0.0.1')
+PORT = int(os.environ.get('PORT', '5000'))
+GRACEFUL_TIMEOUT = float(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+
+application = service.app
+
+def create_app():
+    # Katalog yüklenmiş uygulamayı döndürür (gunicorn: wsgi_app = "wsgi:create_app()")
+    service.load_products()
+    return application
+
+def main():
+    parser = argparse.ArgumentParser(description="Öneri servisini çok süreçli WSGI sunucusuyla çalıştırır.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=get_default_workers(), help="Worker süreç sayısı")
+    parser.add_argument('--graceful-timeout', type=float, default=GRACEFUL_TIMEOUT,
+                        help="Kapanışta devam eden isteklerin bitmesi için beklenecek saniye")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=service.LOG_LEVEL, format='%(asctime)s %(levelname)s %(process)d %(name)s: %(message)s')
+    create_app()
+    serve_prefork(application, args.host, args.port, max(1, args.workers),
+                  on_worker_start=service.start_catalog_watcher, graceful_timeout=args.graceful_timeout)
+
+if __name__ == '__main__':
+    main()